@@ -0,0 +1,85 @@
+# backend/scripts/model-training/anomaly_detection/compiled_forest.py
+#
+# Dependency-light scorer for models exported with
+# IsolationForestAnomalyDetector.export_compiled(). Only NumPy is imported,
+# so short-lived scoring workers start fast, and every array is opened with
+# mmap_mode='r' so processes on the same host share the model pages. Node
+# ids are stored as int64 so they index without per-call conversion.
+#
+# Export layout (one directory):
+#   meta.json        features, offset, denominator, max_depth
+#   mean.npy         StandardScaler mean_
+#   scale.npy        StandardScaler scale_
+#   roots.npy        int64 global node id of each tree's root
+#   feature.npy      int64 split feature per node (0 for leaves)
+#   threshold.npy    float64 split threshold per node (+inf for leaves)
+#   left.npy         int64 global id of the left child (leaves point to themselves)
+#   right.npy        int64 global id of the right child (leaves point to themselves)
+#   path_length.npy  float64 edges from the root + average path length of the
+#                    samples left in each leaf (0 for internal nodes)
+
+import json
+import os
+import numpy as np
+
+COMPILED_ARRAYS = ['mean', 'scale', 'roots', 'feature', 'threshold', 'left', 'right', 'path_length']
+
+
+class CompiledIsolationForest:
+    def __init__(self, arrays, meta):
+        self.mean = arrays['mean']
+        self.scale = arrays['scale']
+        self.roots = arrays['roots']
+        self.feature = arrays['feature']
+        self.threshold = arrays['threshold']
+        self.left = arrays['left']
+        self.right = arrays['right']
+        self.path_length = arrays['path_length']
+        self.features = meta['features']
+        self.offset = meta['offset']
+        self.denominator = meta['denominator']
+        self.max_depth = meta['max_depth']
+
+    @classmethod
+    def load(cls, model_dir, mmap=True):
+        """Open an exported model directory, memory-mapping the arrays"""
+        with open(os.path.join(model_dir, 'meta.json')) as f:
+            meta = json.load(f)
+        arrays = {
+            name: np.load(os.path.join(model_dir, f"{name}.npy"), mmap_mode='r' if mmap else None)
+            for name in COMPILED_ARRAYS
+        }
+        return cls(arrays, meta)
+
+    def _leaf_path_lengths(self, X):
+        """Sum of leaf path lengths over all trees for each row of scaled X"""
+        # sklearn trees compare float32 inputs against float64 thresholds
+        columns = np.ascontiguousarray(np.asarray(X, dtype=np.float32).T)
+        rows = np.arange(len(X))
+        total = np.zeros(len(X))
+        for root in self.roots:
+            nodes = np.full(len(X), root, dtype=np.intp)
+            for _ in range(self.max_depth):
+                go_left = columns[self.feature[nodes], rows] <= self.threshold[nodes]
+                nodes = np.where(go_left, self.left[nodes], self.right[nodes])
+            total += self.path_length[nodes]
+        return total
+
+    def score_samples(self, X, batch_size=4096):
+        """Equivalent of IsolationForest.score_samples on unscaled features"""
+        X = (np.atleast_2d(np.asarray(X, dtype=np.float64)) - self.mean) / self.scale
+        depths = np.concatenate([
+            self._leaf_path_lengths(X[start:start + batch_size])
+            for start in range(0, len(X), batch_size)
+        ]) if len(X) else np.empty(0)
+        if self.denominator == 0:
+            return -np.ones_like(depths)
+        return -(2 ** (-depths / self.denominator))
+
+    def decision_function(self, X, batch_size=4096):
+        """Equivalent of the pipeline's decision_function; negative is anomalous"""
+        return self.score_samples(X, batch_size) - self.offset
+
+    def predict(self, X, batch_size=4096):
+        """1 for inliers, -1 for anomalies"""
+        return np.where(self.decision_function(X, batch_size) < 0, -1, 1)
@@ -7,11 +7,75 @@ import joblib
 import json
 from pathlib import Path
 import logging
+import threading
+import time
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Raw CSV columns each derived feature is computed from
+DERIVED_FEATURE_SOURCES = {
+    'hour_of_day': ['timestamp'],
+    'day_of_week': ['timestamp'],
+    'delivery_deviation': ['actual_delivery_time', 'expected_delivery_time'],
+    'inventory_turnover': ['supplies_used', 'initial_inventory']
+}
+DEFAULT_TRAIN_SAMPLE_SIZE = 65536
+
+
+def average_path_length(n_samples):
+    """Expected path length of an unsuccessful BST search over n samples"""
+    n_samples = np.asarray(n_samples, dtype=np.float64)
+    lengths = np.zeros_like(n_samples)
+    lengths[n_samples == 2] = 1.0
+    large = n_samples > 2
+    n = n_samples[large]
+    lengths[large] = 2.0 * (np.log(n - 1.0) + np.euler_gamma) - 2.0 * (n - 1.0) / n
+    return lengths
+
+
+def reservoir_insert(reservoir, filled, seen, rows, rng, window=None):
+    """
+    Vectorized reservoir sampling of ``rows`` into a fixed-size array
+    
+    Args:
+        reservoir: Preallocated (size, n_features) sample array, updated in place
+        filled: Number of reservoir rows already in use
+        seen: Number of rows offered to the reservoir so far
+        rows: New (n, n_features) rows
+        rng: numpy Generator
+        window: If set, approximate a uniform sample of only the most recent
+                ``window`` rows instead of the whole history
+        
+    Returns:
+        int: Updated number of filled reservoir rows
+    """
+    size = len(reservoir)
+    free = min(size - filled, len(rows))
+    reservoir[filled:filled + free] = rows[:free]
+
+    rest = rows[free:]
+    if len(rest):
+        positions = seen + free + np.arange(1, len(rest) + 1)
+        if window:
+            positions = np.minimum(positions, window)
+        accept = rng.random(len(rest)) < size / positions
+        reservoir[rng.integers(0, size, accept.sum())] = rest[accept]
+    return filled + free
+
+
+def parse_timestamps(values):
+    """Timestamps as datetime64[s] in local wall-clock time, like ``.dt.hour`` sees them"""
+    values = np.asarray(values)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype('datetime64[s]')
+    parsed = pd.DatetimeIndex(pd.to_datetime(values.ravel()))
+    if parsed.tz is not None:
+        parsed = parsed.tz_localize(None)
+    return parsed.to_numpy('datetime64[s]')
+
+
 class IsolationForestAnomalyDetector:
     def __init__(self, config_path='config/anomaly_config.json'):
         """
@@ -64,29 +128,87 @@ class IsolationForestAnomalyDetector:
             logger.error(f"Preprocessing error: {e}")
             raise
 
-    def train(self, data_path):
+    def _build_pipeline(self):
+        """Create an unfitted scaler + Isolation Forest pipeline from config"""
+        return Pipeline([
+            ('scaler', StandardScaler()),
+            ('isolation_forest', IsolationForest(
+                n_estimators=self.config['n_estimators'],
+                max_samples=self.config['max_samples'],
+                contamination=self.config['contamination'],
+                random_state=self.config['random_state'],
+                n_jobs=-1
+            ))
+        ])
+
+    def _train_sample_size(self):
+        """Training rows to keep when streaming: max_samples if it is a row count"""
+        max_samples = self.config['max_samples']
+        if isinstance(max_samples, int):
+            return max_samples
+        return self.config.get('train_sample_size', DEFAULT_TRAIN_SAMPLE_SIZE)
+
+    def _source_columns(self, available):
+        """Raw columns the configured features are read or derived from"""
+        needed = set()
+        for feature in self.features:
+            sources = DERIVED_FEATURE_SOURCES.get(feature, [])
+            if sources and all(col in available for col in sources):
+                needed.update(sources)
+            else:
+                needed.add(feature)
+        return needed
+
+    def _sample_csv(self, data_path, chunksize, sample_size):
+        """
+        Stream a CSV in chunks and reservoir-sample its feature rows
+        
+        Only the columns the configured features need are read, numeric ones
+        as float64 and timestamps as strings, so peak memory is bounded by
+        ``chunksize`` and ``sample_size`` rather than the file size.
+        """
+        needed = self._source_columns(pd.read_csv(data_path, nrows=0).columns)
+        dtypes = {col: (str if col == 'timestamp' else np.float64) for col in needed}
+
+        rng = np.random.default_rng(self.config['random_state'])
+        sample = np.empty((sample_size, len(self.features)))
+        filled = seen = 0
+        for chunk in pd.read_csv(data_path, usecols=sorted(needed), dtype=dtypes,
+                                 chunksize=chunksize):
+            features = self._feature_matrix({col: chunk[col].to_numpy() for col in chunk.columns})
+            filled = reservoir_insert(sample, filled, seen, features, rng)
+            seen += len(features)
+
+        logger.info(f"Sampled {filled} of {seen} rows from {data_path}")
+        return sample[:filled]
+
+    def train(self, data_path, chunksize=None, sample_size=None):
         """
         Train the Isolation Forest model
         
         Args:
             data_path: Path to training data CSV
+            chunksize: Rows per chunk; when set the CSV is streamed and the
+                       model is trained on a reservoir sample of all rows
+            sample_size: Reservoir size for chunked training (defaults to
+                         max_samples when it is a row count)
         """
         try:
+            if chunksize:
+                processed_data = self._sample_csv(
+                    data_path, chunksize, sample_size or self._train_sample_size())
+                logger.info("Training Isolation Forest model")
+                self.model = self._build_pipeline()
+                self.model.fit(processed_data)
+                logger.info("Model training completed")
+                return self
+
             logger.info(f"Loading training data from {data_path}")
             df = pd.read_csv(data_path)
             processed_data = self._preprocess_data(df)
             
             logger.info("Training Isolation Forest model")
-            self.model = Pipeline([
-                ('scaler', StandardScaler()),
-                ('isolation_forest', IsolationForest(
-                    n_estimators=self.config['n_estimators'],
-                    max_samples=self.config['max_samples'],
-                    contamination=self.config['contamination'],
-                    random_state=self.config['random_state'],
-                    n_jobs=-1
-                ))
-            ])
+            self.model = self._build_pipeline()
             
             self.model.fit(processed_data)
             logger.info("Model training completed")
@@ -96,59 +218,345 @@ class IsolationForestAnomalyDetector:
             logger.error(f"Training failed: {e}")
             raise
 
-    def detect(self, X):
+    def _feature_matrix(self, data):
         """
-        Detect anomalies in new data
+        Build the model's feature matrix from columnar data
+        
+        Features are derived with NumPy; pandas is only used to parse
+        timestamps that are not already datetime64, so every format
+        ``pd.to_datetime`` accepts in ``_preprocess_data`` works here too.
         
         Args:
-            X: Input data (DataFrame or dict)
+            data: ndarray already in ``self.features`` order, or a mapping
+                  (dict of arrays, DataFrame) of raw telemetry columns
             
         Returns:
-            dict: {'is_anomaly': array, 'anomaly_score': array}
+            float64 ndarray of shape (n_rows, n_features)
         """
-        try:
-            if not self.model:
-                raise RuntimeError("Model not trained. Call train() first.")
-                
-            if isinstance(X, dict):
-                X = pd.DataFrame([X])
-                
-            processed_data = self._preprocess_data(X)
-            
-            predictions = self.model.predict(processed_data)
-            scores = self.model.decision_function(processed_data)
+        if isinstance(data, np.ndarray):
+            return np.atleast_2d(np.asarray(data, dtype=np.float64))
+
+        derived = {}
+        if 'timestamp' in data:
+            timestamps = parse_timestamps(data['timestamp'])
+            days = timestamps.astype('datetime64[D]')
+            derived['hour_of_day'] = (timestamps - days).astype('timedelta64[h]').astype(np.int64)
+            derived['day_of_week'] = (days.astype(np.int64) + 3) % 7  # 1970-01-01 was a Thursday
+
+        if all(col in data for col in ['actual_delivery_time', 'expected_delivery_time']):
+            derived['delivery_deviation'] = (np.asarray(data['actual_delivery_time'], dtype=np.float64) -
+                                             np.asarray(data['expected_delivery_time'], dtype=np.float64))
+
+        if all(col in data for col in ['supplies_used', 'initial_inventory']):
+            derived['inventory_turnover'] = (np.asarray(data['supplies_used'], dtype=np.float64) /
+                                             np.asarray(data['initial_inventory'], dtype=np.float64))
+
+        return np.column_stack([
+            np.asarray(derived[f] if f in derived else data[f], dtype=np.float64)
+            for f in self.features
+        ])
+
+    def _decision_scores(self, features, model=None):
+        """Scale and score a feature matrix with a single pass over the trees"""
+        model = model or self.model
+        scaler = model.named_steps['scaler']
+        forest = model.named_steps['isolation_forest']
+        return forest.score_samples((features - scaler.mean_) / scaler.scale_) - forest.offset_
+
+    def detect_batch(self, X, threshold=0.0, model=None):
+        """
+        Vectorized anomaly detection for many telemetry rows
+        
+        Args:
+            X: Feature ndarray in ``self.features`` order, or columnar raw data
+               (dict of arrays or DataFrame)
+            threshold: Rows whose decision score is below this are anomalies
+                       (0.0 matches the model's contamination cut-off)
+            model: Fitted pipeline to score with, defaults to ``self.model``
             
+        Returns:
+            dict: {'is_anomaly': int array, 'anomaly_score': float array,
+                   'features': (n_rows, n_features) array}; empty arrays for
+                   empty input
+        """
+        try:
+            features = self._feature_matrix(X)
+            if not len(features):
+                scores = np.empty(0)
+            else:
+                model = model or self.model
+                if not model:
+                    raise RuntimeError("Model not trained. Call train() first.")
+                scores = self._decision_scores(features, model)
+
             return {
-                'is_anomaly': (predictions == -1).astype(int),
+                'is_anomaly': (scores < threshold).astype(int),
                 'anomaly_score': scores,
-                'features': processed_data.to_dict('records')[0]
+                'features': features
             }
-            
+
         except Exception as e:
-            logger.error(f"Detection failed: {e}")
+            logger.error(f"Batch detection failed: {e}")
             raise
 
+    def detect(self, X):
+        """
+        Detect anomalies in new data
+        
+        Args:
+            X: Input data (DataFrame or dict)
+            
+        Returns:
+            dict: {'is_anomaly': array, 'anomaly_score': array, 'features': dict
+                   for a single dict input, list of per-row dicts otherwise}
+        """
+        single = isinstance(X, dict) and all(np.ndim(v) == 0 for v in X.values())
+        if single:
+            X = {key: [value] for key, value in X.items()}
+
+        result = self.detect_batch(X)
+        records = [dict(zip(self.features, row)) for row in result['features'].tolist()]
+        result['features'] = records[0] if single else records
+        return result
+
     def save(self, output_dir='models/anomaly_detection'):
         """Save trained model to disk"""
         try:
             Path(output_dir).mkdir(parents=True, exist_ok=True)
             model_path = f"{output_dir}/isolation_forest.joblib"
             joblib.dump(self.model, model_path)
+            with open(f"{output_dir}/anomaly_config.json", 'w') as f:
+                json.dump(self.config, f, indent=2)
             logger.info(f"Model saved to {model_path}")
             return model_path
         except Exception as e:
             logger.error(f"Failed to save model: {e}")
             raise
 
+    def export_compiled(self, output_dir='models/anomaly_detection/compiled'):
+        """
+        Flatten the fitted scaler and trees into memory-mappable arrays
+        
+        The result is read by ``compiled_forest.CompiledIsolationForest``,
+        which scores with NumPy only (no pandas/scikit-learn import).
+        
+        Args:
+            output_dir: Directory for the ``.npy`` arrays and ``meta.json``
+            
+        Returns:
+            str: output_dir
+        """
+        try:
+            if not self.model:
+                raise RuntimeError("Model not trained. Call train() first.")
+
+            scaler = self.model.named_steps['scaler']
+            forest = self.model.named_steps['isolation_forest']
+
+            roots, features, thresholds, lefts, rights, path_lengths = [], [], [], [], [], []
+            offset = 0
+            max_depth = 0
+            for estimator, tree_features in zip(forest.estimators_, forest.estimators_features_):
+                tree = estimator.tree_
+                is_leaf = tree.children_left == -1
+
+                # Zero-based node depths, parents are numbered before their children
+                depth = np.zeros(tree.node_count)
+                for node in range(tree.node_count):
+                    if not is_leaf[node]:
+                        depth[tree.children_left[node]] = depth[node] + 1
+                        depth[tree.children_right[node]] = depth[node] + 1
+                max_depth = max(max_depth, int(depth.max()))
+
+                # Leaves point back to themselves so traversal needs no masking.
+                # Tree feature indices refer to the columns this estimator was
+                # fitted on; map them back to the full feature matrix.
+                feature = np.asarray(tree_features)[np.where(is_leaf, 0, tree.feature)]
+                nodes = np.arange(tree.node_count) + offset
+                roots.append(offset)
+                features.append(np.where(is_leaf, 0, feature))
+                thresholds.append(np.where(is_leaf, np.inf, tree.threshold))
+                lefts.append(np.where(is_leaf, nodes, tree.children_left + offset))
+                rights.append(np.where(is_leaf, nodes, tree.children_right + offset))
+                path_lengths.append(np.where(
+                    is_leaf, depth + average_path_length(tree.n_node_samples), 0.0))
+                offset += tree.node_count
+
+            arrays = {
+                'mean': scaler.mean_.astype(np.float64),
+                'scale': scaler.scale_.astype(np.float64),
+                'roots': np.array(roots, dtype=np.int64),
+                'feature': np.concatenate(features).astype(np.int64),
+                'threshold': np.concatenate(thresholds).astype(np.float64),
+                'left': np.concatenate(lefts).astype(np.int64),
+                'right': np.concatenate(rights).astype(np.int64),
+                'path_length': np.concatenate(path_lengths).astype(np.float64)
+            }
+            meta = {
+                'features': self.features,
+                'offset': float(forest.offset_),
+                'denominator': float(len(forest.estimators_) *
+                                     average_path_length([forest.max_samples_])[0]),
+                'max_depth': max_depth
+            }
+
+            Path(output_dir).mkdir(parents=True, exist_ok=True)
+            for name, array in arrays.items():
+                np.save(Path(output_dir) / f"{name}.npy", np.ascontiguousarray(array))
+            with open(Path(output_dir) / 'meta.json', 'w') as f:
+                json.dump(meta, f, indent=2)
+            logger.info(f"Compiled model exported to {output_dir}")
+            return str(output_dir)
+        except Exception as e:
+            logger.error(f"Failed to export compiled model: {e}")
+            raise
+
     @classmethod
-    def load(cls, model_path):
-        """Load trained model from disk"""
+    def load(cls, model_path, config_path=None):
+        """
+        Load trained model from disk
+        
+        Args:
+            model_path: Path to the saved ``.joblib`` pipeline
+            config_path: Config to use; defaults to the ``anomaly_config.json``
+                         written next to the model by ``save()``
+        """
         try:
             model = joblib.load(model_path)
-            detector = cls()
+            if config_path is None:
+                saved_config = Path(model_path).parent / 'anomaly_config.json'
+                config_path = saved_config if saved_config.exists() else 'config/anomaly_config.json'
+            detector = cls(config_path)
             detector.model = model
             logger.info(f"Model loaded from {model_path}")
             return detector
         except Exception as e:
             logger.error(f"Failed to load model: {e}")
-            raise
\ No newline at end of file
+            raise
+
+
+def tail_jsonl(path, poll_interval=1.0, from_start=True):
+    """
+    Follow a JSONL file like ``tail -f``
+    
+    Yields one dict per complete line, and None whenever a poll finds no new
+    data so consumers can flush partially filled micro-batches.
+    """
+    with open(path) as f:
+        if not from_start:
+            f.seek(0, 2)
+        pending = ''
+        while True:
+            chunk = f.readline()
+            if not chunk:
+                yield None
+                time.sleep(poll_interval)
+                continue
+            pending += chunk
+            if not pending.endswith('\n'):
+                continue  # Line still being written
+            line, pending = pending.strip(), ''
+            if line:
+                yield json.loads(line)
+
+
+class StreamingAnomalyDetector:
+    def __init__(self, detector, batch_size=256, reservoir_size=10000,
+                 window_size=100000, refit_every=50000, random_state=None):
+        """
+        Score a continuous telemetry stream with periodic background refits
+        
+        Args:
+            detector: IsolationForestAnomalyDetector (trained or not)
+            batch_size: Records scored together per micro-batch
+            reservoir_size: Rows kept for refitting (bounds memory)
+            window_size: Reservoir approximates a uniform sample of the most
+                         recent ``window_size`` rows
+            refit_every: Rows between background refits
+            random_state: Seed for reservoir replacement
+        """
+        self.detector = detector
+        self.batch_size = batch_size
+        self.window_size = window_size
+        self.refit_every = refit_every
+        self.rng = np.random.default_rng(random_state)
+
+        self.reservoir = np.empty((reservoir_size, len(detector.features)))
+        self.reservoir_count = 0
+        self.rows_seen = 0
+        self.rows_since_refit = 0
+        self.refits = 0
+        self._refit_thread = None
+
+    def _update_reservoir(self, features):
+        """Sliding-window reservoir sampling for a micro-batch of feature rows"""
+        self.reservoir_count = reservoir_insert(
+            self.reservoir, self.reservoir_count, self.rows_seen, features,
+            self.rng, self.window_size)
+        self.rows_seen += len(features)
+        self.rows_since_refit += len(features)
+
+    def _refit(self, sample):
+        """Fit a new pipeline on a reservoir snapshot and swap it in"""
+        try:
+            start = time.perf_counter()
+            model = self.detector._build_pipeline().fit(sample)
+            self.detector.model = model  # Single reference swap, scorers never see a partial model
+            self.refits += 1
+            logger.info(f"Refitted on {len(sample)} rows in {time.perf_counter() - start:.2f}s")
+        except Exception as e:
+            logger.error(f"Background refit failed: {e}")
+
+    def refit(self, background=True):
+        """Refit on the current reservoir, in a background thread by default"""
+        if self._refit_thread and self._refit_thread.is_alive():
+            return False
+        sample = self.reservoir[:self.reservoir_count].copy()
+        self.rows_since_refit = 0
+        if not background:
+            self._refit(sample)
+            return True
+        self._refit_thread = threading.Thread(target=self._refit, args=(sample,), daemon=True)
+        self._refit_thread.start()
+        return True
+
+    def _score_batch(self, records):
+        if not records:
+            return self.detector.detect_batch(np.empty((0, len(self.detector.features))))
+
+        available = set(records[0]).intersection(*records[1:])
+        needed = self.detector._source_columns(available)
+        missing = needed - available
+        if missing:
+            raise ValueError(f"Records are missing {sorted(missing)} needed for the model's features")
+        features = self.detector._feature_matrix(
+            {col: [record[col] for record in records] for col in needed})
+        self._update_reservoir(features)
+
+        if self.detector.model is None:
+            self.refit(background=False)  # Cold start: first model is fitted inline
+        elif self.rows_since_refit >= self.refit_every:
+            self.refit()
+
+        return self.detector.detect_batch(features, model=self.detector.model)
+
+    def score_stream(self, records):
+        """
+        Score records from any iterable in micro-batches
+        
+        Args:
+            records: Iterable of telemetry dicts; a None item flushes the
+                     current partial batch (see ``tail_jsonl``)
+            
+        Yields:
+            (records, result) per micro-batch, result as from ``detect_batch``
+        """
+        batch = []
+        for record in records:
+            if record is not None:
+                batch.append(record)
+            if batch and (record is None or len(batch) >= self.batch_size):
+                yield batch, self._score_batch(batch)
+                batch = []
+        if batch:
+            yield batch, self._score_batch(batch)
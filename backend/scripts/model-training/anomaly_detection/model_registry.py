@@ -0,0 +1,186 @@
+# backend/scripts/model-training/anomaly_detection/model_registry.py
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import numpy as np
+
+try:
+    from .isolation_forest import IsolationForestAnomalyDetector
+except ImportError:  # Run as a script from this directory
+    from isolation_forest import IsolationForestAnomalyDetector
+
+logger = logging.getLogger(__name__)
+
+MODEL_FILE = 'isolation_forest.joblib'
+LATEST_FILE = 'LATEST'
+
+
+def _next_version_dir(region_dir):
+    """Atomically claim the next free ``v<N>`` directory for a region"""
+    region_dir.mkdir(parents=True, exist_ok=True)
+    existing = [int(p.name[1:]) for p in region_dir.glob('v*') if p.name[1:].isdigit()]
+    version = max(existing, default=0) + 1
+    while True:
+        try:
+            (region_dir / f"v{version}").mkdir()
+            return version
+        except FileExistsError:
+            version += 1  # Another trainer claimed it first
+
+
+def model_nbytes(obj, _seen=None):
+    """In-memory size of a fitted model, counted as the NumPy arrays it holds"""
+    _seen = {} if _seen is None else _seen  # id -> object, kept alive so ids stay unique
+    if id(obj) in _seen or isinstance(obj, (str, bytes, int, float, type(None))):
+        return 0
+    _seen[id(obj)] = obj
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if isinstance(obj, dict):
+        return sum(model_nbytes(value, _seen) for value in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(model_nbytes(value, _seen) for value in obj)
+    # Estimators expose their fitted arrays through __dict__; sklearn trees
+    # (Cython objects) only through their pickle state
+    state = obj.__getstate__() if hasattr(obj, '__getstate__') else getattr(obj, '__dict__', None)
+    return model_nbytes(state, _seen) if isinstance(state, (dict, list, tuple)) else 0
+
+
+def _train_region(root, config_path, region, data_path, chunksize=None):
+    """Train and publish one region's model (runs in a worker process)"""
+    start = time.perf_counter()
+    region_dir = Path(root) / str(region)
+    version = _next_version_dir(region_dir)
+    version_dir = region_dir / f"v{version}"
+
+    detector = IsolationForestAnomalyDetector(config_path)
+    detector.train(data_path, chunksize=chunksize)
+    detector.save(version_dir)
+
+    with open(version_dir / 'metadata.json', 'w') as f:
+        json.dump({
+            'region': str(region),
+            'version': version,
+            'data_path': str(data_path),
+            'trained_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'train_seconds': round(time.perf_counter() - start, 3)
+        }, f, indent=2)
+
+    # Publish by atomically replacing the LATEST pointer
+    tmp_path = region_dir / f"{LATEST_FILE}.{os.getpid()}.tmp"
+    tmp_path.write_text(str(version))
+    os.replace(tmp_path, region_dir / LATEST_FILE)
+    return str(region), version
+
+
+class AnomalyModelRegistry:
+    def __init__(self, root='models/anomaly_detection/regions', max_bytes=512 * 1024 * 1024):
+        """
+        Versioned per-region anomaly models with an in-process LRU cache
+        
+        Layout: ``<root>/<region>/v<N>/isolation_forest.joblib`` plus the
+        config and ``metadata.json``; ``<root>/<region>/LATEST`` names the
+        version served by default. Regions are usually ``disasters.id``.
+        
+        Args:
+            root: Registry directory
+            max_bytes: Memory budget for cached models, measured as the
+                       NumPy arrays each loaded pipeline holds
+        """
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._cache = OrderedDict()  # (region, version) -> (detector, size)
+        self._cached_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def train_many(self, datasets, config_path, max_workers=None, chunksize=None):
+        """
+        Train one model per region in parallel
+        
+        Args:
+            datasets: Dict of region -> training CSV path
+            config_path: Shared anomaly config JSON
+            max_workers: Process pool size, defaults to the CPU count
+            chunksize: Passed to ``train`` for chunked, memory-bounded training
+            
+        Returns:
+            dict: region -> new version number (regions that failed are logged
+            and left out)
+        """
+        versions = {}
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = {
+                pool.submit(_train_region, self.root, config_path, region, data_path, chunksize): region
+                for region, data_path in datasets.items()
+            }
+            for future, region in futures.items():
+                try:
+                    trained_region, version = future.result()
+                    versions[trained_region] = version
+                except Exception as e:
+                    logger.error(f"Training failed for region {region}: {e}")
+        return versions
+
+    def latest_version(self, region):
+        """Version currently published for a region"""
+        latest = self.root / str(region) / LATEST_FILE
+        if not latest.exists():
+            raise KeyError(f"No model registered for region {region}")
+        return int(latest.read_text().strip())
+
+    def versions(self, region):
+        """All stored versions for a region, oldest first"""
+        region_dir = self.root / str(region)
+        return sorted(int(p.name[1:]) for p in region_dir.glob('v*')
+                      if (p / MODEL_FILE).exists())
+
+    def get(self, region, version=None):
+        """Return a detector for the region, loading it on a cache miss"""
+        region = str(region)
+        version = version or self.latest_version(region)
+        key = (region, version)
+
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key][0]
+            self.misses += 1
+
+        model_path = self.root / region / f"v{version}" / MODEL_FILE
+        detector = IsolationForestAnomalyDetector.load(model_path)
+        size = model_nbytes(detector.model)
+
+        with self._lock:
+            if key not in self._cache:
+                self._cache[key] = (detector, size)
+                self._cached_bytes += size
+            self._cache.move_to_end(key)
+            # Evict least recently used models, but always keep the newest
+            while self._cached_bytes > self.max_bytes and len(self._cache) > 1:
+                _, (_, evicted_size) = self._cache.popitem(last=False)
+                self._cached_bytes -= evicted_size
+            return self._cache[key][0]
+
+    def detect(self, region, X, threshold=0.0):
+        """Score telemetry with the region's current model"""
+        return self.get(region).detect_batch(X, threshold)
+
+    def stats(self):
+        """Cache occupancy and hit counters"""
+        with self._lock:
+            return {
+                'cached_models': len(self._cache),
+                'cached_bytes': self._cached_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses
+            }
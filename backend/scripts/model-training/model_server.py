@@ -0,0 +1,512 @@
+# backend/scripts/model-training/model_server.py
+#
+# One long-running daemon serving all the ML components to the PHP API over
+# local HTTP (TCP or Unix socket). Each model is imported and loaded once, on
+# its first request. Concurrent requests to the same model are micro-batched
+# into a single call on that model's worker thread; route problems are solved
+# in a pool of spawned processes started with the server. GET /stats reports
+# queue depth and latency per endpoint.
+#
+#   python model_server.py --port 8765
+#   python model_server.py --socket /tmp/model_server.sock
+#
+#   curl -s localhost:8765/classify -d '{"messages": ["Need medicine"]}'
+#   curl -s --unix-socket /tmp/model_server.sock http://localhost/stats
+
+import argparse
+import asyncio
+import importlib
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date, datetime
+from functools import partial
+from http import HTTPStatus
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# Component modules use script-style imports within their own directories
+for component in ('anomaly_detection', 'nlp', 'prophet', 'yolo', 'ortools'):
+    path = os.path.join(HERE, component)
+    if path not in sys.path:
+        sys.path.append(path)
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = 32 * 1024 * 1024
+LATENCY_WINDOW = 1000  # Requests kept per endpoint for latency percentiles
+
+
+class BadRequest(ValueError):
+    """Client error, answered with HTTP 400"""
+
+
+def to_json(value):
+    """json.dumps default for NumPy and date values in model outputs"""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class LazyModel:
+    """Load a model on first use, once, from whichever worker thread gets there first"""
+
+    def __init__(self, loader):
+        self.loader = loader
+        self.model = None
+        self.load_seconds = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self):
+        return self.model is not None
+
+    def get(self):
+        if self.model is None:
+            with self._lock:
+                if self.model is None:
+                    start = time.perf_counter()
+                    self.model = self.loader()
+                    self.load_seconds = time.perf_counter() - start
+        return self.model
+
+
+class Endpoint:
+    def __init__(self, name, run_batch, executor, max_batch=32, max_wait_ms=5, concurrency=1,
+                 lazy_model=None):
+        """
+        Micro-batching queue in front of one model
+
+        Requests wait up to ``max_wait_ms`` for others to join them, then up
+        to ``max_batch`` payloads are handed to ``run_batch(payloads)`` in
+        ``executor``, which returns one result per payload. ``concurrency``
+        batches may run at once (1 for a single in-memory model, the pool
+        size for process-pool endpoints).
+        """
+        self.name = name
+        self.run_batch = run_batch
+        self.executor = executor
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.concurrency = concurrency
+        self.lazy_model = lazy_model
+        self.queue = None
+        self.in_flight = 0
+        self.requests = 0
+        self.errors = 0
+        self.batches = 0
+        self.batched_requests = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def start(self):
+        self.queue = asyncio.Queue()
+        return [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def submit(self, payload):
+        future = asyncio.get_running_loop().create_future()
+        start = time.perf_counter()
+        await self.queue.put((payload, future))
+        try:
+            return await future
+        finally:
+            self.requests += 1
+            self.latencies.append(time.perf_counter() - start)
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            self.in_flight += len(batch)
+            self.batches += 1
+            self.batched_requests += len(batch)
+            payloads = [payload for payload, _ in batch]
+            try:
+                results = await loop.run_in_executor(self.executor, self.run_batch, payloads)
+                outcomes = [(result, None) for result in results]
+            except Exception as e:
+                if len(batch) == 1:
+                    outcomes = [(None, e)]
+                else:
+                    # Retry one by one so a single bad request can't fail the others
+                    outcomes = []
+                    for payload in payloads:
+                        try:
+                            outcomes.append(((await loop.run_in_executor(
+                                self.executor, self.run_batch, [payload]))[0], None))
+                        except Exception as single_error:
+                            outcomes.append((None, single_error))
+            finally:
+                self.in_flight -= len(batch)
+
+            for (_, future), (result, error) in zip(batch, outcomes):
+                if future.done():
+                    continue
+                if error is not None:
+                    self.errors += 1
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+
+    def stats(self):
+        latencies = np.array(self.latencies) * 1000
+        return {
+            'queue_depth': self.queue.qsize() if self.queue else 0,
+            'in_flight': self.in_flight,
+            'requests': self.requests,
+            'errors': self.errors,
+            'batches': self.batches,
+            'mean_batch_size': self.batched_requests / self.batches if self.batches else 0.0,
+            'latency_ms': {
+                'mean': float(latencies.mean()) if len(latencies) else 0.0,
+                'p50': float(np.percentile(latencies, 50)) if len(latencies) else 0.0,
+                'p95': float(np.percentile(latencies, 95)) if len(latencies) else 0.0
+            },
+            'loaded': self.lazy_model.loaded if self.lazy_model else None,
+            'load_seconds': self.lazy_model.load_seconds if self.lazy_model else None
+        }
+
+
+def require(payload, key, kind=list):
+    value = payload.get(key) if isinstance(payload, dict) else None
+    if not isinstance(value, kind):
+        raise BadRequest(f"'{key}' must be a {kind.__name__}")
+    return value
+
+
+def split(values, sizes):
+    """Cut a concatenated batch result back into per-request pieces"""
+    pieces, start = [], 0
+    for size in sizes:
+        pieces.append(values[start:start + size])
+        start += size
+    return pieces
+
+
+# Loaders and batch functions, one pair per model. Heavy imports happen
+# inside the loaders so the daemon starts instantly and only pays for the
+# models that are actually used.
+
+def load_anomaly(args):
+    from isolation_forest import IsolationForestAnomalyDetector
+    return IsolationForestAnomalyDetector.load(args.anomaly_model)
+
+
+def run_anomaly(model, payloads):
+    import pandas as pd
+
+    rows = [require(payload, 'rows') for payload in payloads]
+    threshold = float(payloads[0].get('threshold', 0.0))
+    if any(float(payload.get('threshold', 0.0)) != threshold for payload in payloads):
+        # Different cut-offs can't share a call; fall back to one call per request
+        return [run_anomaly(model, [payload])[0] for payload in payloads]
+
+    result = model.detect_batch(pd.DataFrame([row for request in rows for row in request]), threshold)
+    sizes = [len(request) for request in rows]
+    return [{'is_anomaly': flags, 'anomaly_score': scores}
+            for flags, scores in zip(split(result['is_anomaly'].tolist(), sizes),
+                                     split(result['anomaly_score'].tolist(), sizes))]
+
+
+def load_classifier(args):
+    from message_processing import EmergencyMessageProcessor
+    processor = EmergencyMessageProcessor(args.nlp_model, args.nlp_resources)
+    processor.predict_batch(['warm up'])  # Load the pipeline now, not on a user request
+    return processor
+
+
+def run_classifier(processor, payloads):
+    messages = [[str(message) for message in require(payload, 'messages')] for payload in payloads]
+    result = processor.predict_batch([message for request in messages for message in request])
+    return [{'categories': categories}
+            for categories in split(result['categories'], [len(request) for request in messages])]
+
+
+def load_forecaster(args):
+    from demand_forecasting import EmergencyDemandForecaster
+    forecaster = EmergencyDemandForecaster(cache_dir=args.forecast_cache)
+    forecaster.load_model(args.prophet_model)
+    return forecaster
+
+
+def load_baseline(args):
+    from holt_winters import HoltWintersForecaster
+    forecaster = HoltWintersForecaster()
+    forecaster.load_model(args.baseline_model)
+    return forecaster
+
+
+def forecast_records(forecast):
+    columns = ['ds', 'yhat', 'yhat_lower', 'yhat_upper']
+    records = [dict(zip(columns, row)) for row in zip(*(np.asarray(forecast[c]).tolist() for c in columns))]
+    for record in records:
+        record['ds'] = str(record['ds'])[:10]  # Dates are daily
+    return records
+
+
+def run_forecast(forecaster, payloads, model_path):
+    """Requests for the same horizon share one make_forecast call"""
+    results, computed = [], {}
+    for payload in payloads:
+        if not isinstance(payload, dict):
+            raise BadRequest("Body must be a JSON object")
+        periods = int(payload.get('periods', 7))
+        if not 0 < periods <= 366:
+            raise BadRequest("'periods' must be between 1 and 366")
+        key = (periods, bool(payload.get('include_history', False)))
+        if key not in computed:
+            computed[key] = {'forecast': forecast_records(
+                forecaster.make_forecast(model_path, periods, include_history=key[1]))}
+        results.append(computed[key])
+    return results
+
+
+def load_detector(args):
+    from inventory_detection import InventoryDetector
+    return InventoryDetector(args.yolo_backend, args.yolo_threads, model_path=args.yolo_model)
+
+
+def run_detector(detector, payloads):
+    images = [[str(path) for path in require(payload, 'images')] for payload in payloads]
+    result = detector.detect_batch([path for request in images for path in request])
+    failed = set(result['failed'])
+    found = iter(result['images'])
+
+    responses = []
+    for request in images:
+        per_image = []
+        for path in request:
+            source = detector.resolve_path(path)
+            per_image.append({'source': source, 'error': 'unreadable image'} if source in failed
+                             else next(found))
+        counts = {}
+        for image in per_image:
+            for name, count in image.get('counts', {}).items():
+                counts[name] = counts.get(name, 0) + count
+        responses.append({'images': per_image, 'counts': counts})
+    return responses
+
+
+def run_routes(payloads, time_limit, cache_dir):
+    """Solve route problems inside a pool process (OR-Tools imported once per worker)"""
+    from route_service import solve_job
+    return [solve_job(payload, time_limit, cache_dir) for payload in payloads]
+
+
+def warm_route_worker():
+    """Import the solver in a fresh pool process so no request waits for it"""
+    importlib.import_module('route_service')
+    return os.getpid()
+
+
+def parse_content_length(value):
+    """Body size from a Content-Length header, None if it is not a plain non-negative integer"""
+    value = (value or '0').strip()
+    return int(value) if value.isascii() and value.isdigit() else None
+
+
+class ModelServer:
+    def __init__(self, args):
+        self.args = args
+        self.started = time.time()
+        # One thread per in-memory model: batches for a model never overlap,
+        # but different models run side by side
+        self.threads = ThreadPoolExecutor(max_workers=5, thread_name_prefix='model')
+        # Spawned, not forked: a fork would copy the event loop and the model
+        # threads' locks into the solver processes
+        self.route_workers = args.route_workers or os.cpu_count()
+        self.processes = ProcessPoolExecutor(max_workers=self.route_workers,
+                                             mp_context=multiprocessing.get_context('spawn'))
+        self.endpoints = {}
+
+        self._model_endpoint('anomaly', lambda: load_anomaly(args), run_anomaly)
+        self._model_endpoint('classify', lambda: load_classifier(args), run_classifier, max_batch=64)
+        self._model_endpoint('forecast', lambda: load_forecaster(args),
+                             lambda model, payloads: run_forecast(model, payloads, args.prophet_model))
+        if args.baseline_model:
+            self._model_endpoint('forecast/baseline', lambda: load_baseline(args),
+                                 lambda model, payloads: run_forecast(model, payloads, args.baseline_model))
+        self._model_endpoint('detect', lambda: load_detector(args), run_detector, max_batch=8)
+
+        self.endpoints['routes'] = Endpoint(
+            'routes', partial(run_routes, time_limit=args.route_time_limit, cache_dir=args.route_cache),
+            self.processes, max_batch=1, max_wait_ms=0, concurrency=self.route_workers)
+
+    def _model_endpoint(self, name, loader, run, max_batch=32):
+        lazy = LazyModel(loader)
+        self.endpoints[name] = Endpoint(name, lambda payloads: run(lazy.get(), payloads), self.threads,
+                                        max_batch=max_batch, max_wait_ms=self.args.max_wait_ms,
+                                        lazy_model=lazy)
+
+    async def warm_route_workers(self):
+        """Start every route process and load the solver in it before taking requests"""
+        loop = asyncio.get_running_loop()
+        # Submitted together, so no worker is idle yet and each call gets a new process
+        started = await asyncio.gather(*(loop.run_in_executor(self.processes, warm_route_worker)
+                                         for _ in range(self.route_workers)), return_exceptions=True)
+        failed = [result for result in started if isinstance(result, Exception)]
+        if failed:
+            logger.warning("Route workers could not load the solver: %s", failed[0])
+        return len(started) - len(failed)
+
+    def stats(self):
+        return {
+            'uptime_seconds': round(time.time() - self.started, 1),
+            'endpoints': {name: endpoint.stats() for name, endpoint in self.endpoints.items()}
+        }
+
+    async def dispatch(self, method, path, body):
+        """Route one request, returning (status, JSON-able body)"""
+        path = path.split('?', 1)[0].strip('/')
+        if method == 'GET' and path == 'health':
+            return HTTPStatus.OK, {'status': 'ok'}
+        if method == 'GET' and path == 'stats':
+            return HTTPStatus.OK, self.stats()
+
+        endpoint = self.endpoints.get(path)
+        if endpoint is None:
+            return HTTPStatus.NOT_FOUND, {'error': f"Unknown endpoint '/{path}'"}
+        if method != 'POST':
+            return HTTPStatus.METHOD_NOT_ALLOWED, {'error': 'Use POST'}
+        try:
+            payload = json.loads(body or b'{}')
+        except json.JSONDecodeError as e:
+            return HTTPStatus.BAD_REQUEST, {'error': f"Invalid JSON: {e}"}
+
+        try:
+            return HTTPStatus.OK, await endpoint.submit(payload)
+        except (BadRequest, KeyError, TypeError, ValueError) as e:  # Malformed payloads
+            return HTTPStatus.BAD_REQUEST, {'error': str(e)}
+        except FileNotFoundError as e:
+            return HTTPStatus.SERVICE_UNAVAILABLE, {'error': f"Model not available: {e}"}
+        except Exception as e:
+            logger.exception("%s request failed", path)
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {'error': str(e)}
+
+    async def handle_connection(self, reader, writer):
+        """Minimal HTTP/1.1 with keep-alive; enough for PHP curl and local tools"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = parse_content_length(headers.get('content-length'))
+                if length is None:
+                    # The body can't be delimited, so the connection can't be reused
+                    status, body = HTTPStatus.BAD_REQUEST, {'error': 'Invalid Content-Length'}
+                    keep_alive = False
+                elif length > MAX_BODY_BYTES:
+                    status, body = HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {'error': 'Body too large'}
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length) if length else b''
+                    status, body = await self.dispatch(method.upper(), target, body)
+                    keep_alive = (headers.get('connection', '').lower() != 'close'
+                                  and version.upper() == 'HTTP/1.1')
+
+                data = json.dumps(body, default=to_json).encode()
+                writer.write(
+                    f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self):
+        for endpoint in self.endpoints.values():
+            endpoint.start()
+        ready = await self.warm_route_workers()
+        logger.info("%d/%d route workers ready", ready, self.route_workers)
+
+        if self.args.socket:
+            if os.path.exists(self.args.socket):
+                os.remove(self.args.socket)
+            server = await asyncio.start_unix_server(self.handle_connection, path=self.args.socket)
+            where = self.args.socket
+        else:
+            server = await asyncio.start_server(self.handle_connection, self.args.host, self.args.port)
+            where = f"http://{self.args.host}:{self.args.port}"
+        logger.info("Model server listening on %s", where)
+
+        async with server:
+            await server.serve_forever()
+
+    def shutdown(self):
+        self.threads.shutdown(wait=False, cancel_futures=True)
+        self.processes.shutdown(wait=False, cancel_futures=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve all emergency-optimizer models from one daemon')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--socket', help='Listen on this Unix socket instead of TCP')
+    parser.add_argument('--max-wait-ms', type=float, default=5,
+                        help='How long a request waits for others to share its batch')
+    parser.add_argument('--anomaly-model',
+                        default=os.path.join(HERE, 'models', 'anomaly_detection', 'isolation_forest.joblib'))
+    parser.add_argument('--nlp-model', default=os.path.join(HERE, 'nlp', 'emergency_classifier.joblib'))
+    parser.add_argument('--nlp-resources', default=os.path.join(HERE, 'nlp', 'nlp_resources.json'))
+    parser.add_argument('--prophet-model', default=os.path.join(HERE, 'prophet', 'demand_forecaster.pkl'))
+    parser.add_argument('--forecast-cache', help='Directory for cached forecast frames')
+    parser.add_argument('--baseline-model', help='Holt-Winters model served at /forecast/baseline')
+    parser.add_argument('--yolo-model', default=os.path.join(HERE, 'yolo', 'inventory_yolov5.pt'),
+                        help='Trained .pt; the ONNX backends use the exports next to it')
+    parser.add_argument('--yolo-backend', choices=('torch', 'onnx', 'onnx-int8'), default='torch')
+    parser.add_argument('--yolo-threads', type=int)
+    parser.add_argument('--route-workers', type=int, default=None,
+                        help='Route solver processes (default: CPU count)')
+    parser.add_argument('--route-time-limit', type=int, default=5)
+    parser.add_argument('--route-cache', help='Directory for cached distance matrices')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    server = ModelServer(args)
+    try:
+        asyncio.run(server.serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
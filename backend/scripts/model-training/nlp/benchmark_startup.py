@@ -0,0 +1,68 @@
+# backend/scripts/model-training/nlp/benchmark_startup.py
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# Runs in a fresh interpreter so import and corpus loading costs are measured
+PROBE = '''
+import json, sys, time
+start = time.perf_counter()
+from message_processing import EmergencyMessageProcessor
+imported = time.perf_counter()
+processor = EmergencyMessageProcessor(sys.argv[1], sys.argv[2] or None)
+initialized = time.perf_counter()
+processor.predict_category("Need medicines and clean water for families")
+predicted = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'init_ms': (initialized - imported) * 1000,
+    'first_prediction_ms': (predicted - initialized) * 1000,
+    'total_ms': (predicted - start) * 1000
+}))
+'''
+
+
+def measure(model_path, resource_path, runs):
+    """Median timings over several cold starts"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    samples = []
+    for _ in range(runs):
+        process = subprocess.run(
+            [sys.executable, '-c', PROBE, model_path, resource_path],
+            cwd=here, capture_output=True, text=True)
+        if process.returncode != 0:
+            errors = [line for line in process.stderr.splitlines() if 'Error' in line]
+            return {'error': (errors or process.stderr.strip().splitlines())[-1]}
+        samples.append(json.loads(process.stdout.strip().splitlines()[-1]))
+    return {key: sorted(s[key] for s in samples)[len(samples) // 2] for key in samples[0]}
+
+
+def main():
+    here = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description='Cold-start time with and without the offline bundle')
+    parser.add_argument('--model', default=os.path.join(here, 'emergency_classifier.joblib'))
+    parser.add_argument('--resources', default=os.path.join(here, 'nlp_resources.json'))
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    modes = [('nltk', '')]
+    if os.path.exists(args.resources):
+        modes.append(('bundle', args.resources))
+    else:
+        print(f"No bundle at {args.resources}; run build_resource_bundle() first")
+
+    print(f"{'mode':>8} {'import_ms':>10} {'init_ms':>10} {'first_pred_ms':>14} {'total_ms':>10}")
+    for name, resource_path in modes:
+        result = measure(args.model, resource_path, args.runs)
+        if 'error' in result:
+            print(f"{name:>8} failed: {result['error']}")
+            continue
+        print(f"{name:>8} {result['import_ms']:>10.1f} {result['init_ms']:>10.1f} "
+              f"{result['first_prediction_ms']:>14.1f} {result['total_ms']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,204 @@
+# backend/scripts/model-training/nlp/message_cache.py
+
+import threading
+import time
+import zlib
+from collections import OrderedDict
+import numpy as np
+
+# MinHash over 31-bit shingle hashes modulo a Mersenne prime, so a * h + b
+# stays within uint64
+MERSENNE_PRIME = (1 << 31) - 1
+
+
+class MinHasher:
+    def __init__(self, num_perm=64, shingle_size=4, seed=1):
+        """
+        MinHash signatures over character shingles of cleaned text
+
+        Args:
+            num_perm: Signature length (number of hash permutations)
+            shingle_size: Characters per shingle
+            seed: Seed for the permutation coefficients
+        """
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.a = rng.randint(1, MERSENNE_PRIME, size=(num_perm, 1)).astype(np.uint64)
+        self.b = rng.randint(0, MERSENNE_PRIME, size=(num_perm, 1)).astype(np.uint64)
+
+    def shingles(self, text):
+        n = self.shingle_size
+        if len(text) <= n:
+            return {text} if text else set()
+        return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+    def signature(self, text):
+        """MinHash signature, or None for text without shingles"""
+        shingles = self.shingles(text)
+        if not shingles:
+            return None
+        # crc32 is stable across processes, unlike hash()
+        hashes = np.fromiter((zlib.crc32(s.encode()) & MERSENNE_PRIME for s in shingles),
+                             dtype=np.uint64, count=len(shingles))
+        return ((self.a * hashes + self.b) % MERSENNE_PRIME).min(axis=1)
+
+
+class CachedMessageClassifier:
+    def __init__(self, processor, max_entries=100000, num_perm=64, bands=16,
+                 shingle_size=4, threshold=0.8):
+        """
+        Two-level classification cache in front of EmergencyMessageProcessor
+
+        Level 1 is an exact LRU keyed on the cleaned text, so retweets that
+        only differ in URLs, mentions, case or punctuation already collide.
+        Level 2 is a MinHash/LSH index over the same entries: a message whose
+        estimated Jaccard similarity to a cached one reaches ``threshold``
+        reuses that classification. Both levels share the LRU bound.
+
+        Args:
+            processor: EmergencyMessageProcessor used for cleaning and misses
+            max_entries: Cached cleaned texts before LRU eviction
+            num_perm: MinHash signature length
+            bands: LSH bands; num_perm must be divisible by it
+            shingle_size: Characters per shingle
+            threshold: Minimum estimated similarity for a near-duplicate hit
+        """
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.processor = processor
+        self.max_entries = max_entries
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm, shingle_size)
+
+        self._entries = OrderedDict()  # cleaned text -> (category, signature, band keys)
+        self._buckets = [{} for _ in range(bands)]  # band key -> set of cleaned texts
+        self._lock = threading.Lock()
+        self._counts = {'exact': 0, 'near': 0, 'miss': 0}
+        self._seconds = {'exact': 0.0, 'near': 0.0, 'miss': 0.0}
+
+    def _band_keys(self, signature):
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def _lookup(self, cleaned):
+        """Cached category and hit kind for cleaned text; caller holds the lock"""
+        entry = self._entries.get(cleaned)
+        if entry is not None:
+            self._entries.move_to_end(cleaned)
+            return entry[0], 'exact', None
+
+        signature = self.hasher.signature(cleaned)
+        if signature is None:
+            return None, 'miss', None
+
+        best, best_similarity = None, self.threshold
+        candidates = set()
+        for bucket, key in zip(self._buckets, self._band_keys(signature)):
+            candidates.update(bucket.get(key, ()))
+        for candidate in candidates:
+            similarity = np.mean(self._entries[candidate][1] == signature)
+            if similarity >= best_similarity:
+                best, best_similarity = candidate, similarity
+        if best is None:
+            return None, 'miss', signature
+
+        self._entries.move_to_end(best)
+        category = self._entries[best][0]
+        self._insert(cleaned, category, signature)  # Later exact copies of this variant hit level 1
+        return category, 'near', signature
+
+    def _insert(self, cleaned, category, signature):
+        if cleaned in self._entries:
+            return
+        band_keys = self._band_keys(signature) if signature is not None else []
+        self._entries[cleaned] = (category, signature, band_keys)
+        for bucket, key in zip(self._buckets, band_keys):
+            bucket.setdefault(key, set()).add(cleaned)
+
+        while len(self._entries) > self.max_entries:
+            evicted, (_, _, evicted_keys) = self._entries.popitem(last=False)
+            for bucket, key in zip(self._buckets, evicted_keys):
+                members = bucket[key]
+                members.discard(evicted)
+                if not members:
+                    del bucket[key]
+
+    def _record(self, kind, seconds):
+        self._counts[kind] += 1
+        self._seconds[kind] += seconds
+
+    def predict_category(self, message):
+        """Drop-in for EmergencyMessageProcessor.predict_category"""
+        return self.predict_batch([message])[0]
+
+    def predict_batch(self, messages):
+        """Classify messages, sending only cache misses to the model.
+
+        Misses are de-duplicated and classified in one model call.
+        Returns categories in input order.
+        """
+        # Each message is charged its own cleaning and lookup time; misses also
+        # get an equal share of the model call, so latencies compare across outcomes
+        cleaned, seconds = [], []
+        for message in messages:
+            start = time.perf_counter()
+            cleaned.append(self.processor.clean_text(message))
+            seconds.append(time.perf_counter() - start)
+        results = [None] * len(cleaned)
+        pending = OrderedDict()  # cleaned text -> (signature, input positions)
+
+        with self._lock:
+            for i, text in enumerate(cleaned):
+                if text in pending:
+                    pending[text][1].append(i)
+                    continue
+                start = time.perf_counter()
+                category, kind, signature = self._lookup(text)
+                seconds[i] += time.perf_counter() - start
+                if category is None:
+                    pending[text] = (signature, [i])
+                else:
+                    results[i] = category
+                    self._record(kind, seconds[i])
+
+        if pending:
+            start = time.perf_counter()
+            categories = self.processor.predict_cleaned(list(pending))
+            model_share = (time.perf_counter() - start) / len(pending)
+            with self._lock:
+                for (text, (signature, positions)), category in zip(pending.items(), categories):
+                    self._insert(text, category, signature)
+                    for i in positions:
+                        results[i] = category
+                    self._record('miss', seconds[positions[0]] + model_share)
+                    # Repeats within the batch rode along with the first copy
+                    for i in positions[1:]:
+                        self._record('exact', seconds[i])
+
+        return results
+
+    def stats(self):
+        """Hit rates, mean per-message latency per outcome and index occupancy"""
+        with self._lock:
+            total = sum(self._counts.values())
+            return {
+                'requests': total,
+                'exact_hits': self._counts['exact'],
+                'near_hits': self._counts['near'],
+                'misses': self._counts['miss'],
+                'hit_rate': (self._counts['exact'] + self._counts['near']) / total if total else 0.0,
+                'mean_latency_ms': {
+                    kind: 1000 * self._seconds[kind] / count if count else 0.0
+                    for kind, count in self._counts.items()
+                },
+                'cached_entries': len(self._entries),
+                'max_entries': self.max_entries
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            for bucket in self._buckets:
+                bucket.clear()
@@ -1,35 +1,212 @@
 import os
-import pandas as pd
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.svm import LinearSVC
-from sklearn.pipeline import Pipeline
 import joblib
+import json
+import numpy as np
 import re
 import string
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
-import nltk
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 
-nltk.download('stopwords')
-nltk.download('wordnet')
+# Compiled once instead of on every clean_text call
+URL_PATTERN = re.compile(r'http\S+|www\S+|https\S+')
+MENTION_PATTERN = re.compile(r'\@\w+|\#')
+PUNCTUATION_TABLE = str.maketrans('', '', string.punctuation)
+
+# Offline stopword/lemma bundle, looked up next to this module by default
+RESOURCE_BUNDLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'nlp_resources.json')
+
+# Out-of-core training: rows per CSV chunk and size of the hashed feature space
+TRAIN_CHUNKSIZE = 50000
+HASH_FEATURES = 2 ** 20
+
+# Lemmas computed at runtime that are memoized per processor (LRU)
+LEMMA_CACHE_SIZE = 100000
+
+# WordNet's noun detachment rules, as WordNetLemmatizer applies them by default
+NOUN_SUFFIX_RULES = (('s', ''), ('ses', 's'), ('ves', 'f'), ('xes', 'x'), ('zes', 'z'),
+                     ('ches', 'ch'), ('shes', 'sh'), ('men', 'man'), ('ies', 'y'))
+
+_worker_processor = None
+
+
+def tokenize(text):
+    """Lowercase, strip URLs/mentions/punctuation and split into tokens"""
+    text = text.lower()
+    text = URL_PATTERN.sub('', text)
+    text = MENTION_PATTERN.sub('', text)
+    text = text.translate(PUNCTUATION_TABLE)
+    return text.split()
+
+
+def load_nltk_resources(download=False):
+    """English stopwords and a WordNet lemmatizer from the installed NLTK corpora.
+
+    Missing corpora raise LookupError unless download is set. NLTK is
+    imported here rather than at module level because importing
+    nltk.corpus alone costs seconds of startup.
+    """
+    import nltk
+    from nltk.corpus import stopwords
+    from nltk.stem import WordNetLemmatizer
+
+    if download:
+        for resource in ['stopwords', 'wordnet']:
+            try:
+                nltk.data.find(f'corpora/{resource}')
+            except LookupError:
+                nltk.download(resource, quiet=True)
+    return set(stopwords.words('english')), WordNetLemmatizer()
+
+
+class BundleLemmatizer:
+    """WordNetLemmatizer().lemmatize for any word, from the bundle's frozen noun data.
+
+    Applies WordNet's noun exception list and suffix rules and keeps the
+    shortest candidate that is a WordNet noun, as NLTK's morphy does.
+    """
+
+    def __init__(self, nouns, exceptions):
+        self.nouns = frozenset(nouns)
+        self.exceptions = exceptions
+
+    def lemmatize(self, word):
+        if word in self.exceptions:
+            candidates = self.exceptions[word]
+        else:
+            candidates = [word[:-len(old)] + new for old, new in NOUN_SUFFIX_RULES if word.endswith(old)]
+        known = [form for form in [word] + candidates if form in self.nouns]
+        return min(known, key=len) if known else word
+
+
+def build_resource_bundle(data_path, bundle_path=RESOURCE_BUNDLE):
+    """Freeze stopwords and lemmas into a JSON bundle.
+
+    Needs the NLTK corpora once, on a connected machine. The training
+    vocabulary gets a precomputed lemma table (only words whose lemma
+    differs from the word itself). WordNet's noun lemmas and noun
+    exceptions are stored too, so BundleLemmatizer can lemmatize words
+    the training data never contained.
+    """
+    import pandas as pd
+    from nltk.corpus import wordnet
+
+    stop_words, lemmatizer = load_nltk_resources(download=True)
+    vocabulary = set()
+    for message in pd.read_csv(data_path)['message'].astype(str):
+        vocabulary.update(word for word in tokenize(message) if word not in stop_words)
+
+    lemmas = {}
+    for word in sorted(vocabulary):
+        lemma = lemmatizer.lemmatize(word)
+        if lemma != word:
+            lemmas[word] = lemma
+
+    # Tokens never contain punctuation, so lemmas with any can't match
+    punctuation = set(string.punctuation)
+    nouns = sorted(noun for noun in wordnet.all_lemma_names('n') if not punctuation & set(noun))
+    exceptions = {word: forms for word, forms in wordnet._exception_map['n'].items()
+                  if not punctuation & set(word)}
+
+    with open(bundle_path, 'w') as f:
+        json.dump({'stopwords': sorted(stop_words), 'lemmas': lemmas,
+                   'nouns': nouns, 'noun_exceptions': exceptions}, f, separators=(',', ':'))
+    print(f"Resource bundle with {len(vocabulary)} words saved to {bundle_path}")
+    return bundle_path
+
+
+def _init_worker(model_path, resource_path):
+    """Load one processor per pool worker"""
+    global _worker_processor
+    _worker_processor = EmergencyMessageProcessor(model_path, resource_path)
+    _worker_processor.model = joblib.load(model_path)
+
+
+def _predict_chunk(messages):
+    return _worker_processor.predict_batch(messages, n_jobs=1)
+
+
+def _init_cleaner(resource_path):
+    """Text cleaning only, no classifier is loaded"""
+    global _worker_processor
+    _worker_processor = EmergencyMessageProcessor(None, resource_path)
+
+
+def _clean_chunk(messages):
+    return [_worker_processor.clean_text(message) for message in messages]
+
+
+def build_streaming_model():
+    """Stateless hashing vectorizer + partial_fit linear SVM.
+
+    Nothing in the vectorizer depends on the data, so the model can be
+    trained chunk by chunk and updated later with new labelled messages.
+    """
+    from sklearn.feature_extraction.text import HashingVectorizer
+    from sklearn.linear_model import SGDClassifier
+    from sklearn.pipeline import Pipeline
+
+    return Pipeline([
+        ('hashing', HashingVectorizer(n_features=HASH_FEATURES, ngram_range=(1, 2),
+                                      alternate_sign=False)),
+        ('clf', SGDClassifier(loss='hinge', alpha=1e-5))
+    ])
 
 class EmergencyMessageProcessor:
-    def __init__(self, model_path):
+    def __init__(self, model_path, resource_path=RESOURCE_BUNDLE, lemma_cache_size=LEMMA_CACHE_SIZE):
         self.model_path = model_path
-        self.lemmatizer = WordNetLemmatizer()
-        self.stop_words = set(stopwords.words('english'))
+        self.resource_path = resource_path
         self.model = None
+        self.lemmas = {}  # Precomputed token -> lemma table from the bundle
+        self.lemma_cache = OrderedDict()  # LRU of lemmas computed at runtime
+        self.lemma_cache_size = lemma_cache_size
+        self._pool = None  # Prediction workers, kept between predict_batch calls
+        self._pool_jobs = None
+
+        if resource_path:
+            # Offline bundle: no NLTK import, no corpus loading, no network
+            if not os.path.exists(resource_path):
+                raise FileNotFoundError(
+                    f"NLP resource bundle not found at {resource_path}. Build it once on a machine "
+                    f"with the NLTK corpora: build_resource_bundle('backend/data/emergency_messages.csv')")
+            with open(resource_path) as f:
+                bundle = json.load(f)
+            self.stop_words = frozenset(bundle['stopwords'])
+            self.lemmas = bundle['lemmas']
+            # Bundles without WordNet noun data leave unseen words unlemmatized
+            self.lemmatizer = (BundleLemmatizer(bundle['nouns'], bundle['noun_exceptions'])
+                               if 'nouns' in bundle else None)
+        else:
+            # Installed NLTK corpora, never downloaded here
+            self.stop_words, self.lemmatizer = load_nltk_resources()
+
+    def lemmatize(self, word):
+        lemma = self.lemmas.get(word)
+        if lemma is not None:
+            return lemma
+        if self.lemmatizer is None:
+            return word
+
+        lemma = self.lemma_cache.get(word)
+        if lemma is None:
+            lemma = self.lemmatizer.lemmatize(word)
+            self.lemma_cache[word] = lemma
+            if len(self.lemma_cache) > self.lemma_cache_size:
+                self.lemma_cache.popitem(last=False)
+        else:
+            self.lemma_cache.move_to_end(word)
+        return lemma
 
     def clean_text(self, text):
-        text = text.lower()
-        text = re.sub(r'http\S+|www\S+|https\S+', '', text)
-        text = re.sub(r'\@\w+|\#', '', text)
-        text = text.translate(str.maketrans('', '', string.punctuation))
-        tokens = text.split()
-        tokens = [self.lemmatizer.lemmatize(word) for word in tokens if word not in self.stop_words]
+        tokens = [self.lemmatize(word) for word in tokenize(text) if word not in self.stop_words]
         return ' '.join(tokens)
 
     def train_model(self, data_path):
+        # Training-only imports, kept out of the scoring workers' startup path
+        import pandas as pd
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.pipeline import Pipeline
+        from sklearn.svm import LinearSVC
+
         df = pd.read_csv(data_path)
         df['clean_text'] = df['message'].apply(self.clean_text)
         
@@ -39,14 +216,164 @@ class EmergencyMessageProcessor:
         ])
         
         self.model.fit(df['clean_text'], df['category'])
-        joblib.dump(self.model, self.model_path)
+        self._save_model()
         print(f"Model trained and saved to {self.model_path}")
 
-    def predict_category(self, message):
+    def _clean_many(self, messages, pool=None, n_parts=1):
+        if pool is None or not messages:
+            return [self.clean_text(message) for message in messages]
+        size = -(-len(messages) // n_parts)
+        parts = [messages[i:i + size] for i in range(0, len(messages), size)]
+        return [text for part in pool.map(_clean_chunk, parts) for text in part]
+
+    def _partial_fit(self, cleaned, categories, classes=None):
+        features = self.model.named_steps['hashing'].transform(cleaned)
+        self.model.named_steps['clf'].partial_fit(features, categories, classes=classes)
+
+    def train_model_streaming(self, data_path, chunksize=TRAIN_CHUNKSIZE, n_jobs=1,
+                              classes=None, epochs=1):
+        """Out-of-core training for archives that don't fit in memory.
+
+        The CSV is read chunksize rows at a time, cleaned in n_jobs worker
+        processes and fed to SGDClassifier.partial_fit through a hashing
+        vectorizer. Only one chunk is held in memory. If classes is not
+        given, the category column is scanned once up front since
+        partial_fit must see every label on the first call.
+        """
+        import pandas as pd
+
+        if classes is None:
+            labels = set()
+            for chunk in pd.read_csv(data_path, usecols=['category'], chunksize=chunksize):
+                labels.update(chunk['category'].astype(str))
+            classes = sorted(labels)
+        classes = np.asarray(classes)
+
+        self.model = build_streaming_model()
+        n_parts = (os.cpu_count() or 1) if n_jobs == -1 else n_jobs
+        pool = None
+        if n_parts != 1:
+            pool = ProcessPoolExecutor(max_workers=n_parts, initializer=_init_cleaner,
+                                       initargs=(self.resource_path,))
+
+        rows = 0
+        try:
+            for _ in range(epochs):
+                for chunk in pd.read_csv(data_path, chunksize=chunksize):
+                    cleaned = self._clean_many(chunk['message'].astype(str).tolist(), pool, n_parts)
+                    self._partial_fit(cleaned, chunk['category'].astype(str).values, classes)
+                    rows += len(chunk)
+        finally:
+            if pool:
+                pool.shutdown()
+
+        self._save_model()
+        print(f"Model trained on {rows} rows ({epochs} epoch(s)) and saved to {self.model_path}")
+
+    def update_model(self, messages, categories, save=True):
+        """Fold new labelled messages into the saved streaming model.
+
+        Only models from train_model_streaming can be updated; labels must
+        be among the classes the model was trained with.
+        """
         if not self.model:
             self.model = joblib.load(self.model_path)
-        cleaned = self.clean_text(message)
-        return self.model.predict([cleaned])[0]
+        if 'hashing' not in self.model.named_steps:
+            raise ValueError("Model does not support incremental updates, retrain with train_model_streaming")
+
+        categories = np.asarray(categories).astype(str)
+        unknown = set(categories.tolist()) - set(self.model.named_steps['clf'].classes_.tolist())
+        if unknown:
+            raise ValueError(f"Unknown categories {sorted(unknown)}, a full retrain is needed")
+
+        self._partial_fit(self._clean_many(list(messages)), categories)
+        if save:
+            self._save_model()
+            print(f"Model updated with {len(categories)} messages and saved to {self.model_path}")
+
+    def update_model_from_csv(self, data_path, chunksize=TRAIN_CHUNKSIZE):
+        """update_model for a CSV of new messages, read in chunks"""
+        import pandas as pd
+
+        rows = 0
+        for chunk in pd.read_csv(data_path, chunksize=chunksize):
+            self.update_model(chunk['message'].astype(str).tolist(), chunk['category'], save=False)
+            rows += len(chunk)
+        self._save_model()
+        print(f"Model updated with {rows} messages and saved to {self.model_path}")
+
+    def _save_model(self):
+        joblib.dump(self.model, self.model_path)
+        self.close()  # Prediction workers loaded the previous model file
+
+    def _prediction_pool(self, n_jobs):
+        """Worker pool for predict_batch, started once per n_jobs setting"""
+        if self._pool is None or self._pool_jobs != n_jobs:
+            self.close()
+            self._pool = ProcessPoolExecutor(max_workers=None if n_jobs == -1 else n_jobs,
+                                             initializer=_init_worker,
+                                             initargs=(self.model_path, self.resource_path))
+            self._pool_jobs = n_jobs
+        return self._pool
+
+    def close(self):
+        """Shut down the predict_batch worker pool, if one was started"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = self._pool_jobs = None
+
+    def predict_batch(self, messages, n_jobs=1, chunk_size=5000):
+        """Classify many messages at once.
+
+        Messages are cleaned with the shared lemma cache, vectorized in one
+        sparse TF-IDF transform and scored with a single decision_function
+        call. With n_jobs > 1 and more than chunk_size messages, chunks are
+        classified in a process pool that stays up for later calls until
+        close() is called.
+
+        Returns:
+            dict: 'categories' (list, input order), 'scores' (decision
+            function values, one row per message) and 'classes'
+        """
+        if not self.model:
+            self.model = joblib.load(self.model_path)
+        messages = list(messages)
+        if not messages:
+            classes = self.model.named_steps['clf'].classes_
+            shape = (0,) if len(classes) == 2 else (0, len(classes))  # As decision_function would
+            return {'categories': [], 'scores': np.zeros(shape), 'classes': classes.tolist()}
+
+        if n_jobs != 1 and len(messages) > chunk_size:
+            chunks = [messages[i:i + chunk_size] for i in range(0, len(messages), chunk_size)]
+            results = list(self._prediction_pool(n_jobs).map(_predict_chunk, chunks))
+            return {
+                'categories': [c for result in results for c in result['categories']],
+                'scores': np.concatenate([result['scores'] for result in results]),
+                'classes': results[0]['classes']
+            }
+
+        cleaned = [self.clean_text(message) for message in messages]
+        features = self.model[:-1].transform(cleaned)  # TF-IDF or hashing vectorizer
+        clf = self.model.named_steps['clf']
+        scores = clf.decision_function(features)
+        if scores.ndim == 1:
+            indices = (scores > 0).astype(int)  # Binary LinearSVC: positive -> classes_[1]
+        else:
+            indices = scores.argmax(axis=1)
+        return {
+            'categories': clf.classes_[indices].tolist(),
+            'scores': scores,
+            'classes': clf.classes_.tolist()
+        }
+
+    def predict_cleaned(self, cleaned_texts):
+        """Classify texts that already went through clean_text"""
+        if not self.model:
+            self.model = joblib.load(self.model_path)
+        return self.model.predict(cleaned_texts)
+
+    def predict_category(self, message):
+        return self.predict_cleaned([self.clean_text(message)])[0]
 
 if __name__ == "__main__":
     # ABSOLUTE PATHS - CHANGE ONLY THESE IF NEEDED
@@ -54,13 +381,13 @@ if __name__ == "__main__":
     MODEL_PATH = os.path.join(BASE_DIR, "backend/scripts/model-training/nlp/emergency_classifier.joblib")
     DATA_PATH = os.path.join(BASE_DIR, "backend/data/emergency_messages.csv")
     
-    # Initialize and train
-    processor = EmergencyMessageProcessor(MODEL_PATH)
-    
     if not os.path.exists(DATA_PATH):
         print(f"ERROR: Create this file first: {DATA_PATH}")
         print("With content like:\nmessage,category\n\"Need help\",\"medical\"")
     else:
+        # Refresh the offline bundle, then initialize and train with it
+        build_resource_bundle(DATA_PATH)
+        processor = EmergencyMessageProcessor(MODEL_PATH)
         processor.train_model(DATA_PATH)
         print("\nTest predictions:")
         test_msgs = ["Need medicine", "Food running out", "People trapped"]
@@ -0,0 +1,127 @@
+# backend/scripts/model-training/ortools/benchmark_routing.py
+
+import argparse
+import time
+import numpy as np
+from route_optimization import EmergencyRouteOptimizer, battery_ranges
+
+
+def random_instance(optimizer, num_stops, num_vehicles, seed=42):
+    """Fill an optimizer with random relief points around the Delhi depot"""
+    rng = np.random.default_rng(seed)
+    lats = 28.6139 + rng.normal(0, 0.05, num_stops)
+    lngs = 77.2090 + rng.normal(0, 0.05, num_stops)
+    lats[0], lngs[0] = 28.6139, 77.2090
+
+    optimizer.locations = [
+        {'name': 'Depot' if i == 0 else f'Stop {i}', 'lat': float(lat), 'lng': float(lng)}
+        for i, (lat, lng) in enumerate(zip(lats, lngs))
+    ]
+    optimizer.demands = [0] + rng.integers(1, 20, num_stops - 1).tolist()
+    total_demand = sum(optimizer.demands)
+    capacity = int(np.ceil(total_demand / num_vehicles * 1.2))
+    optimizer.vehicle_capacities = [capacity] * num_vehicles
+    optimizer.num_vehicles = num_vehicles
+    return optimizer
+
+
+def run_solve(num_stops, num_vehicles, use_matrix_callbacks, time_limit):
+    """Solve one instance and count search work done within the time limit"""
+    optimizer = random_instance(
+        EmergencyRouteOptimizer(time_limit=time_limit,
+                                use_matrix_callbacks=use_matrix_callbacks),
+        num_stops, num_vehicles)
+
+    distance_matrix = optimizer.create_distance_matrix()
+    manager, routing = optimizer.build_routing_model(distance_matrix)
+
+    solutions = [0]
+
+    def on_solution():
+        solutions[0] += 1
+
+    routing.AddAtSolutionCallback(on_solution)
+
+    start = time.perf_counter()
+    solution = routing.SolveWithParameters(optimizer.search_parameters())
+    elapsed = time.perf_counter() - start
+
+    return {
+        'mode': 'matrix' if use_matrix_callbacks else 'python',
+        'seconds': elapsed,
+        'branches': routing.solver().Branches(),
+        'solutions': solutions[0],
+        'objective_km': solution.ObjectiveValue() / optimizer.distance_scale if solution else None
+    }
+
+
+def add_constraints(optimizer, dimensions, seed=42):
+    """Switch on multi-depot, time-window and range constraints in order"""
+    rng = np.random.default_rng(seed)
+    n, v = len(optimizer.locations), optimizer.num_vehicles
+    if 'multi_depot' in dimensions:
+        depots = [0, 1, 2]
+        for depot in depots:
+            optimizer.demands[depot] = 0
+        optimizer.starts = optimizer.ends = [depots[i % len(depots)] for i in range(v)]
+    if 'time_windows' in dimensions:
+        opens = rng.integers(0, 360, n)
+        optimizer.time_windows = np.column_stack([opens, opens + 180]).tolist()
+        for depot in set(optimizer.starts or [0]):
+            optimizer.time_windows[depot] = [0, 720]
+        optimizer.service_times = [0 if i in (optimizer.starts or [0]) else 5 for i in range(n)]
+    if 'range' in dimensions:
+        optimizer.vehicle_ranges_km = battery_ranges(rng.integers(60, 101, v), 150)
+    return optimizer
+
+
+def run_dimension_solve(num_stops, num_vehicles, dimensions, time_limit):
+    """Solve with the given constraint dimensions and report time and quality"""
+    optimizer = add_constraints(random_instance(
+        EmergencyRouteOptimizer(time_limit=time_limit), num_stops, num_vehicles), dimensions)
+
+    start = time.perf_counter()
+    routes = optimizer.optimize_routes()
+    elapsed = time.perf_counter() - start
+
+    return {
+        'dimensions': '+'.join(('capacity',) + tuple(dimensions)),
+        'seconds': elapsed,
+        'total_km': sum(route['distance_km'] for route in routes) if routes else None,
+        'vehicles_used': sum(len(route['stops']) > 1 for route in routes) if routes else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark EmergencyRouteOptimizer solver settings')
+    parser.add_argument('--stops', type=int, nargs='+', default=[100, 500, 1000])
+    parser.add_argument('--vehicles', type=int, default=10)
+    parser.add_argument('--time-limit', type=int, default=5)
+    parser.add_argument('--dimensions', action='store_true',
+                        help='Report the cost of multi-depot, time-window and range constraints')
+    args = parser.parse_args()
+
+    if args.dimensions:
+        steps = [(), ('multi_depot',), ('multi_depot', 'time_windows'),
+                 ('multi_depot', 'time_windows', 'range')]
+        print(f"{'stops':>6} {'seconds':>8} {'total_km':>10} {'vehicles':>9}  dimensions")
+        for num_stops in args.stops:
+            for dimensions in steps:
+                result = run_dimension_solve(num_stops, args.vehicles, dimensions, args.time_limit)
+                total = f"{result['total_km']:.2f}" if result['total_km'] is not None else '-'
+                used = result['vehicles_used'] if result['vehicles_used'] is not None else '-'
+                print(f"{num_stops:>6} {result['seconds']:>8.2f} {total:>10} {used:>9}  "
+                      f"{result['dimensions']}")
+        return
+
+    print(f"{'stops':>6} {'mode':>7} {'seconds':>8} {'branches':>10} {'solutions':>10} {'objective_km':>13}")
+    for num_stops in args.stops:
+        for use_matrix in (False, True):
+            result = run_solve(num_stops, args.vehicles, use_matrix, args.time_limit)
+            objective = f"{result['objective_km']:.2f}" if result['objective_km'] is not None else '-'
+            print(f"{num_stops:>6} {result['mode']:>7} {result['seconds']:>8.2f} "
+                  f"{result['branches']:>10} {result['solutions']:>10} {objective:>13}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,36 +2,296 @@
 
 from ortools.constraint_solver import routing_enums_pb2
 from ortools.constraint_solver import pywrapcp
+from concurrent.futures import ProcessPoolExecutor
+from sklearn.neighbors import BallTree
+import numpy as np
+import hashlib
 import math
 import json
 import os
 
+EARTH_RADIUS_KM = 6371
+DISTANCE_SCALE = 1000  # Integer arc costs are metres (km * 1000)
+DEFAULT_SPEED_KMH = 40  # Used to turn distances into travel minutes
+
+
+def coordinates_array(locations):
+    """Stack location dicts into an (n, 2) float64 array of [lat, lng]"""
+    return np.array([[loc['lat'], loc['lng']] for loc in locations],
+                    dtype=np.float64).reshape(-1, 2)
+
+
+def haversine_matrix(origins, destinations=None):
+    """Great-circle distances (in km) between every origin/destination pair.
+
+    Args:
+        origins: (n, 2) array of [lat, lng] in degrees
+        destinations: (m, 2) array, defaults to ``origins``
+
+    Returns:
+        (n, m) float64 array of distances in km
+    """
+    if destinations is None:
+        destinations = origins
+    return haversine_pairs(origins[:, None, :], destinations[None, :, :])
+
+
+def haversine_pairs(origins, destinations):
+    """Element-wise great-circle distances (in km) between broadcastable
+    arrays of [lat, lng] pairs in degrees"""
+    lat1 = np.radians(origins[..., 0])
+    lon1 = np.radians(origins[..., 1])
+    lat2 = np.radians(destinations[..., 0])
+    lon2 = np.radians(destinations[..., 1])
+
+    a = (np.sin((lat2 - lat1) / 2) ** 2 +
+         np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    a = np.clip(a, 0.0, 1.0)
+    return EARTH_RADIUS_KM * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+def scale_distances(distances_km, scale=DISTANCE_SCALE):
+    """Round km distances to the integer costs OR-Tools expects"""
+    return np.rint(distances_km * scale).astype(np.int64)
+
+
+def knn_graph(coords, k, depot=0, scale=DISTANCE_SCALE):
+    """Sparse candidate arc graph in CSR form.
+
+    Every node keeps arcs to its ``k`` nearest neighbours (found with a
+    haversine BallTree), arcs are made symmetric, and the depot is linked to
+    and from every node. Memory is O(n * k) instead of O(n^2).
+
+    Returns:
+        tuple: (indptr, indices, costs) with row ``i`` holding the arcs out of
+        node ``i`` in ``indices[indptr[i]:indptr[i + 1]]`` and their integer
+        costs in ``costs``
+    """
+    n = len(coords)
+    k = max(0, min(k, n - 1))
+    tree = BallTree(np.radians(coords), metric='haversine')
+    neighbours = tree.query(np.radians(coords), k=k + 1, return_distance=False)
+
+    nodes = np.arange(n)
+    rows = np.concatenate([np.repeat(nodes, k + 1), np.full(n, depot), nodes])
+    cols = np.concatenate([neighbours.ravel(), nodes, np.full(n, depot)])
+    rows, cols = np.concatenate([rows, cols]), np.concatenate([cols, rows])
+
+    keys = np.unique(rows[rows != cols] * n + cols[rows != cols])
+    rows, cols = np.divmod(keys, n)
+    costs = scale_distances(haversine_pairs(coords[rows], coords[cols]), scale)
+    indptr = np.searchsorted(rows, np.arange(n + 1))
+    return indptr, cols, costs
+
+
+def battery_ranges(battery_levels, max_range_km):
+    """Remaining range (km) per drone from ``drones.battery_level`` percentages.
+
+    Args:
+        battery_levels: Battery percentage per vehicle (0-100)
+        max_range_km: Full-charge range, scalar or one value per vehicle
+    """
+    levels = np.clip(np.asarray(battery_levels, dtype=np.float64), 0, 100)
+    return (levels / 100 * np.broadcast_to(max_range_km, levels.shape)).tolist()
+
+
+def matrix_cache_key(coords, scale=DISTANCE_SCALE):
+    """Content hash of a coordinate set, used to name cached matrices"""
+    digest = hashlib.sha1(np.ascontiguousarray(coords, dtype=np.float64).tobytes())
+    digest.update(str(scale).encode())
+    return digest.hexdigest()
+
+
+def _project(points):
+    """Equirectangular projection so lat/lng degrees count the same distance"""
+    return np.column_stack([
+        points[:, 1] * np.cos(np.radians(points[:, 0].mean())),
+        points[:, 0]
+    ])
+
+
+def _centroids(xy, labels, weights, k):
+    """Weighted centroid of every cluster label in ``range(k)``"""
+    totals = np.maximum(np.bincount(labels, weights=weights, minlength=k), 1e-12)
+    return np.column_stack([
+        np.bincount(labels, weights=weights * xy[:, axis], minlength=k) / totals
+        for axis in range(2)
+    ])
+
+
+def weighted_kmeans(points, weights, k, iterations=50, seed=0):
+    """Cluster lat/lng points with k-means, weighting centroids by demand.
+
+    Returns:
+        (n,) int array of cluster labels
+    """
+    rng = np.random.default_rng(seed)
+    xy = _project(points)
+    weights = np.asarray(weights, dtype=np.float64)
+
+    # k-means++ seeding, sampling proportionally to weight * distance^2
+    centroids = [xy[rng.choice(len(xy), p=weights / weights.sum())]]
+    for _ in range(1, k):
+        d2 = ((xy[:, None, :] - np.array(centroids)[None, :, :]) ** 2).sum(-1).min(1)
+        p = weights * d2
+        if p.sum() == 0:
+            break
+        centroids.append(xy[rng.choice(len(xy), p=p / p.sum())])
+    centroids = np.array(centroids)
+
+    labels = np.zeros(len(xy), dtype=np.int64)
+    for i in range(iterations):
+        d2 = ((xy[:, None, :] - centroids[None, :, :]) ** 2).sum(-1)
+        new_labels = d2.argmin(1)
+        if i > 0 and np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+        occupied = np.bincount(labels, minlength=len(centroids)) > 0
+        centroids[occupied] = _centroids(xy, labels, weights, len(centroids))[occupied]
+    return labels
+
+
+def balance_clusters(points, labels, demands, capacities):
+    """Move boundary stops out of clusters whose demand exceeds their capacity.
+
+    Each move takes the stop that is cheapest to reassign (smallest increase
+    in squared distance to a centroid) into a cluster that still has room.
+
+    Returns:
+        Copy of ``labels`` with overloaded clusters relieved where possible
+    """
+    labels = labels.copy()
+    demands = np.asarray(demands, dtype=np.float64)
+    capacities = np.asarray(capacities, dtype=np.float64)
+    k = len(capacities)
+    xy = _project(points)
+    centroids = _centroids(xy, labels, np.maximum(demands, 1.0), k)
+    load = np.bincount(labels, weights=demands, minlength=k)
+
+    for cluster in np.flatnonzero(load > capacities):
+        members = np.flatnonzero(labels == cluster)
+        d2 = ((xy[members, None, :] - centroids[None, :, :]) ** 2).sum(-1)
+        penalty = d2 - d2[:, cluster:cluster + 1]
+        while load[cluster] > capacities[cluster] and len(members):
+            room = capacities - load
+            room[cluster] = -np.inf
+            fits = demands[members, None] <= room[None, :]
+            if not fits.any():
+                break
+            masked = np.where(fits, penalty, np.inf)
+            row, target = np.unravel_index(masked.argmin(), masked.shape)
+            labels[members[row]] = target
+            load[cluster] -= demands[members[row]]
+            load[target] += demands[members[row]]
+            members = np.delete(members, row)
+            penalty = np.delete(penalty, row, axis=0)
+    return labels
+
+
+def allocate_vehicles(cluster_demands, vehicle_capacities):
+    """Hand out vehicles to clusters in proportion to unmet demand.
+
+    Largest vehicles are placed first. Every cluster gets at least one
+    vehicle before any cluster gets a second one.
+
+    Returns:
+        list of vehicle id lists, one per cluster
+    """
+    unmet = np.asarray(cluster_demands, dtype=np.float64).copy()
+    allocation = [[] for _ in range(len(unmet))]
+    for vehicle_id in np.argsort(vehicle_capacities, kind='stable')[::-1]:
+        empty = [c for c in range(len(unmet)) if not allocation[c]]
+        candidates = empty if empty else range(len(unmet))
+        cluster = max(candidates, key=lambda c: unmet[c])
+        allocation[cluster].append(int(vehicle_id))
+        unmet[cluster] -= vehicle_capacities[vehicle_id]
+    return allocation
+
+
+def _solve_subproblem(settings, locations, demands, vehicle_capacities):
+    """Solve one cluster in a worker process (depot is always node 0)"""
+    optimizer = EmergencyRouteOptimizer(**settings)
+    optimizer.locations = locations
+    optimizer.demands = demands
+    optimizer.vehicle_capacities = vehicle_capacities
+    optimizer.num_vehicles = len(vehicle_capacities)
+    return optimizer.optimize_routes()
+
+
 class EmergencyRouteOptimizer:
-    def __init__(self):
+    def __init__(self, cache_dir=None, distance_scale=DISTANCE_SCALE,
+                 time_limit=5, use_matrix_callbacks=True, sparse_neighbors=None):
         self.locations = []
         self.demands = []
         self.vehicle_capacities = []
         self.num_vehicles = 0
         self.depot = 0  # Index of the depot location
+        self.cache_dir = cache_dir  # Directory for memory-mapped distance matrices
+        self.distance_scale = distance_scale
+        self.time_limit = time_limit  # Solver time limit in seconds
+        self.use_matrix_callbacks = use_matrix_callbacks
+        self.distance_matrix = None  # Matrix of the last solve, reused by reoptimize_routes
+        self.sparse_neighbors = sparse_neighbors  # k for the sparse candidate graph, None = dense
+
+        # Optional constraints (dense mode only)
+        self.starts = None  # Per-vehicle start location index for multi-depot
+        self.ends = None  # Per-vehicle end location index for multi-depot
+        self.time_windows = None  # Per-location [earliest, latest] minutes
+        self.service_times = None  # Per-location service minutes
+        self.vehicle_speed_kmh = DEFAULT_SPEED_KMH
+        self.vehicle_ranges_km = None  # Per-vehicle range left on the battery
 
     def load_locations(self, locations_file):
         """Load locations from JSON file"""
         with open(locations_file) as f:
-            data = json.load(f)
-            self.locations = data['locations']
-            self.demands = data['demands']
-            self.vehicle_capacities = data['vehicle_capacities']
-            self.num_vehicles = len(self.vehicle_capacities)
+            self.load_problem(json.load(f))
+
+    def load_problem(self, data):
+        """Load a problem dict shaped like delivery_locations.json"""
+        self.locations = data['locations']
+        self.demands = data['demands']
+        self.vehicle_capacities = data['vehicle_capacities']
+        self.num_vehicles = len(self.vehicle_capacities)
+        self.distance_matrix = None
+
+        self.starts = data.get('starts')
+        self.ends = data.get('ends', self.starts)
+        self.time_windows = data.get('time_windows')
+        self.service_times = data.get('service_times')
+        self.vehicle_speed_kmh = data.get('vehicle_speed_kmh', DEFAULT_SPEED_KMH)
+        self.vehicle_ranges_km = data.get('vehicle_ranges_km')
+        if self.vehicle_ranges_km is None and 'battery_levels' in data:
+            self.vehicle_ranges_km = battery_ranges(data['battery_levels'], data['max_range_km'])
+
+    @property
+    def has_constraints(self):
+        """True when multi-depot, time-window or range constraints are set"""
+        return bool(self.starts or self.ends or self.time_windows or self.vehicle_ranges_km)
 
     def create_distance_matrix(self):
-        """Create distance matrix between all locations"""
-        matrix = []
-        for from_loc in self.locations:
-            row = []
-            for to_loc in self.locations:
-                row.append(self.haversine_distance(from_loc, to_loc))
-            matrix.append(row)
-        return matrix
+        """Create integer distance matrix between all locations.
+
+        Distances are computed in a single NumPy broadcast and scaled by
+        ``distance_scale`` (metres by default). When ``cache_dir`` is set the
+        matrix is stored as ``<coordinate hash>.npy`` and memory-mapped back
+        on later calls with the same site set.
+        """
+        coords = coordinates_array(self.locations)
+        if not self.cache_dir:
+            return scale_distances(haversine_matrix(coords), self.distance_scale)
+
+        key = matrix_cache_key(coords, self.distance_scale)
+        cache_path = os.path.join(self.cache_dir, f"{key}.npy")
+        if os.path.exists(cache_path):
+            return np.load(cache_path, mmap_mode='r')
+
+        matrix = scale_distances(haversine_matrix(coords), self.distance_scale)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.save(f, matrix)
+        os.replace(tmp_path, cache_path)  # Atomic publish for concurrent solvers
+        return np.load(cache_path, mmap_mode='r')
 
     def haversine_distance(self, loc1, loc2):
         """Calculate distance between two coordinates (in km)"""
@@ -47,30 +307,201 @@ class EmergencyRouteOptimizer:
         c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
         return R * c
 
-    def optimize_routes(self):
-        """Solve the routing problem"""
-        distance_matrix = self.create_distance_matrix()
-        
-        # Create routing model
-        manager = pywrapcp.RoutingIndexManager(
-            len(self.locations), self.num_vehicles, self.depot)
-        routing = pywrapcp.RoutingModel(manager)
+    def register_callbacks(self, manager, routing, distance_matrix):
+        """Register distance and demand evaluators with the routing model.
+
+        The precomputed integer arrays are handed to OR-Tools directly so the
+        solver reads arc costs natively instead of calling back into Python.
+        Per-arc Python closures are only used when matrix callbacks are
+        disabled or unavailable in the installed OR-Tools.
+
+        Returns:
+            tuple: (transit_callback_index, demand_callback_index)
+        """
+        return (self.register_matrix(manager, routing, distance_matrix),
+                self.register_vector(manager, routing, self.demands))
+
+    def register_matrix(self, manager, routing, matrix):
+        """Register a node-indexed integer matrix as a transit evaluator"""
+        if self.use_matrix_callbacks and hasattr(routing, 'RegisterTransitMatrix'):
+            return routing.RegisterTransitMatrix(np.asarray(matrix, dtype=np.int64).tolist())
 
         # Define distance callback
-        def distance_callback(from_index, to_index):
+        def transit_callback(from_index, to_index):
             from_node = manager.IndexToNode(from_index)
             to_node = manager.IndexToNode(to_index)
-            return distance_matrix[from_node][to_node]
+            return int(matrix[from_node, to_node])
 
-        transit_callback_index = routing.RegisterTransitCallback(distance_callback)
-        routing.SetArcCostEvaluatorOfAllVehicles(transit_callback_index)
+        return routing.RegisterTransitCallback(transit_callback)
+
+    def register_vector(self, manager, routing, values):
+        """Register a node-indexed integer vector as a unary transit evaluator"""
+        if self.use_matrix_callbacks and hasattr(routing, 'RegisterUnaryTransitVector'):
+            return routing.RegisterUnaryTransitVector([int(v) for v in values])
 
         # Add capacity constraints
-        def demand_callback(from_index):
+        def unary_callback(from_index):
             from_node = manager.IndexToNode(from_index)
-            return self.demands[from_node]
+            return int(values[from_node])
+
+        return routing.RegisterUnaryTransitCallback(unary_callback)
+
+    def build_routing_model(self, distance_matrix):
+        """Create the index manager and routing model with all dimensions"""
+        if self.starts or self.ends:
+            manager = pywrapcp.RoutingIndexManager(
+                len(self.locations), self.num_vehicles,
+                list(self.starts or [self.depot] * self.num_vehicles),
+                list(self.ends or [self.depot] * self.num_vehicles))
+        else:
+            manager = pywrapcp.RoutingIndexManager(
+                len(self.locations), self.num_vehicles, self.depot)
+        routing = pywrapcp.RoutingModel(manager)
+
+        transit_callback_index, demand_callback_index = self.register_callbacks(
+            manager, routing, distance_matrix)
+        routing.SetArcCostEvaluatorOfAllVehicles(transit_callback_index)
 
-        demand_callback_index = routing.RegisterUnaryTransitCallback(demand_callback)
+        self.add_capacity_dimension(routing, demand_callback_index)
+        if self.time_windows:
+            self.add_time_dimension(manager, routing, distance_matrix)
+        if self.vehicle_ranges_km:
+            self.add_range_dimension(routing, transit_callback_index)
+        return manager, routing
+
+    def create_time_matrix(self, distance_matrix):
+        """Integer travel minutes between locations plus service time at the origin"""
+        minutes = np.rint(np.asarray(distance_matrix) * 60 /
+                          (self.vehicle_speed_kmh * self.distance_scale)).astype(np.int64)
+        if self.service_times:
+            minutes += np.asarray(self.service_times, dtype=np.int64)[:, None]
+        np.fill_diagonal(minutes, 0)
+        return minutes
+
+    def add_time_dimension(self, manager, routing, distance_matrix):
+        """Add a 'Time' dimension enforcing per-location time windows"""
+        windows = np.asarray(self.time_windows, dtype=np.int64)
+        horizon = int(windows[:, 1].max())
+        time_callback_index = self.register_matrix(
+            manager, routing, self.create_time_matrix(distance_matrix))
+        routing.AddDimension(
+            time_callback_index,
+            horizon,  # allow waiting at a stop until its window opens
+            horizon,  # latest arrival anywhere
+            False,  # depots may dispatch after time zero
+            'Time')
+        time_dimension = routing.GetDimensionOrDie('Time')
+
+        depots = set(self.starts or []) | set(self.ends or []) | {self.depot}
+        for node, (earliest, latest) in enumerate(windows.tolist()):
+            if node not in depots:
+                time_dimension.CumulVar(manager.NodeToIndex(node)).SetRange(earliest, latest)
+
+        for vehicle_id in range(self.num_vehicles):
+            for index in (routing.Start(vehicle_id), routing.End(vehicle_id)):
+                earliest, latest = windows[manager.IndexToNode(index)].tolist()
+                time_dimension.CumulVar(index).SetRange(earliest, latest)
+            routing.AddVariableMinimizedByFinalizer(
+                time_dimension.CumulVar(routing.Start(vehicle_id)))
+            routing.AddVariableMinimizedByFinalizer(
+                time_dimension.CumulVar(routing.End(vehicle_id)))
+
+    def add_range_dimension(self, routing, transit_callback_index):
+        """Add a 'Range' dimension capping each vehicle's travelled distance
+        by its remaining battery range"""
+        routing.AddDimensionWithVehicleCapacity(
+            transit_callback_index,
+            0,  # no slack, distance only accumulates
+            [int(km * self.distance_scale) for km in self.vehicle_ranges_km],
+            True,  # start cumul to zero
+            'Range')
+
+    def build_sparse_routing_model(self, graph, extra_arcs=()):
+        """Create a routing model restricted to the arcs of a ``knn_graph``.
+
+        Each node's NextVar domain is limited to its candidate neighbours,
+        any ``extra_arcs`` (from_node, to_node) and the route ends, so the
+        solver never considers far-apart arcs. Arc costs are registered
+        natively like the dense model's; the matrix only holds the candidate
+        and extra arcs, every other entry is unreachable through the domains.
+        """
+        indptr, indices, costs = graph
+        n = len(self.locations)
+        manager = pywrapcp.RoutingIndexManager(n, self.num_vehicles, self.depot)
+        routing = pywrapcp.RoutingModel(manager)
+
+        matrix = np.zeros((n, n), dtype=np.int64)
+        matrix[np.repeat(np.arange(n), np.diff(indptr)), indices] = costs
+        if len(extra_arcs):
+            coords = coordinates_array(self.locations)
+            extra_from, extra_to = np.asarray(extra_arcs, dtype=np.int64).reshape(-1, 2).T
+            matrix[extra_from, extra_to] = scale_distances(
+                haversine_pairs(coords[extra_from], coords[extra_to]), self.distance_scale)
+
+        transit_callback_index, demand_callback_index = self.register_callbacks(
+            manager, routing, matrix)
+        routing.SetArcCostEvaluatorOfAllVehicles(transit_callback_index)
+        self.add_capacity_dimension(routing, demand_callback_index)
+
+        extra_successors = {}
+        for from_node, to_node in extra_arcs:
+            extra_successors.setdefault(from_node, []).append(to_node)
+
+        ends = [routing.End(v) for v in range(self.num_vehicles)]
+        for node in range(n):
+            if node == self.depot:
+                continue
+            successors = set(indices[indptr[node]:indptr[node + 1]].tolist())
+            successors.update(extra_successors.get(node, ()))
+            successors.discard(self.depot)
+            routing.NextVar(manager.NodeToIndex(node)).SetValues(
+                [manager.NodeToIndex(j) for j in successors] + ends)
+        return manager, routing
+
+    def sparse_initial_routes(self, graph):
+        """Greedy nearest-neighbour routes that stay on the candidate graph.
+
+        Each vehicle follows the cheapest graph arc to an unvisited stop that
+        still fits its capacity. When a route dead-ends it jumps to the
+        nearest fitting stop overall, and that jump is returned as an extra
+        arc so the seed remains feasible in the restricted model.
+
+        Returns:
+            tuple: (routes, extra_arcs), routes is None if the stops do not
+            fit in the available vehicles
+        """
+        indptr, indices, costs = graph
+        coords = coordinates_array(self.locations)
+        demands = np.asarray(self.demands)
+        unvisited = np.ones(len(self.locations), dtype=bool)
+        unvisited[self.depot] = False
+
+        routes, extra_arcs = [], []
+        for capacity in self.vehicle_capacities:
+            route, load, node = [], 0, self.depot
+            while unvisited.any():
+                row = slice(indptr[node], indptr[node + 1])
+                fits = unvisited[indices[row]] & (demands[indices[row]] <= capacity - load)
+                if fits.any():
+                    next_node = indices[row][fits][costs[row][fits].argmin()]
+                else:
+                    candidates = np.flatnonzero(unvisited & (demands <= capacity - load))
+                    if not len(candidates):
+                        break
+                    next_node = candidates[haversine_pairs(coords[node], coords[candidates]).argmin()]
+                    extra_arcs.append((int(node), int(next_node)))
+                route.append(int(next_node))
+                load += demands[next_node]
+                unvisited[next_node] = False
+                node = next_node
+            routes.append(route)
+
+        if unvisited.any():
+            return None, extra_arcs
+        return routes, extra_arcs
+
+    def add_capacity_dimension(self, routing, demand_callback_index):
+        """Add the vehicle capacity dimension"""
         routing.AddDimensionWithVehicleCapacity(
             demand_callback_index,
             0,  # null capacity slack
@@ -78,25 +509,267 @@ class EmergencyRouteOptimizer:
             True,  # start cumul to zero
             'Capacity')
 
-        # Set search parameters
+    def search_parameters(self, time_limit=None):
+        """Default search strategy used for every solve"""
         search_parameters = pywrapcp.DefaultRoutingSearchParameters()
         search_parameters.first_solution_strategy = (
             routing_enums_pb2.FirstSolutionStrategy.PATH_CHEAPEST_ARC)
         search_parameters.local_search_metaheuristic = (
             routing_enums_pb2.LocalSearchMetaheuristic.GUIDED_LOCAL_SEARCH)
-        search_parameters.time_limit.seconds = 5
+        # Milliseconds, so split budgets (clustered mode) keep their fractions
+        search_parameters.time_limit.FromMilliseconds(int(1000 * (time_limit or self.time_limit)))
+        return search_parameters
+
+    def optimize_routes(self):
+        """Solve the routing problem"""
+        if self.sparse_neighbors:
+            if self.has_constraints:
+                raise ValueError("Sparse mode supports a single depot and capacity only")
+            return self.optimize_routes_sparse()
+
+        distance_matrix = self.create_distance_matrix()
+        self.distance_matrix = distance_matrix
+        
+        # Create routing model
+        manager, routing = self.build_routing_model(distance_matrix)
 
         # Solve the problem
-        solution = routing.SolveWithParameters(search_parameters)
+        solution = routing.SolveWithParameters(self.search_parameters())
 
         # Extract and return routes
         if solution:
             return self.extract_routes(manager, routing, solution)
         return None
 
+    def optimize_routes_sparse(self):
+        """Solve on the k-nearest-neighbour candidate graph.
+
+        Greedy first-solution heuristics tend to dead-end when most arcs are
+        removed, so the search is seeded with ``sparse_initial_routes``.
+        """
+        graph = knn_graph(coordinates_array(self.locations), self.sparse_neighbors,
+                          self.depot, self.distance_scale)
+        routes, extra_arcs = self.sparse_initial_routes(graph)
+        manager, routing = self.build_sparse_routing_model(graph, extra_arcs)
+        search_parameters = self.search_parameters()
+
+        initial = None
+        if routes is not None:
+            routing.CloseModelWithParameters(search_parameters)
+            initial = routing.ReadAssignmentFromRoutes(
+                [[manager.NodeToIndex(node) for node in route] for route in routes], True)
+
+        if initial:
+            solution = routing.SolveFromAssignmentWithParameters(initial, search_parameters)
+        else:
+            solution = routing.SolveWithParameters(search_parameters)
+
+        if solution:
+            return self.extract_routes(manager, routing, solution)
+        return None
+
+    def optimize_routes_clustered(self, num_clusters=None, stops_per_cluster=200,
+                                  max_workers=None):
+        """Cluster-first, route-second solve for large instances.
+
+        Stops are grouped with demand-weighted k-means, vehicles are shared
+        out by capacity, and each cluster is solved as its own routing problem
+        in a process pool. Sub-routes are returned in the same schema as
+        ``extract_routes`` with the original vehicle ids. ``time_limit``
+        bounds the whole solve: clusters that have to wait for a free
+        worker share it, so each gets ``time_limit`` divided by the number
+        of rounds the pool needs.
+
+        Args:
+            num_clusters: Number of clusters, defaults to one per
+                ``stops_per_cluster`` stops (capped at ``num_vehicles``)
+            stops_per_cluster: Target cluster size when ``num_clusters`` is unset
+            max_workers: Process pool size, defaults to the CPU count;
+                1 solves the clusters sequentially in this process
+        """
+        if self.has_constraints:
+            raise ValueError("Clustered mode supports a single depot and capacity only")
+        stops = np.array([i for i in range(len(self.locations)) if i != self.depot])
+        if num_clusters is None:
+            num_clusters = math.ceil(len(stops) / stops_per_cluster)
+        num_clusters = max(1, min(num_clusters, self.num_vehicles, len(stops)))
+        if num_clusters == 1:
+            return self.optimize_routes()
+
+        demands = np.asarray(self.demands, dtype=np.float64)
+        coords = coordinates_array(self.locations)[stops]
+        labels = weighted_kmeans(coords, np.maximum(demands[stops], 1.0), num_clusters)
+        labels = np.unique(labels, return_inverse=True)[1].ravel()  # Drop empty clusters
+        num_clusters = labels.max() + 1
+
+        allocation = allocate_vehicles(
+            np.bincount(labels, weights=demands[stops], minlength=num_clusters),
+            self.vehicle_capacities)
+        labels = balance_clusters(
+            coords, labels, demands[stops],
+            [sum(self.vehicle_capacities[v] for v in vehicle_ids) for vehicle_ids in allocation])
+        clusters = [stops[labels == c] for c in range(num_clusters)]
+
+        rounds = math.ceil(num_clusters / (max_workers or os.cpu_count() or 1))
+        settings = {
+            'cache_dir': self.cache_dir,
+            'distance_scale': self.distance_scale,
+            'time_limit': self.time_limit / rounds,
+            'use_matrix_callbacks': self.use_matrix_callbacks,
+            'sparse_neighbors': self.sparse_neighbors
+        }
+        subproblems = [
+            (settings,
+             [self.locations[self.depot]] + [self.locations[i] for i in members],
+             [self.demands[self.depot]] + [self.demands[i] for i in members],
+             [self.vehicle_capacities[v] for v in vehicle_ids])
+            for members, vehicle_ids in zip(clusters, allocation)
+        ]
+        if max_workers == 1:
+            results = [_solve_subproblem(*subproblem) for subproblem in subproblems]
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+                futures = [pool.submit(_solve_subproblem, *subproblem) for subproblem in subproblems]
+                results = [future.result() for future in futures]
+
+        if any(result is None for result in results):
+            return None
+
+        # Stitch sub-routes back together under their global vehicle ids
+        routes = []
+        for sub_routes, vehicle_ids in zip(results, allocation):
+            for route in sub_routes:
+                route['vehicle_id'] = vehicle_ids[route['vehicle_id']]
+                routes.append(route)
+        return sorted(routes, key=lambda route: route['vehicle_id'])
+
+    def update_distance_matrix(self, added_locations=(), removed_names=()):
+        """Apply stop additions/removals to the last distance matrix.
+
+        Rows and columns of removed stops are dropped and only the rows and
+        columns of new stops are computed; the rest of the matrix is reused.
+        Updates ``locations``, ``demands`` (new stops get demand 0 until set)
+        and ``depot`` to the new node numbering.
+        """
+        removed_names = set(removed_names)
+        keep = [i for i, loc in enumerate(self.locations) if loc['name'] not in removed_names]
+        if self.depot not in keep:
+            raise ValueError("The depot cannot be removed")
+
+        previous = self.distance_matrix
+        if previous is None or len(previous) != len(self.locations):
+            previous = self.create_distance_matrix()
+
+        self.depot = keep.index(self.depot)
+        self.locations = [self.locations[i] for i in keep] + list(added_locations)
+        self.demands = [self.demands[i] for i in keep] + [0] * len(added_locations)
+
+        size = len(self.locations)
+        matrix = np.empty((size, size), dtype=np.int64)
+        matrix[:len(keep), :len(keep)] = np.asarray(previous)[np.ix_(keep, keep)]
+        if added_locations:
+            coords = coordinates_array(self.locations)
+            new_rows = scale_distances(
+                haversine_matrix(coords[len(keep):], coords), self.distance_scale)
+            matrix[len(keep):, :] = new_rows
+            matrix[:, len(keep):] = new_rows.T
+        self.distance_matrix = matrix
+        return matrix
+
+    def _insert_stops(self, routes, pending, distance_matrix):
+        """Cheapest feasible insertion of ``pending`` nodes into ``routes``.
+
+        Returns:
+            bool: False if some node fits in no vehicle's remaining capacity
+        """
+        loads = [sum(self.demands[node] for node in route) for route in routes]
+        for node in sorted(pending, key=lambda n: -self.demands[n]):
+            best = None
+            for vehicle_id, route in enumerate(routes):
+                if loads[vehicle_id] + self.demands[node] > self.vehicle_capacities[vehicle_id]:
+                    continue
+                path = [self.depot] + route + [self.depot]
+                for position in range(len(path) - 1):
+                    a, b = path[position], path[position + 1]
+                    cost = (distance_matrix[a, node] + distance_matrix[node, b] -
+                            distance_matrix[a, b])
+                    if best is None or cost < best[0]:
+                        best = (cost, vehicle_id, position)
+            if best is None:
+                return False
+            _, vehicle_id, position = best
+            routes[vehicle_id].insert(position, node)
+            loads[vehicle_id] += self.demands[node]
+        return True
+
+    def reoptimize_routes(self, previous_routes, added=None, removed=None,
+                          demand_changes=None, time_limit=1):
+        """Re-plan after stops are added, removed or have revised demand.
+
+        The previous routes, repaired with cheapest insertion for new or
+        overloaded stops, seed the solver through ``ReadAssignmentFromRoutes``
+        so the search starts from a good solution instead of from scratch.
+        Stops are identified by their location ``name``.
+
+        Args:
+            previous_routes: Output of ``optimize_routes``
+            added: List of ``{'location': {...}, 'demand': int}`` for new stops
+            removed: Names of stops to drop
+            demand_changes: Dict of stop name -> new demand
+            time_limit: Seconds for the warm-started search
+
+        Returns:
+            Routes in the ``extract_routes`` schema, or None if no solution
+        """
+        if self.has_constraints:
+            raise ValueError("Re-optimization supports a single depot and capacity only")
+        added = added or []
+        distance_matrix = self.update_distance_matrix(
+            [stop['location'] for stop in added], removed or [])
+
+        node_of = {loc['name']: i for i, loc in enumerate(self.locations)}
+        for stop in added:
+            self.demands[node_of[stop['location']['name']]] = stop['demand']
+        for name, demand in (demand_changes or {}).items():
+            self.demands[node_of[name]] = demand
+
+        # Previous visit order, minus removed stops and depot
+        routes = [[] for _ in range(self.num_vehicles)]
+        for route in previous_routes:
+            routes[route['vehicle_id']] = [
+                node_of[stop['location']['name']] for stop in route['stops']
+                if stop['location']['name'] in node_of and
+                node_of[stop['location']['name']] != self.depot
+            ]
+
+        # Unload stops from vehicles that are now over capacity
+        pending = [node_of[stop['location']['name']] for stop in added]
+        for vehicle_id, route in enumerate(routes):
+            while route and sum(self.demands[n] for n in route) > self.vehicle_capacities[vehicle_id]:
+                pending.append(route.pop(max(range(len(route)), key=lambda i: self.demands[route[i]])))
+
+        manager, routing = self.build_routing_model(distance_matrix)
+        search_parameters = self.search_parameters(time_limit)
+
+        initial = None
+        if self._insert_stops(routes, pending, distance_matrix):
+            routing.CloseModelWithParameters(search_parameters)
+            initial = routing.ReadAssignmentFromRoutes(
+                [[manager.NodeToIndex(node) for node in route] for route in routes], True)
+
+        if initial:
+            solution = routing.SolveFromAssignmentWithParameters(initial, search_parameters)
+        else:
+            solution = routing.SolveWithParameters(search_parameters)
+
+        if solution:
+            return self.extract_routes(manager, routing, solution)
+        return None
+
     def extract_routes(self, manager, routing, solution):
         """Extract route information from the solution"""
         routes = []
+        time_dimension = routing.GetDimensionOrDie('Time') if self.time_windows else None
         for vehicle_id in range(self.num_vehicles):
             index = routing.Start(vehicle_id)
             route = []
@@ -105,10 +778,13 @@ class EmergencyRouteOptimizer:
             
             while not routing.IsEnd(index):
                 node_index = manager.IndexToNode(index)
-                route.append({
+                stop = {
                     'location': self.locations[node_index],
                     'demand': self.demands[node_index]
-                })
+                }
+                if time_dimension:
+                    stop['arrival_min'] = solution.Min(time_dimension.CumulVar(index))
+                route.append(stop)
                 previous_index = index
                 index = solution.Value(routing.NextVar(index))
                 route_distance += routing.GetArcCostForVehicle(
@@ -117,7 +793,7 @@ class EmergencyRouteOptimizer:
             
             routes.append({
                 'vehicle_id': vehicle_id,
-                'distance_km': route_distance,
+                'distance_km': route_distance / self.distance_scale,
                 'load': route_load,
                 'stops': route
             })
@@ -0,0 +1,284 @@
+# backend/scripts/model-training/ortools/route_service.py
+#
+# Long-running batch entry point for EmergencyRouteOptimizer. Problems are
+# read as JSON lines (same shape as delivery_locations.json plus an optional
+# "id", "time_limit", "mode" and, for sparse mode, "neighbors") and solved
+# concurrently in a persistent process pool, so OR-Tools is imported once per
+# worker instead of once per request. A job still running well past its time
+# limit has its worker killed. Results are written back as JSON lines in
+# completion order.
+#
+#   python route_service.py < jobs.jsonl > results.jsonl
+#   python route_service.py --socket /tmp/route_service.sock
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import signal
+import socketserver
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    from .route_optimization import EmergencyRouteOptimizer
+except ImportError:  # Run as a script from this directory
+    from route_optimization import EmergencyRouteOptimizer
+
+MODES = ('dense', 'sparse', 'clustered')
+# Wall-clock allowance on top of a job's solver limit for loading the problem,
+# building the matrix and returning the routes
+JOB_GRACE_SECONDS = 30
+WATCHDOG_INTERVAL = 0.5
+
+
+def job_id(job):
+    return job.get('id') if isinstance(job, dict) else None
+
+
+def parse_time_limit(value):
+    """Whole-second solver time limit from a job field; fractions round up"""
+    if (isinstance(value, bool) or not isinstance(value, (int, float))
+            or not math.isfinite(value) or value <= 0):
+        raise ValueError(f"time_limit must be a positive number of seconds, got {value!r}")
+    return max(1, math.ceil(value))
+
+
+def job_time_limit(job, default_time_limit):
+    """Solver limit a job will run with; invalid values fail inside solve_job"""
+    try:
+        return parse_time_limit(job.get('time_limit', default_time_limit))
+    except (AttributeError, ValueError):
+        return default_time_limit
+
+
+def _record_worker(pids):
+    """Pool initializer: report the worker's pid so a stuck worker can be killed"""
+    pids.put(os.getpid())
+
+
+def solve_job(job, default_time_limit=5, cache_dir=None):
+    """Solve one problem instance inside a worker process"""
+    start = time.perf_counter()
+    result = {'id': job_id(job)}
+    try:
+        if not isinstance(job, dict):
+            raise ValueError(f"Job must be a JSON object, got {type(job).__name__}")
+        mode = job.get('mode', 'dense')
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode '{mode}', expected one of {MODES}")
+
+        optimizer = EmergencyRouteOptimizer(
+            cache_dir=cache_dir,
+            time_limit=parse_time_limit(job.get('time_limit', default_time_limit)),
+            sparse_neighbors=job.get('neighbors', 20) if mode == 'sparse' else None)
+        optimizer.load_problem(job)
+
+        if mode == 'clustered':
+            # Already inside a pool worker, so solve clusters in-process
+            routes = optimizer.optimize_routes_clustered(max_workers=1)
+        else:
+            routes = optimizer.optimize_routes()
+
+        result.update(status='ok' if routes else 'no_solution', routes=routes)
+    except Exception as e:
+        result.update(status='error', error=str(e))
+
+    result['seconds'] = round(time.perf_counter() - start, 3)
+    return result
+
+
+class RouteService:
+    def __init__(self, max_workers=None, time_limit=5, cache_dir=None, grace=JOB_GRACE_SECONDS):
+        """
+        Args:
+            max_workers: Solver processes, the CPU count by default
+            time_limit: Default per-job solver limit in seconds
+            grace: Seconds a job may run past its solver limit before its
+                   worker is killed and the job reported as timed out
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.time_limit = time_limit
+        self.cache_dir = cache_dir
+        self.grace = grace
+        self.pool_restarts = 0
+        self.timeouts = 0
+        # Spawned workers: a fork would copy the watchdog's and socket threads' locks
+        self._context = multiprocessing.get_context('spawn')
+        self._worker_pids = {}  # pool -> queue of its workers' pids
+        self._killed = {}  # replaced pool -> pid queue, until its jobs have failed
+        self._pool_lock = threading.Lock()
+        self.pool = self._new_pool()
+
+        # Jobs are only submitted when a worker is free, so a job's deadline
+        # can be counted from its submission
+        self._slots = threading.BoundedSemaphore(self.max_workers)
+        self._deadlines = {}  # future -> (deadline, pool)
+        self._expired = set()
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._watchdog = threading.Thread(target=self._watch, daemon=True)
+        self._watchdog.start()
+
+    def _new_pool(self):
+        pids = self._context.SimpleQueue()
+        pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=self._context,
+                                   initializer=_record_worker, initargs=(pids,))
+        self._worker_pids[pool] = pids
+        return pool
+
+    def _replace_pool(self, broken, kill=False):
+        """Swap in a fresh pool after a worker died or hung; later jobs would all fail otherwise"""
+        with self._pool_lock:
+            if self.pool is not broken:
+                return
+            pids = self._worker_pids.pop(broken)
+            if kill:
+                self._killed[broken] = pids
+            broken.shutdown(wait=False, cancel_futures=True)
+            self.pool = self._new_pool()
+            self.pool_restarts += 1
+
+    def _watch(self):
+        """Kill the pool of any job still running past its wall-clock deadline"""
+        while not self._closed.wait(WATCHDOG_INTERVAL):
+            now = time.monotonic()
+            with self._lock:
+                overdue = [(future, pool) for future, (deadline, pool) in self._deadlines.items()
+                           if deadline <= now and not future.done() and future not in self._expired]
+                self._expired.update(future for future, _ in overdue)
+                self.timeouts += len(overdue)
+            for pool in {pool for _, pool in overdue}:
+                # Jobs sharing the pool fail with it and get error records
+                self._replace_pool(pool, kill=True)
+            self._kill_workers()
+
+    def _kill_workers(self):
+        """Terminate the workers of replaced pools, including ones still starting up"""
+        with self._lock:
+            pending = {pool for _, pool in self._deadlines.values()}
+        for pool, pids in list(self._killed.items()):
+            while not pids.empty():
+                try:
+                    os.kill(pids.get(), signal.SIGTERM)
+                except OSError:  # Already exited
+                    pass
+            if pool not in pending:
+                del self._killed[pool]
+
+    def submit(self, job):
+        self._slots.acquire()
+        limit = job_time_limit(job, self.time_limit)
+        pool = self.pool
+        try:
+            future = pool.submit(solve_job, job, self.time_limit, self.cache_dir)
+        except BrokenProcessPool:
+            self._replace_pool(pool)
+            pool = self.pool
+            future = pool.submit(solve_job, job, self.time_limit, self.cache_dir)
+        with self._lock:
+            self._deadlines[future] = (time.monotonic() + limit + self.grace, pool)
+        return future, pool
+
+    def _on_done(self, future, job, pool, write):
+        """Write a job's result, or an error record if its worker failed or timed out"""
+        self._slots.release()
+        with self._lock:
+            self._deadlines.pop(future, None)
+            expired = future in self._expired
+            self._expired.discard(future)
+        try:
+            result = future.result()
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                self._replace_pool(pool)
+            error = (f"Job exceeded its {job_time_limit(job, self.time_limit) + self.grace:g}s "
+                     "wall-clock limit" if expired else f"{type(e).__name__}: {e}")
+            result = {'id': job_id(job), 'status': 'error', 'error': error}
+        write(result)
+
+    def run_stream(self, lines, write):
+        """Submit every JSON line and write each result as soon as it finishes.
+
+        Jobs are dispatched while input is still being read, so results for
+        early jobs stream back before the input is closed.
+        """
+        futures = []
+        for line_no, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                job = json.loads(line)
+            except json.JSONDecodeError as e:
+                write({'id': None, 'status': 'error', 'error': f"line {line_no}: {e}"})
+                continue
+            future, pool = self.submit(job)
+            future.add_done_callback(lambda f, job=job, pool=pool: self._on_done(f, job, pool, write))
+            futures.append(future)
+
+        wait(futures)
+
+    def shutdown(self):
+        self._closed.set()
+        self._watchdog.join()
+        self.pool.shutdown(wait=True)
+
+
+def _json_writer(write_text, flush):
+    """Thread-safe JSONL writer around a text write/flush pair"""
+    lock = threading.Lock()
+
+    def write(result):
+        with lock:
+            write_text(json.dumps(result) + '\n')
+            flush()
+    return write
+
+
+def serve_socket(service, socket_path):
+    """Accept JSONL jobs on a Unix socket; each connection gets its results back"""
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            lines = (line.decode() for line in self.rfile)
+            service.run_stream(lines, _json_writer(
+                lambda text: self.wfile.write(text.encode()), self.wfile.flush))
+
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    with socketserver.ThreadingUnixStreamServer(socket_path, Handler) as server:
+        print(f"Route service listening on {socket_path}", file=sys.stderr)
+        server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Batch route optimization service')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of solver processes (default: CPU count)')
+    parser.add_argument('--time-limit', type=int, default=5,
+                        help='Default per-job solver time limit in seconds')
+    parser.add_argument('--cache-dir', type=str, default=None,
+                        help='Directory for cached distance matrices')
+    parser.add_argument('--grace', type=float, default=JOB_GRACE_SECONDS,
+                        help='Seconds a job may run past its time limit before its worker is killed')
+    parser.add_argument('--socket', type=str, default=None,
+                        help='Serve on this Unix socket instead of stdin/stdout')
+    args = parser.parse_args()
+
+    service = RouteService(args.workers, args.time_limit, args.cache_dir, args.grace)
+    try:
+        if args.socket:
+            serve_socket(service, args.socket)
+        else:
+            service.run_stream(sys.stdin, _json_writer(sys.stdout.write, sys.stdout.flush))
+    finally:
+        service.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# backend/scripts/model-training/prophet/benchmark_forecasting.py
+
+import argparse
+import json
+import logging
+import os
+import tempfile
+import time
+import numpy as np
+from holt_winters import HoltWintersForecaster
+
+
+def synthetic_history(days, seed, start='2023-01-01'):
+    """demand_history.json-shaped payload: trend + weekly cycle + noise"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(days)
+    demand = (rng.uniform(80, 200) + rng.uniform(-0.1, 0.3) * t
+              + rng.uniform(5, 30) * np.sin(2 * np.pi * t / 7 + rng.uniform(0, 2 * np.pi))
+              + rng.normal(0, rng.uniform(3, 12), days))
+    dates = np.datetime64(start) + t
+    return {'demand_history': [{'date': str(d), 'demand': round(float(max(v, 0)), 1)}
+                               for d, v in zip(dates, demand)]}
+
+
+def split_history(payload, holdout):
+    """Training payload and held-out actual demand"""
+    rows = sorted(payload['demand_history'], key=lambda row: row['date'])
+    return {'demand_history': rows[:-holdout]}, np.array([row['demand'] for row in rows[-holdout:]])
+
+
+def errors(actual, predicted):
+    return {
+        'mae': float(np.mean(np.abs(actual - predicted))),
+        'mape': float(np.mean(np.abs(actual - predicted) / np.maximum(actual, 1)) * 100)
+    }
+
+
+def run_engine(name, forecaster, payloads, holdout, workdir):
+    """Train and forecast each series through the shared interface"""
+    fit_seconds, predict_seconds, maes, mapes = [], [], [], []
+    for i, payload in enumerate(payloads):
+        train, actual = split_history(payload, holdout)
+        data_path = os.path.join(workdir, f'history_{i}.json')
+        with open(data_path, 'w') as f:
+            json.dump(train, f)
+        model_path = os.path.join(workdir, f'{name}_{i}.model')
+
+        start = time.perf_counter()
+        forecaster.train_model(data_path, model_path)
+        fit_seconds.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        forecast = forecaster.make_forecast(model_path, periods=holdout)
+        predict_seconds.append(time.perf_counter() - start)
+
+        predicted = np.asarray(forecast['yhat'])[-holdout:]
+        score = errors(actual, predicted)
+        maes.append(score['mae'])
+        mapes.append(score['mape'])
+
+    return {
+        'engine': name,
+        'fit_ms': 1000 * np.median(fit_seconds),
+        'predict_ms': 1000 * np.median(predict_seconds),
+        'mae': np.mean(maes),
+        'mape': np.mean(mapes)
+    }
+
+
+def run_batch(payloads, holdout):
+    """Holt-Winters over all series in one vectorised fit"""
+    Y, actual = [], []
+    for payload in payloads:
+        train, held_out = split_history(payload, holdout)
+        Y.append([row['demand'] for row in train['demand_history']])
+        actual.append(held_out)
+    Y = np.clip(np.array(Y, dtype=float), 0.1, None)
+
+    start = time.perf_counter()
+    result = HoltWintersForecaster().forecast_many(Y, periods=holdout)
+    elapsed = time.perf_counter() - start
+    score = errors(np.array(actual), result['yhat'])
+    return {'series': len(payloads), 'total_ms': 1000 * elapsed,
+            'per_series_ms': 1000 * elapsed / len(payloads), **score}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare Holt-Winters and Prophet demand forecasters')
+    parser.add_argument('--data', help='demand_history.json to include as the first series')
+    parser.add_argument('--series', type=int, default=10, help='Series fitted one by one per engine')
+    parser.add_argument('--batch', type=int, default=1000, help='Series in the batched Holt-Winters run')
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--holdout', type=int, default=14)
+    parser.add_argument('--skip-prophet', action='store_true')
+    args = parser.parse_args()
+
+    payloads = [synthetic_history(args.days, seed) for seed in range(max(args.series, args.batch))]
+    single = payloads[:args.series]
+    if args.data:
+        with open(args.data) as f:
+            single = [json.load(f)] + single[:-1]
+
+    engines = [('holt_winters', HoltWintersForecaster)]
+    if not args.skip_prophet:
+        from demand_forecasting import EmergencyDemandForecaster
+        logging.getLogger('cmdstanpy').disabled = True
+        engines.append(('prophet', EmergencyDemandForecaster))
+
+    print(f"{'engine':>13} {'fit_ms':>9} {'predict_ms':>11} {'mae':>8} {'mape%':>7}")
+    with tempfile.TemporaryDirectory() as workdir:
+        for name, engine in engines:
+            result = run_engine(name, engine(), single, args.holdout, workdir)
+            print(f"{result['engine']:>13} {result['fit_ms']:>9.1f} {result['predict_ms']:>11.2f} "
+                  f"{result['mae']:>8.2f} {result['mape']:>7.2f}")
+
+    result = run_batch(payloads[:args.batch], args.holdout)
+    print(f"\nbatched holt_winters: {result['series']} series in {result['total_ms']:.0f} ms "
+          f"({result['per_series_ms']:.2f} ms/series), mae {result['mae']:.2f}, mape {result['mape']:.2f}%")
+
+
+if __name__ == "__main__":
+    main()
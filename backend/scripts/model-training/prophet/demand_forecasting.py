@@ -3,15 +3,210 @@
 import pandas as pd
 from prophet import Prophet
 import json
+import logging
+import multiprocessing
 import os
+import signal
+import time
+import weakref
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
+from statistics import NormalDist
 import matplotlib.pyplot as plt
 import numpy as np
 
+# Series shorter than this (or constant) skip the Stan fit; two months of
+# daily data are needed for the monthly seasonality to mean anything
+MIN_PROPHET_OBSERVATIONS = 60
+FALLBACK_WINDOW = 28
+# Wall-clock allowance per series on top of the Stan timeout: worker start-up
+# (importing Prophet), model setup and predict
+RESULT_GRACE_SECONDS = 60
+SERIES_KEYS = ['resource_type', 'warehouse_id']
+FORECAST_COLUMNS = ['ds', 'yhat', 'yhat_lower', 'yhat_upper']
+
+
+def model_version(model_path):
+    """Cheap version tag for a saved model: changes whenever the file is rewritten"""
+    stat = os.stat(model_path)
+    return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
+
+
+def save_frame(df, path):
+    """Store a frame column by column in an uncompressed .npz, published atomically"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez(f, **{col: df[col].to_numpy() for col in df.columns})
+    os.replace(tmp_path, path)
+
+
+def load_frame(path):
+    with np.load(path, allow_pickle=False) as columns:
+        return pd.DataFrame({col: columns[col] for col in columns.files})
+
+
+def prepare_series(df, date_col='date', value_col='demand'):
+    """Prophet ds/y frame with the same positivity clip as load_data"""
+    series = pd.DataFrame({
+        'ds': pd.to_datetime(df[date_col]),
+        'y': df[value_col].astype(float).clip(lower=0.1)
+    })
+    return series.sort_values('ds').reset_index(drop=True)
+
+
+def fallback_forecast(history, periods, window=FALLBACK_WINDOW, interval_width=0.95,
+                      include_history=False):
+    """Moving-average forecast for tiny or constant series.
+
+    Flat yhat at the mean of the last ``window`` observations with a normal
+    interval from their standard deviation, over the same daily horizon as
+    make_future_dataframe. With ``include_history``, history rows are
+    returned too, at the same level.
+    """
+    recent = history['y'].tail(window)
+    level = recent.mean()
+    spread = NormalDist().inv_cdf(0.5 + interval_width / 2) * (recent.std(ddof=0) if len(recent) > 1 else 0.0)
+    ds = pd.Series(pd.date_range(history['ds'].iloc[-1], periods=periods + 1, freq='D')[1:])
+    if include_history:
+        ds = pd.concat([history['ds'], ds], ignore_index=True)
+    return pd.DataFrame({
+        'ds': ds,
+        'yhat': level,
+        'yhat_lower': max(level - spread, 0),
+        'yhat_upper': level + spread
+    })
+
+
+def warm_start_params(model):
+    """Fitted parameters of a MAP Prophet model, usable as ``init`` for the next fit"""
+    params = {name: model.params[name][0][0] for name in ['k', 'm', 'sigma_obs']}
+    params.update({name: model.params[name][0] for name in ['delta', 'beta']})
+    return params
+
+
+def merge_history(history, new_rows):
+    """Append observations to a ds/y history; new values win on duplicate dates"""
+    merged = pd.concat([history[['ds', 'y']], new_rows[['ds', 'y']]], ignore_index=True)
+    merged = merged.drop_duplicates('ds', keep='last')
+    return merged.sort_values('ds').reset_index(drop=True)
+
+
+def history_changed(old, new):
+    return not (len(old) == len(new)
+                and (old['ds'].to_numpy() == new['ds'].to_numpy()).all()
+                and np.allclose(old['y'].to_numpy(), new['y'].to_numpy()))
+
+
+def process_pool(max_workers=None):
+    """Process pool whose workers start from a fresh interpreter.
+
+    Forked workers inherit the locks of the parent's threads (cmdstanpy,
+    matplotlib, an asyncio daemon), so a fork after any Prophet fit in the
+    parent can deadlock. Spawned workers also behave the same on Windows.
+    """
+    context = multiprocessing.get_context('spawn')
+    pids = context.SimpleQueue()
+    pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=context,
+                               initializer=_record_worker, initargs=(pids,))
+    _worker_pids[pool] = pids
+    return pool
+
+
+# Pool -> queue its workers report their pids on, so stop_pool can kill them
+_worker_pids = weakref.WeakKeyDictionary()
+
+
+def _record_worker(pids):
+    pids.put(os.getpid())
+
+
+def stop_pool(pool):
+    """Shut a pool down without waiting on workers that are stuck or dead"""
+    pool.shutdown(wait=False, cancel_futures=True)
+    pids = _worker_pids.pop(pool, None)
+    while pids is not None and not pids.empty():
+        try:
+            os.kill(pids.get(), signal.SIGTERM)
+        except OSError:  # Already exited
+            pass
+
+
+def series_model_path(model_dir, key):
+    name = '__'.join(str(value) for value in key)
+    return os.path.join(model_dir, ''.join(c if c.isalnum() or c in '-_.' else '_' for c in name) + '.pkl')
+
+
+def _update_series(key, new_rows, model_path, warm_start=True):
+    """Append rows to one series and refit its saved model if the data changed.
+
+    Runs in a worker process for update_many. Series without a saved model
+    need their full history in ``new_rows`` and are fitted cold.
+    """
+    import pickle
+    logging.getLogger('cmdstanpy').disabled = True
+
+    previous = None
+    if os.path.exists(model_path):
+        with open(model_path, 'rb') as f:
+            previous = pickle.load(f)
+    history = new_rows if previous is None else merge_history(previous.history, new_rows)
+
+    if previous is not None and not history_changed(previous.history[['ds', 'y']].reset_index(drop=True), history):
+        return key, 'unchanged', len(history), 0.0
+    if len(history) < 2:
+        return key, 'too_short', len(history), 0.0
+
+    model = EmergencyDemandForecaster.build_model()
+    fit_kwargs = {}
+    if warm_start and previous is not None:
+        fit_kwargs['init'] = warm_start_params(previous)
+    start = time.perf_counter()
+    model.fit(history, **fit_kwargs)
+    seconds = time.perf_counter() - start
+
+    tmp_path = f"{model_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(model, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, model_path)
+    return key, 'warm' if 'init' in fit_kwargs else 'cold', len(history), seconds
+
+
+def _forecast_series(key, history, periods, timeout, include_history=False):
+    """Fit and predict one series (runs in a worker process)"""
+    # Per-chain Stan chatter; outcomes are reported through the status column
+    logging.getLogger('cmdstanpy').disabled = True
+    start = time.perf_counter()
+    status = 'prophet'
+    if len(history) < MIN_PROPHET_OBSERVATIONS or history['y'].nunique() <= 1:
+        status = 'fallback'
+    else:
+        try:
+            model = EmergencyDemandForecaster.build_model()
+            # cmdstanpy kills the Stan optimizer once the timeout expires
+            model.fit(history, timeout=timeout)
+            future = model.make_future_dataframe(periods=periods, include_history=include_history)
+            forecast = model.predict(future)[FORECAST_COLUMNS]
+        except TimeoutError:
+            status = 'timeout'
+        except Exception:
+            logging.getLogger(__name__).exception("Prophet fit failed for series %s", key)
+            status = 'error'
+
+    if status != 'prophet':
+        forecast = fallback_forecast(history, periods, include_history=include_history)
+    for col in ['yhat', 'yhat_lower', 'yhat_upper']:
+        forecast[col] = np.maximum(forecast[col], 0)
+    return key, forecast, status, time.perf_counter() - start
+
+
 class EmergencyDemandForecaster:
-    def __init__(self):
+    def __init__(self, cache_dir=None):
         self.model = None
+        self.model_path = None
+        self.model_version = None
         self.forecast = None
+        self.cache_dir = cache_dir  # Directory for cached forecast frames
 
     def load_data(self, data_path):
         """Load and preprocess historical demand data"""
@@ -29,9 +224,23 @@ class EmergencyDemandForecaster:
     def train_model(self, data_path, model_path):
         """Train and save Prophet model with optimized parameters"""
         df = self.load_data(data_path)
+        self.model = self.build_model()
+        self.model.fit(df)
+        
+        # Save model
+        with open(model_path, 'wb') as f:
+            import pickle
+            pickle.dump(self.model, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self.model_path = model_path
+        self.model_version = model_version(model_path)
         
+        return self.model
+
+    @staticmethod
+    def build_model():
+        """Prophet with the constrained parameters shared by all series"""
         # Initialize model with constrained parameters
-        self.model = Prophet(
+        model = Prophet(
             growth='linear',
             seasonality_mode='additive',  # Prevents negative values
             yearly_seasonality=False,     # Disable yearly patterns
@@ -45,29 +254,180 @@ class EmergencyDemandForecaster:
         )
         
         # Add custom seasonality if needed
-        self.model.add_seasonality(name='monthly', period=30.5, fourier_order=5)
-        
-        self.model.fit(df)
-        
-        # Save model
-        with open(model_path, 'wb') as f:
-            import pickle
-            pickle.dump(self.model, f)
-        
+        model.add_seasonality(name='monthly', period=30.5, fourier_order=5)
+        return model
+
+    def update(self, new_data, model_path, warm_start=True, date_col='date', value_col='demand'):
+        """Append new demand observations and refit the saved model.
+
+        The refit starts the optimizer from the previous model's parameters
+        (cold when ``warm_start`` is False) and is skipped when the
+        observations are already in the model's history.
+
+        Args:
+            new_data: DataFrame or list of records with date and demand
+
+        Returns:
+            dict: 'status' ('warm', 'cold', 'unchanged' or 'too_short'),
+            'rows' in the refitted history and 'fit_seconds'
+        """
+        new_rows = prepare_series(pd.DataFrame(new_data), date_col, value_col)
+        _, status, rows, seconds = _update_series(None, new_rows, model_path, warm_start)
+        self.load_model(model_path)
+        return {'status': status, 'rows': rows, 'fit_seconds': round(seconds, 3)}
+
+    def update_many(self, data, model_dir, keys=SERIES_KEYS, date_col='date',
+                    value_col='demand', warm_start=True, max_workers=None, timeout=None):
+        """Incrementally refit one saved model per series of a long-format table.
+
+        Models live in ``model_dir`` as one pickle per series key. Each
+        series' new rows are appended to its model's history in a process
+        pool; only series whose data changed are refitted, warm-started
+        from their previous parameters. A series whose worker gives no
+        result within ``timeout`` seconds, or dies, keeps its saved model
+        and is reported as 'timeout' or 'error'.
+
+        Returns:
+            DataFrame: key columns, ``status``, ``rows`` and ``fit_seconds``
+        """
+        if not isinstance(data, pd.DataFrame):
+            data = pd.read_csv(data)
+        keys = list(keys)
+        os.makedirs(model_dir, exist_ok=True)
+
+        results = []
+        pool = process_pool(max_workers)
+        healthy = True
+        try:
+            futures = [
+                (key, pool.submit(_update_series, key, prepare_series(group, date_col, value_col),
+                                  series_model_path(model_dir, key), warm_start))
+                for key, group in data.groupby(keys, sort=True)
+            ]
+            for key, future in futures:
+                start = time.perf_counter()
+                try:
+                    results.append(future.result(timeout=timeout))
+                except (FutureTimeout, BrokenProcessPool) as e:
+                    healthy = False
+                    logging.getLogger(__name__).error("No result for series %s (%s), model left as is",
+                                                      key, type(e).__name__)
+                    status = 'timeout' if isinstance(e, FutureTimeout) else 'error'
+                    results.append((key, status, None, time.perf_counter() - start))
+        finally:
+            if healthy:
+                pool.shutdown()
+            else:
+                stop_pool(pool)
+
+        report = pd.DataFrame([list(key) + [status, rows, round(seconds, 3)]
+                               for key, status, rows, seconds in results],
+                              columns=keys + ['status', 'rows', 'fit_seconds'])
+        return report
+
+    def forecast_many(self, data, periods=7, keys=SERIES_KEYS, date_col='date',
+                      value_col='demand', max_workers=None, timeout=120, include_history=False):
+        """Forecast every series of a long-format demand table.
+
+        Rows are grouped by ``keys`` (resource type x warehouse by default)
+        and each group is fitted and predicted in a process pool. Series
+        shorter than MIN_PROPHET_OBSERVATIONS or with constant demand go
+        straight to fallback_forecast, as do fits that exceed ``timeout``
+        seconds or fail. A series whose worker gives no result within
+        ``timeout`` + RESULT_GRACE_SECONDS, or dies, also falls back.
+
+        Args:
+            data: DataFrame or CSV path with the key, date and value columns
+            periods: Days to forecast past each series' last date
+            timeout: Per-series Stan optimization limit in seconds
+            include_history: Also return in-sample rows, as in make_forecast
+
+        Returns:
+            DataFrame: key columns, ds/yhat/yhat_lower/yhat_upper, ``model``
+            ('prophet', 'fallback', 'timeout' or 'error') and ``fit_seconds``
+        """
+        if not isinstance(data, pd.DataFrame):
+            data = pd.read_csv(data)
+        keys = list(keys)
+        columns = keys + FORECAST_COLUMNS + ['model', 'fit_seconds']
+        wait = None if timeout is None else timeout + RESULT_GRACE_SECONDS
+
+        frames = []
+        pool = process_pool(max_workers)
+        healthy = True
+        try:
+            series = [(key, prepare_series(group, date_col, value_col))
+                      for key, group in data.groupby(keys, sort=True)]
+            futures = [pool.submit(_forecast_series, key, history, periods, timeout, include_history)
+                       for key, history in series]
+            for (key, history), future in zip(series, futures):
+                start = time.perf_counter()
+                try:
+                    key, forecast, status, seconds = future.result(timeout=wait)
+                except (FutureTimeout, BrokenProcessPool) as e:
+                    healthy = False
+                    logging.getLogger(__name__).error("No result for series %s (%s), using fallback",
+                                                      key, type(e).__name__)
+                    forecast = fallback_forecast(history, periods, include_history=include_history)
+                    status = 'timeout' if isinstance(e, FutureTimeout) else 'error'
+                    seconds = time.perf_counter() - start
+                for col, value in zip(keys, key):
+                    forecast[col] = value
+                forecast['model'] = status
+                forecast['fit_seconds'] = round(seconds, 3)
+                frames.append(forecast)
+        finally:
+            if healthy:
+                pool.shutdown()
+            else:
+                stop_pool(pool)
+
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(frames, ignore_index=True)[columns]
+
+    def load_model(self, model_path):
+        """Unpickle the model unless the same file version is already in memory"""
+        version = model_version(model_path)
+        if self.model is None or model_path != self.model_path or version != self.model_version:
+            with open(model_path, 'rb') as f:
+                import pickle
+                self.model = pickle.load(f)
+            self.model_path = model_path
+            self.model_version = version
         return self.model
 
-    def make_forecast(self, model_path, periods=7):
-        """Generate forecast with positive value enforcement"""
-        with open(model_path, 'rb') as f:
-            import pickle
-            self.model = pickle.load(f)
-        
-        future = self.model.make_future_dataframe(periods=periods)
+    def make_forecast(self, model_path, periods=7, include_history=False):
+        """Generate forecast with positive value enforcement
+
+        Only the ``periods`` future rows are predicted unless
+        ``include_history`` asks for the in-sample fit as well. With a
+        ``cache_dir``, forecasts are cached per (model version, horizon)
+        and served without touching the model until it is retrained.
+        """
+        version = model_version(model_path)
+        cache_path = None
+        if self.cache_dir:
+            scope = 'full' if include_history else 'future'
+            cache_path = os.path.join(self.cache_dir, f"forecast_{version}_{periods}_{scope}.npz")
+            if os.path.exists(cache_path):
+                if model_path != self.model_path or version != self.model_version:
+                    # Loaded lazily if plot_forecast needs it; the one in memory is stale
+                    self.model, self.model_path, self.model_version = None, model_path, None
+                self.forecast = load_frame(cache_path)
+                return self.forecast
+
+        self.load_model(model_path)
+        future = self.model.make_future_dataframe(periods=periods, include_history=include_history)
         self.forecast = self.model.predict(future)
         
         # Enforce positive predictions
         for col in ['yhat', 'yhat_lower', 'yhat_upper']:
             self.forecast[col] = np.maximum(self.forecast[col], 0)
+
+        if cache_path:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            save_frame(self.forecast, cache_path)
             
         return self.forecast
 
@@ -75,6 +435,8 @@ class EmergencyDemandForecaster:
         """Visualize forecast results with positive y-axis"""
         if self.forecast is None:
             raise ValueError("No forecast available. Run make_forecast() first.")
+        if self.model is None:
+            self.load_model(self.model_path)
             
         fig = self.model.plot(self.forecast)
         ax = fig.gca()
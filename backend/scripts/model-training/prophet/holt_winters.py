@@ -0,0 +1,230 @@
+# backend/scripts/model-training/prophet/holt_winters.py
+
+import json
+import os
+from itertools import product
+import numpy as np
+
+SEASON_LENGTH = 7  # Weekly seasonality on daily demand
+ALPHAS = np.array([0.05, 0.1, 0.2, 0.3, 0.5, 0.7])
+BETAS = np.array([0.0, 0.01, 0.05, 0.1, 0.2])
+GAMMAS = np.array([0.0, 0.05, 0.1, 0.2, 0.4])
+Z_95 = 1.959964
+
+
+def initial_state(Y, m=SEASON_LENGTH):
+    """Classical level/trend/season initialisation from the first two seasons.
+
+    Args:
+        Y: (n_series, T) demand, T >= 2 * m for a seasonal start
+
+    Returns:
+        level (n,), trend (n,), season (n, m) indexed by t % m
+    """
+    n, T = Y.shape
+    if T < 2 * m:
+        # Too short for a season: flat start, seasonality stays at zero
+        return Y[:, 0].copy(), np.zeros(n), np.zeros((n, m))
+    first, second = Y[:, :m].mean(axis=1), Y[:, m:2 * m].mean(axis=1)
+    return first, (second - first) / m, Y[:, :m] - first[:, None]
+
+
+def smooth(Y, alpha, beta, gamma, m=SEASON_LENGTH, start=None, fitted=None):
+    """Run additive Holt-Winters over every (series, parameter set) column at once.
+
+    alpha/beta/gamma have shape (n_series, n_params); the time loop is the
+    only Python loop. Returns the final states and the one-step-ahead SSE
+    from step ``start`` (``m`` by default) on, each of shape
+    (n_series, n_params[, m]). A (T, n_series, n_params) ``fitted`` array
+    receives the one-step-ahead predictions.
+    """
+    start = m if start is None else start
+    n, T = Y.shape
+    level, trend, season = initial_state(Y, m)
+    shape = alpha.shape
+    level = np.repeat(level[:, None], shape[1], axis=1)
+    trend = np.repeat(trend[:, None], shape[1], axis=1)
+    # Season-major (m, n, n_params) so each step touches one contiguous slab
+    season = np.repeat(season.T[:, :, None], shape[1], axis=2)
+    alpha_beta = alpha * beta
+    gamma_rest = gamma * (1 - alpha)
+    sse = np.zeros(shape)
+    error = np.empty(shape)
+    step = np.empty(shape)
+
+    for t in range(T):
+        s = season[t % m]
+        # error = y - (level + trend + s), computed in place
+        np.add(level, trend, out=error)
+        error += s
+        if fitted is not None:
+            fitted[t] = error
+        np.subtract(Y[:, t, None], error, out=error)
+        if t >= start:  # Earlier steps only seed the state
+            np.multiply(error, error, out=step)
+            sse += step
+        level += trend
+        np.multiply(alpha, error, out=step)
+        level += step
+        np.multiply(alpha_beta, error, out=step)
+        trend += step
+        np.multiply(gamma_rest, error, out=step)
+        s += step
+    return level, trend, season.transpose(1, 2, 0), sse
+
+
+def fit_batch(Y, m=SEASON_LENGTH):
+    """Grid-search smoothing parameters for many equal-length series.
+
+    Every combination of ALPHAS x BETAS x GAMMAS is evaluated in a single
+    vectorised pass and the combination with the lowest one-step-ahead SSE
+    is kept per series. Series shorter than two seasons get a non-seasonal
+    fit scored from the second observation.
+
+    Returns:
+        dict of per-series arrays: alpha, beta, gamma, level, trend,
+        season (n, m), sigma (residual std) and n_obs
+    """
+    Y = np.asarray(Y, dtype=float)
+    if Y.ndim == 1:
+        Y = Y[None, :]
+    n, T = Y.shape
+    if T < 2:
+        raise ValueError(f"Holt-Winters needs at least 2 observations per series, got {T}")
+    seasonal = T >= 2 * m
+    gammas = GAMMAS if seasonal else np.zeros(1)
+    start = m if seasonal else 1
+    grid = np.array(list(product(ALPHAS, BETAS, gammas))).T  # (3, n_params)
+    alpha, beta, gamma = (np.broadcast_to(g, (n, grid.shape[1])) for g in grid)
+
+    level, trend, season, sse = smooth(Y, alpha, beta, gamma, m, start)
+    best = sse.argmin(axis=1)
+    rows = np.arange(n)
+    scored = T - start  # Steps that contributed to the SSE
+    return {
+        'alpha': alpha[rows, best],
+        'beta': beta[rows, best],
+        'gamma': gamma[rows, best],
+        'level': level[rows, best],
+        'trend': trend[rows, best],
+        'season': season[rows, best],
+        'sigma': np.sqrt(sse[rows, best] / scored),
+        'n_obs': np.full(n, T)
+    }
+
+
+def forecast_batch(params, periods, interval_z=Z_95, m=SEASON_LENGTH):
+    """Point forecasts and prediction intervals for every fitted series.
+
+    Interval widths use the analytic additive Holt-Winters variance,
+    sigma^2 * (1 + sum_j c_j^2) with c_j = alpha * (1 + j * beta) + gamma
+    on whole seasons.
+
+    Returns:
+        yhat, yhat_lower, yhat_upper, each (n_series, periods), clipped at 0
+    """
+    h = np.arange(1, periods + 1)
+    t = params['n_obs'][:, None] - 1 + h  # Absolute time index of each step
+    season = np.take_along_axis(params['season'], t % m, axis=1)
+    yhat = params['level'][:, None] + h * params['trend'][:, None] + season
+
+    j = np.arange(1, periods)
+    c = (params['alpha'][:, None] * (1 + j * params['beta'][:, None])
+         + params['gamma'][:, None] * (j % m == 0))
+    variance = np.concatenate([np.ones((len(yhat), 1)), 1 + np.cumsum(c ** 2, axis=1)], axis=1)
+    width = interval_z * params['sigma'][:, None] * np.sqrt(variance)
+    return np.maximum(yhat, 0), np.maximum(yhat - width, 0), np.maximum(yhat + width, 0)
+
+
+class HoltWintersForecaster:
+    def __init__(self):
+        """
+        NumPy-only drop-in for EmergencyDemandForecaster on latency-critical paths
+
+        Same train_model / make_forecast calls, but no Stan, pandas or
+        matplotlib. Forecasts are dicts of arrays (ds, yhat, yhat_lower,
+        yhat_upper) that pd.DataFrame() accepts directly.
+        """
+        self.model = None
+        self.model_path = None
+        self.model_version = None
+        self.forecast = None
+
+    def load_data(self, data_path):
+        """Dates and clipped demand from a demand_history JSON file"""
+        with open(data_path) as f:
+            data = json.load(f)
+        history = sorted(data['demand_history'], key=lambda row: row['date'])
+        ds = np.array([row['date'] for row in history], dtype='datetime64[D]')
+        y = np.array([row['demand'] for row in history], dtype=float).clip(min=0.1)
+        return ds, y
+
+    def train_model(self, data_path, model_path):
+        """Fit and save the smoothing state for one demand series"""
+        ds, y = self.load_data(data_path)
+        params = fit_batch(y[None, :])
+        self.model = {name: values[0] for name, values in params.items()}
+        self.model['last_date'] = ds[-1]
+        self.model['history_ds'] = ds
+        self.model['history_y'] = y
+
+        tmp_path = f"{model_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, **self.model)
+        os.replace(tmp_path, model_path)
+        self.model_path = model_path
+        self.model_version = os.stat(model_path).st_mtime_ns
+        return self.model
+
+    def load_model(self, model_path):
+        """Load the saved state unless the same file is already in memory"""
+        version = os.stat(model_path).st_mtime_ns
+        if self.model is None or model_path != self.model_path or version != self.model_version:
+            with np.load(model_path) as saved:
+                self.model = {name: saved[name] for name in saved.files}
+            self.model_path = model_path
+            self.model_version = version
+        return self.model
+
+    def make_forecast(self, model_path, periods=7, include_history=False):
+        """Forecast the next ``periods`` days after the training history
+
+        ``include_history`` prepends the one-step-ahead in-sample fit with
+        a +-1.96 sigma band, like EmergencyDemandForecaster.make_forecast.
+        """
+        model = self.load_model(model_path)
+        params = {name: np.asarray(value)[None, ...] for name, value in model.items()}
+        yhat, lower, upper = forecast_batch(params, periods)
+        self.forecast = {
+            'ds': model['last_date'] + np.arange(1, periods + 1),
+            'yhat': yhat[0],
+            'yhat_lower': lower[0],
+            'yhat_upper': upper[0]
+        }
+        if include_history:
+            if 'history_y' not in model:
+                raise ValueError(f"{model_path} was saved without its history; retrain it "
+                                 "to forecast with include_history")
+            fitted = self.fitted_values(model)
+            width = Z_95 * float(model['sigma'])
+            for name, values in (('ds', model['history_ds']), ('yhat', np.maximum(fitted, 0)),
+                                 ('yhat_lower', np.maximum(fitted - width, 0)),
+                                 ('yhat_upper', np.maximum(fitted + width, 0))):
+                self.forecast[name] = np.concatenate([values, self.forecast[name]])
+        return self.forecast
+
+    @staticmethod
+    def fitted_values(model, m=SEASON_LENGTH):
+        """One-step-ahead predictions over the training history of a saved model"""
+        y = np.asarray(model['history_y'], dtype=float)[None, :]
+        alpha, beta, gamma = (np.asarray(model[name], dtype=float).reshape(1, 1)
+                              for name in ('alpha', 'beta', 'gamma'))
+        fitted = np.empty((y.shape[1], 1, 1))
+        smooth(y, alpha, beta, gamma, m, fitted=fitted)
+        return fitted[:, 0, 0]
+
+    def forecast_many(self, Y, periods=7):
+        """Fit and forecast a (n_series, T) block of aligned daily series in one pass"""
+        params = fit_batch(Y)
+        yhat, lower, upper = forecast_batch(params, periods)
+        return {'yhat': yhat, 'yhat_lower': lower, 'yhat_upper': upper, 'params': params}
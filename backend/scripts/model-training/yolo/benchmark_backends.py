@@ -0,0 +1,150 @@
+# backend/scripts/model-training/yolo/benchmark_backends.py
+
+import argparse
+import os
+import time
+import cv2
+import numpy as np
+from inventory_detection import BACKENDS, IMAGE_EXTENSIONS, InventoryDetector, iou_matrix
+
+
+def load_labels(label_dir, image_path, shape):
+    """YOLO-format labels for an image as (boxes xyxy, classes) in pixels"""
+    name = os.path.splitext(os.path.basename(image_path))[0] + '.txt'
+    path = os.path.join(label_dir, name)
+    if not os.path.exists(path):
+        return np.zeros((0, 4)), np.zeros(0, dtype=int)
+    rows = np.loadtxt(path, ndmin=2)
+    height, width = shape[:2]
+    cx, cy, w, h = rows[:, 1] * width, rows[:, 2] * height, rows[:, 3] * width, rows[:, 4] * height
+    boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+    return boxes, rows[:, 0].astype(int)
+
+
+def as_arrays(detections, class_names):
+    """Detection dicts -> (boxes, scores, classes)"""
+    if not detections:
+        return np.zeros((0, 4)), np.zeros(0), np.zeros(0, dtype=int)
+    index = {name: i for i, name in enumerate(class_names)}
+    return (np.array([d['bbox'] for d in detections], dtype=float),
+            np.array([d['confidence'] for d in detections]),
+            np.array([index[d['class']] for d in detections]))
+
+
+def mean_average_precision(predictions, references, iou_threshold=0.5):
+    """mAP@iou_threshold over classes present in the references (all-point AP)
+
+    predictions: per image (boxes, scores, classes); references: per image
+    (boxes, classes).
+    """
+    classes = sorted({int(c) for _, ref_classes in references for c in ref_classes})
+    if not classes:
+        return None
+
+    aps = []
+    for cls in classes:
+        scores, hits = [], []
+        total = 0
+        for (boxes, confidences, pred_classes), (ref_boxes, ref_classes) in zip(predictions, references):
+            gt = ref_boxes[ref_classes == cls]
+            total += len(gt)
+            mask = pred_classes == cls
+            order = np.argsort(-confidences[mask])
+            pred = boxes[mask][order]
+            scores.extend(confidences[mask][order])
+            matched = np.zeros(len(gt), dtype=bool)
+            iou = iou_matrix(pred, gt) if len(pred) and len(gt) else np.zeros((len(pred), len(gt)))
+            for row in iou:
+                best = int(row.argmax()) if len(row) else -1
+                hit = best >= 0 and row[best] >= iou_threshold and not matched[best]
+                if hit:
+                    matched[best] = True
+                hits.append(hit)
+
+        order = np.argsort(-np.array(scores))
+        hits = np.array(hits, dtype=float)[order]
+        tp = np.cumsum(hits)
+        recall = tp / total
+        precision = tp / np.arange(1, len(tp) + 1)
+        # Area under the monotone precision envelope
+        envelope = np.maximum.accumulate(precision[::-1])[::-1] if len(precision) else precision
+        recall = np.concatenate([[0.0], recall])
+        aps.append(float(np.sum(np.diff(recall) * envelope)))
+    return float(np.mean(aps))
+
+
+def run_backend(backend, images, paths, args):
+    start = time.perf_counter()
+    detector = InventoryDetector(backend, args.threads)
+    load_seconds = time.perf_counter() - start
+
+    # Warm-up, then single-image latency on decoded frames
+    detector.model(images[0], conf=args.conf, verbose=False)
+    latencies = []
+    for _ in range(args.runs):
+        for image in images:
+            start = time.perf_counter()
+            detector.model(image, conf=args.conf, verbose=False)
+            latencies.append(time.perf_counter() - start)
+
+    batch = detector.detect_batch(paths, batch_size=args.batch_size, conf=args.conf)
+    predictions = [as_arrays(result['detections'], detector.class_names) for result in batch['images']]
+    return {
+        'backend': backend,
+        'load_s': load_seconds,
+        'latency_ms': 1000 * np.median(latencies),
+        'p95_ms': 1000 * np.percentile(latencies, 95),
+        'images_per_sec': batch['images_per_sec'],
+        'predictions': predictions,
+        'class_names': detector.class_names
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare InventoryDetector inference backends on CPU')
+    parser.add_argument('--images', default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                         '..', '..', '..', 'data', 'test_images'))
+    parser.add_argument('--labels', help='Directory of YOLO-format .txt labels; without it mAP '
+                                         'is measured against the first backend\'s detections')
+    parser.add_argument('--backends', nargs='+', choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument('--threads', type=int, help='Inference threads for the ONNX backends')
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--conf', type=float, default=0.25)
+    args = parser.parse_args()
+
+    paths, images = [], []
+    for name in sorted(os.listdir(args.images)):
+        if name.lower().endswith(IMAGE_EXTENSIONS):
+            image = cv2.imread(os.path.join(args.images, name))
+            if image is not None:  # Skip files that aren't really images
+                paths.append(os.path.join(args.images, name))
+                images.append(image)
+    if not images:
+        raise SystemExit(f"No readable images in {args.images}")
+
+    results = []
+    for backend in args.backends:
+        try:
+            results.append(run_backend(backend, images, paths, args))
+        except FileNotFoundError as e:
+            print(f"Skipping {backend}: {e}")
+
+    if args.labels:
+        references = [load_labels(args.labels, path, image.shape) for path, image in zip(paths, images)]
+        reference_name = 'labels'
+    elif results:
+        references = [(boxes, classes) for boxes, _, classes in results[0]['predictions']]
+        reference_name = results[0]['backend']
+
+    print(f"\n{len(images)} images, mAP@0.5 against {reference_name if results else '-'}")
+    print(f"{'backend':>10} {'load_s':>7} {'latency_ms':>11} {'p95_ms':>8} {'images/s':>9} {'mAP50':>6}")
+    for result in results:
+        score = mean_average_precision(result['predictions'], references)
+        print(f"{result['backend']:>10} {result['load_s']:>7.2f} {result['latency_ms']:>11.1f} "
+              f"{result['p95_ms']:>8.1f} {result['images_per_sec']:>9.1f} "
+              f"{score if score is not None else float('nan'):>6.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,95 @@
 import os
 import cv2
-import torch
+import glob
+import time
 import yaml
 import argparse
+import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from PIL import Image
-from ultralytics import YOLO
+try:
+    from .onnx_backend import OnnxYoloBackend, export_onnx, quantize_int8, to_numpy
+except ImportError:  # Run as a script from this directory
+    from onnx_backend import OnnxYoloBackend, export_onnx, quantize_int8, to_numpy
+
+BACKENDS = ('torch', 'onnx', 'onnx-int8')
+HERE = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.abspath(os.path.join(HERE, '..', '..', '..', '..'))
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+
+def iou_matrix(a, b):
+    """Pairwise IoU between (n, 4) and (m, 4) xyxy boxes"""
+    top_left = np.maximum(a[:, None, :2], b[None, :, :2])
+    bottom_right = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.clip(bottom_right - top_left, 0, None).prod(axis=2)
+    area_a = (a[:, 2:] - a[:, :2]).prod(axis=1)
+    area_b = (b[:, 2:] - b[:, :2]).prod(axis=1)
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def tile_origins(length, tile_size, overlap):
+    """Tile start offsets along one axis; the last tile is flush with the edge"""
+    if length <= tile_size:
+        return [0]
+    stride = max(int(tile_size * (1 - overlap)), 1)
+    origins = list(range(0, length - tile_size, stride))
+    return origins + [length - tile_size]
+
+
+def merge_boxes(boxes, scores, classes, threshold=0.5, metric='ios'):
+    """Class-aware greedy NMS for detections gathered from overlapping tiles
+
+    With ``metric='ios'`` overlap is intersection over the smaller box, so
+    the clipped half of an object cut by a tile edge is suppressed by the
+    complete detection from the neighbouring tile; 'iou' is plain NMS.
+
+    Returns:
+        Indices of the kept boxes, highest score first
+    """
+    order = np.argsort(-scores)
+    areas = (boxes[:, 2:] - boxes[:, :2]).prod(axis=1)
+    keep = []
+    while len(order):
+        best, rest = order[0], order[1:]
+        keep.append(best)
+        top_left = np.maximum(boxes[best, :2], boxes[rest, :2])
+        bottom_right = np.minimum(boxes[best, 2:], boxes[rest, 2:])
+        inter = np.clip(bottom_right - top_left, 0, None).prod(axis=1)
+        if metric == 'ios':
+            overlap = inter / np.maximum(np.minimum(areas[best], areas[rest]), 1e-9)
+        else:
+            overlap = inter / np.maximum(areas[best] + areas[rest] - inter, 1e-9)
+        order = rest[(overlap < threshold) | (classes[rest] != classes[best])]
+    return np.array(keep, dtype=int)
+
 
 class InventoryDetector:
-    def __init__(self):
+    def __init__(self, backend='torch', num_threads=None, model_path=None, base_dir=None):
+        """
+        Args:
+            backend: 'torch' (ultralytics .pt), 'onnx' or 'onnx-int8'; the
+                     ONNX backends run on onnxruntime's CPU provider
+                     without importing torch. No backend downloads anything
+            num_threads: Inference threads for the ONNX backends
+            model_path: Trained .pt; the ONNX exports sit next to it.
+                        Defaults to inventory_yolov5.pt beside this file
+            base_dir: Project directory that relative image paths and the
+                      data directory are resolved from
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}")
+
         # Full absolute path configuration
-        self.base_dir = r'C:\xampp\htdocs\emergency-optimizer'
+        self.base_dir = os.path.abspath(base_dir or PROJECT_DIR)
         self.data_dir = os.path.join(self.base_dir, 'backend', 'data')
-        self.model_path = os.path.join(self.base_dir, 'backend', 'scripts', 'model-training', 'yolo', 'inventory_yolov5.pt')
+        self.model_path = os.path.abspath(model_path or os.path.join(HERE, 'inventory_yolov5.pt'))
+        self.onnx_path = os.path.splitext(self.model_path)[0] + '.onnx'
+        self.int8_path = os.path.splitext(self.model_path)[0] + '.int8.onnx'
+        self.backend = backend
+        self.num_threads = num_threads
         
         # Model initialization
         self.model = None
@@ -25,40 +102,34 @@ class InventoryDetector:
         try:
             with open(yaml_path) as f:
                 data = yaml.safe_load(f)
-            return data['names']
+            names = data['names']
+            # Ultralytics writes names either as a list or as an {index: name} map
+            return [names[i] for i in sorted(names)] if isinstance(names, dict) else list(names)
         except Exception as e:
             print(f"Warning: Could not load data.yaml, using default classes. Error: {e}")
             return ['medical_kit', 'food_packet', 'water_bottle', 'blanket', 'first_aid', 'flashlight']
 
     def load_model(self):
         """Improved model loading with absolute paths"""
+        if self.backend != 'torch':
+            path = self.int8_path if self.backend == 'onnx-int8' else self.onnx_path
+            if not os.path.exists(path):
+                raise FileNotFoundError(f"No exported model at {path}, run with --export first")
+            self.model = OnnxYoloBackend(path, num_threads=self.num_threads)
+            print(f"✓ Loaded {self.backend} model from {path}")
+            return
+
+        # Check if custom model exists and is valid
+        if not os.path.exists(self.model_path) or os.path.getsize(self.model_path) <= 1024:
+            raise FileNotFoundError(f"No trained model at {self.model_path}, run with --train first")
+
+        from ultralytics import YOLO
+
         try:
-            # Check if custom model exists and is valid
-            if os.path.exists(self.model_path) and os.path.getsize(self.model_path) > 1024:
-                try:
-                    self.model = YOLO(self.model_path)
-                    print(f"✓ Loaded custom model from {self.model_path}")
-                    return
-                except Exception as e:
-                    print(f"⚠ Corrupted model file: {e}")
-                    os.remove(self.model_path)
-
-            # Download fresh pretrained model
-            print("↓ Downloading YOLOv5s pretrained model...")
-            self.model = YOLO('yolov5s.pt')
-            print("✓ Pretrained model loaded successfully")
-            
-            # Save a clean copy
-            self.model.save(self.model_path)
-            print(f"✓ Saved model to {self.model_path}")
-            
+            self.model = YOLO(self.model_path)
         except Exception as e:
-            print(f"⛔ Critical error: {e}")
-            print("Please check:")
-            print("1. Internet connection")
-            print(f"2. Write permissions for: {os.path.dirname(self.model_path)}")
-            print("3. Disk space (need ~100MB free)")
-            raise
+            raise RuntimeError(f"Corrupted model file {self.model_path}: {e}") from e
+        print(f"✓ Loaded custom model from {self.model_path}")
 
     def train(self):
         """Train model with full paths"""
@@ -70,6 +141,9 @@ class InventoryDetector:
         
         print(f"Training model using data from {dataset_path}...")
         
+        import torch
+        from ultralytics import YOLO
+
         self.model = YOLO('yolov5s.pt')
         self.model.train(
             data=yaml_path,
@@ -82,6 +156,42 @@ class InventoryDetector:
         self.model.save(self.model_path)
         print(f"Model saved to {self.model_path}")
 
+    def export(self, int8=False, calibration_dir=None, imgsz=640):
+        """Export the trained .pt to ONNX, and optionally an INT8 copy, for the CPU backends"""
+        if not os.path.exists(self.model_path):
+            raise FileNotFoundError(f"No trained model at {self.model_path}")
+        export_onnx(self.model_path, self.onnx_path, imgsz=imgsz)
+        print(f"✓ Exported ONNX model to {self.onnx_path}")
+        if int8:
+            calibration_dir = calibration_dir or os.path.join(self.data_dir, 'yolo_data', 'images')
+            quantize_int8(self.onnx_path, self.int8_path, calibration_dir, imgsz=imgsz)
+            print(f"✓ Saved INT8 model to {self.int8_path}")
+
+    def resolve_path(self, path):
+        """Relative paths are taken from base_dir"""
+        return os.path.join(self.base_dir, path) if not os.path.isabs(path) else path
+
+    def extract_detections(self, result, timestamp):
+        """Detections of one ultralytics result, converted tensor-wide
+
+        Returns the detection dicts and the class index array for counting.
+        """
+        boxes = result.boxes
+        classes = to_numpy(boxes.cls).astype(int)
+        return self.detections_from_arrays(to_numpy(boxes.xyxy), to_numpy(boxes.conf), classes,
+                                           timestamp), classes
+
+    def detections_from_arrays(self, xyxy, confidences, classes, timestamp):
+        return [
+            {'class': self.class_names[c], 'confidence': conf, 'bbox': bbox, 'time': timestamp}
+            for c, conf, bbox in zip(classes.tolist(), confidences.tolist(), xyxy.astype(int).tolist())
+        ]
+
+    def class_counts(self, classes):
+        """Per-class counts from a class index array in one bincount"""
+        counts = np.bincount(classes, minlength=len(self.class_names))
+        return dict(zip(self.class_names, counts.tolist()))
+
     def detect(self, img_source):
         """Detect objects with path validation"""
         if not self.model:
@@ -89,36 +199,198 @@ class InventoryDetector:
         
         # Convert to absolute path if not already
         if isinstance(img_source, str):
-            img_source = os.path.join(self.base_dir, img_source) if not os.path.isabs(img_source) else img_source
+            img_source = self.resolve_path(img_source)
         
         results = self.model(img_source)
-        detections = []
+        timestamp = datetime.now().isoformat()
+        detections, classes = [], []
         for result in results:
-            for box in result.boxes:
-                detections.append({
-                    'class': self.class_names[int(box.cls)],
-                    'confidence': float(box.conf),
-                    'bbox': [int(x) for x in box.xyxy[0].tolist()],
-                    'time': datetime.now().isoformat()
-                })
+            result_detections, result_classes = self.extract_detections(result, timestamp)
+            detections.extend(result_detections)
+            classes.append(result_classes)
         
         return {
             'image_size': results[0].orig_shape,
             'detections': detections,
-            'counts': {name: sum(1 for d in detections if d['class'] == name) 
-                     for name in self.class_names}
+            'counts': self.class_counts(np.concatenate(classes))
+        }
+
+    def iter_image_sources(self, source):
+        """Expand a directory, glob pattern, file path or iterable into image sources"""
+        if isinstance(source, (str, os.PathLike)):
+            source = self.resolve_path(os.fspath(source))
+            if os.path.isdir(source):
+                return (os.path.join(source, name) for name in sorted(os.listdir(source))
+                        if name.lower().endswith(IMAGE_EXTENSIONS))
+            if glob.has_magic(source):
+                return iter(sorted(glob.glob(source)))
+            return iter([source])
+        return (self.resolve_path(os.fspath(item)) if isinstance(item, (str, os.PathLike)) else item
+                for item in source)
+
+    def decode_images(self, sources, num_workers=4, prefetch=32):
+        """Yield (source, BGR image or None) in order, decoding on a thread pool
+
+        At most ``prefetch`` images are decoded ahead of the consumer, so an
+        audit of thousands of photos never sits in memory at once. Arrays
+        are passed through untouched.
+        """
+        def decode(item):
+            return item if isinstance(item, np.ndarray) else cv2.imread(item)
+
+        with ThreadPoolExecutor(max_workers=num_workers) as pool:
+            pending = deque()
+            for item in sources:
+                pending.append((item, pool.submit(decode, item)))
+                if len(pending) >= prefetch:
+                    item, future = pending.popleft()
+                    yield item, future.result()
+            while pending:
+                item, future = pending.popleft()
+                yield item, future.result()
+
+    def detect_batch(self, source, batch_size=16, num_workers=4, imgsz=640, conf=0.25):
+        """Detect objects in many images with batched inference
+
+        Images from a directory, glob or iterable of paths/arrays are decoded
+        on ``num_workers`` threads and sent to the model ``batch_size`` at a
+        time. Boxes, classes and confidences are read as whole tensors per
+        image and all counts come from one bincount.
+
+        Returns:
+            dict: per-image results ('source', 'image_size', 'detections',
+            'counts'), total 'counts', 'images', 'failed' sources that could
+            not be decoded, 'seconds' and 'images_per_sec'
+        """
+        if not self.model:
+            raise RuntimeError("Model not loaded")
+
+        start = time.perf_counter()
+        images, failed, all_classes = [], [], []
+        batch_sources, batch = [], []
+
+        def run_batch():
+            results = self.model(batch, imgsz=imgsz, conf=conf, verbose=False)
+            timestamp = datetime.now().isoformat()
+            for item, result in zip(batch_sources, results):
+                detections, classes = self.extract_detections(result, timestamp)
+                all_classes.append(classes)
+                images.append({
+                    'source': item if isinstance(item, str) else None,
+                    'image_size': result.orig_shape,
+                    'detections': detections,
+                    'counts': self.class_counts(classes)
+                })
+            batch_sources.clear()
+            batch.clear()
+
+        for item, image in self.decode_images(self.iter_image_sources(source), num_workers,
+                                              prefetch=2 * batch_size):
+            if image is None:
+                failed.append(item)
+                continue
+            batch_sources.append(item)
+            batch.append(image)
+            if len(batch) == batch_size:
+                run_batch()
+        if batch:
+            run_batch()
+
+        elapsed = time.perf_counter() - start
+        classes = np.concatenate(all_classes) if all_classes else np.zeros(0, dtype=int)
+        return {
+            'images': images,
+            'counts': self.class_counts(classes),
+            'failed': failed,
+            'seconds': elapsed,
+            'images_per_sec': len(images) / elapsed if elapsed > 0 else 0.0
+        }
+
+    def detect_tiled(self, img_source, tile_size=640, overlap=0.2, batch_size=8, num_workers=1,
+                     conf=0.25, merge_threshold=0.5, merge_metric='ios', include_full=True):
+        """Detect small items in large images by running overlapping tiles
+
+        The image is cut into ``tile_size`` tiles overlapping by the
+        ``overlap`` fraction and the tiles are run ``batch_size`` at a time.
+        With the ONNX backends, whose sessions are safe to share between
+        threads, batches run on ``num_workers`` threads; an ultralytics
+        model is not thread-safe, so the torch backend runs them in turn
+        and ignores ``num_workers``. Tile boxes are shifted to image
+        coordinates and merged across tiles with merge_boxes. With
+        ``include_full`` the downscaled whole image is run as well so items
+        larger than a tile are still found.
+
+        Smaller tiles and more overlap raise recall on small items at the
+        cost of more model calls.
+
+        Returns:
+            dict: same keys as detect() plus 'tiles' and 'seconds'
+        """
+        if not self.model:
+            raise RuntimeError("Model not loaded")
+
+        start = time.perf_counter()
+        if isinstance(img_source, str):
+            img_source = self.resolve_path(img_source)
+            image = cv2.imread(img_source)
+            if image is None:
+                raise FileNotFoundError(f"Could not read image {img_source}")
+        else:
+            image = img_source
+        height, width = image.shape[:2]
+
+        origins = [(x, y) for y in tile_origins(height, tile_size, overlap)
+                   for x in tile_origins(width, tile_size, overlap)]
+        jobs = [(origins[i:i + batch_size],
+                 [image[y:y + tile_size, x:x + tile_size] for x, y in origins[i:i + batch_size]], tile_size)
+                for i in range(0, len(origins), batch_size)]
+        if include_full and len(origins) > 1:
+            jobs.append(([(0, 0)], [image], max(tile_size, 640)))
+
+        def run(job):
+            offsets, tiles, imgsz = job
+            results = self.model(tiles, imgsz=imgsz, conf=conf, verbose=False)
+            found = []
+            for (x, y), result in zip(offsets, results):
+                boxes = result.boxes
+                found.append((to_numpy(boxes.xyxy) + (x, y, x, y), to_numpy(boxes.conf),
+                              to_numpy(boxes.cls).astype(int)))
+            return found
+
+        if num_workers > 1 and isinstance(self.model, OnnxYoloBackend):
+            with ThreadPoolExecutor(max_workers=num_workers) as pool:
+                found = [item for items in pool.map(run, jobs) for item in items]
+        else:
+            found = [item for job in jobs for item in run(job)]
+
+        xyxy = np.concatenate([boxes for boxes, _, _ in found]).reshape(-1, 4)
+        scores = np.concatenate([scores for _, scores, _ in found])
+        classes = np.concatenate([classes for _, _, classes in found]).astype(int)
+        if len(scores):
+            keep = merge_boxes(xyxy, scores, classes, merge_threshold, merge_metric)
+            xyxy, scores, classes = xyxy[keep], scores[keep], classes[keep]
+
+        return {
+            'image_size': (height, width),
+            'detections': self.detections_from_arrays(xyxy, scores, classes, datetime.now().isoformat()),
+            'counts': self.class_counts(classes),
+            'tiles': len(origins),
+            'seconds': time.perf_counter() - start
         }
 
     def visualize(self, img_source, save_path=None):
         """Visualize results with absolute paths"""
         # Handle path conversion
         if isinstance(img_source, str):
-            img_source = os.path.join(self.base_dir, img_source) if not os.path.isabs(img_source) else img_source
+            img_source = self.resolve_path(img_source)
             img = cv2.imread(img_source)
+            if img is None:
+                raise FileNotFoundError(f"Could not read image {img_source}")
         else:
             img = img_source
             
-        results = self.detect(img_source)
+        # Detect on the decoded frame instead of reading the file a second time
+        results = self.detect(img)
         
         for det in results['detections']:
             x1, y1, x2, y2 = det['bbox']
@@ -139,7 +411,6 @@ class InventoryDetector:
             cv2.destroyAllWindows()
 
 def main():
-    detector = InventoryDetector()
     
     # Configure paths
     default_img = os.path.join('backend', 'data', 'test_images', 'medical_1.jpg')
@@ -148,18 +419,47 @@ def main():
     parser = argparse.ArgumentParser()
     parser.add_argument('--img-source', type=str,
                       default=default_img,
-                      help=f'Path to image file (relative to {detector.base_dir})')
+                      help='Path to image file (relative to the project directory)')
     parser.add_argument('--output', type=str,
                       default=default_output,
-                      help=f'Output path for results (relative to {detector.base_dir})')
+                      help='Output path for results (relative to the project directory)')
     parser.add_argument('--train', action='store_true',
                       help='Train the model')
+    parser.add_argument('--batch', type=str,
+                      help='Directory or glob of images to audit with batched inference')
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--backend', choices=BACKENDS, default='torch')
+    parser.add_argument('--threads', type=int,
+                      help='Inference threads for the ONNX backends')
+    parser.add_argument('--export', action='store_true',
+                      help='Export the trained model to ONNX for the CPU backends')
+    parser.add_argument('--int8', action='store_true',
+                      help='With --export, also write an INT8-quantized model')
+    parser.add_argument('--tiled', action='store_true',
+                      help='Detect on overlapping tiles, for large aerial or panorama images')
+    parser.add_argument('--tile-size', type=int, default=640)
+    parser.add_argument('--overlap', type=float, default=0.2)
     args = parser.parse_args()
 
+    detector = InventoryDetector(args.backend, args.threads)
+
     if args.train:
         detector.train()
         return
 
+    if args.export:
+        detector.export(int8=args.int8)
+        return
+
+    if args.batch:
+        results = detector.detect_batch(args.batch, batch_size=args.batch_size)
+        print(f"Processed {len(results['images'])} images in {results['seconds']:.2f}s "
+              f"({results['images_per_sec']:.1f} images/sec)")
+        if results['failed']:
+            print(f"Could not read {len(results['failed'])} images")
+        print(f"Items detected: {results['counts']}")
+        return
+
     # Convert to absolute paths
     img_path = os.path.join(detector.base_dir, args.img_source)
     output_path = os.path.join(detector.base_dir, args.output)
@@ -184,6 +484,11 @@ def main():
 
     # Process image
     print(f"\nProcessing image: {img_path}")
+    if args.tiled:
+        results = detector.detect_tiled(img_path, tile_size=args.tile_size, overlap=args.overlap)
+        print(f"Ran {results['tiles']} tiles in {results['seconds']:.2f}s")
+        print(f"Items detected: {results['counts']}")
+        return
     results = detector.detect(img_path)
     print("\nDetection Results:")
     print(f"Items detected: {results['counts']}")
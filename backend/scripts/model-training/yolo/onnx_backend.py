@@ -0,0 +1,221 @@
+# backend/scripts/model-training/yolo/onnx_backend.py
+
+import ast
+import glob
+import os
+import cv2
+import numpy as np
+
+LETTERBOX_COLOR = (114, 114, 114)
+
+
+def to_numpy(values):
+    """Torch tensors (ultralytics results) or arrays (this backend) as NumPy"""
+    return values.cpu().numpy() if hasattr(values, 'cpu') else np.asarray(values)
+
+
+def letterbox(image, size):
+    """Resize keeping aspect ratio and pad to size x size, as ultralytics does
+
+    Returns the padded image and the (gain, pad_x, pad_y) needed to map
+    boxes back to the original image.
+    """
+    height, width = image.shape[:2]
+    gain = min(size / height, size / width)
+    new_w, new_h = round(width * gain), round(height * gain)
+    pad_x, pad_y = (size - new_w) / 2, (size - new_h) / 2
+    if (new_w, new_h) != (width, height):
+        image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    top, bottom = round(pad_y - 0.1), round(pad_y + 0.1)
+    left, right = round(pad_x - 0.1), round(pad_x + 0.1)
+    image = cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT, value=LETTERBOX_COLOR)
+    return image, (gain, left, top)
+
+
+def preprocess(images, size):
+    """BGR images -> float32 NCHW RGB batch in [0, 1] plus letterbox transforms"""
+    batch = np.empty((len(images), 3, size, size), dtype=np.float32)
+    transforms = []
+    for i, image in enumerate(images):
+        padded, transform = letterbox(image, size)
+        batch[i] = padded[:, :, ::-1].transpose(2, 0, 1)
+        transforms.append(transform)
+    batch *= 1 / 255.0
+    return batch, transforms
+
+
+class Boxes:
+    """NumPy stand-in for ultralytics Boxes with the fields the detector reads"""
+
+    def __init__(self, xyxy, conf, cls):
+        self.xyxy = xyxy
+        self.conf = conf
+        self.cls = cls
+
+    def __len__(self):
+        return len(self.conf)
+
+
+class Result:
+    def __init__(self, orig_shape, boxes):
+        self.orig_shape = orig_shape
+        self.boxes = boxes
+
+
+def postprocess(output, transforms, shapes, conf, iou, max_det=300):
+    """Decode (batch, 4 + nc, anchors) YOLOv8-style output into per-image Results
+
+    Boxes are filtered by class score, reduced with class-aware NMS and
+    mapped back through the letterbox to original pixel coordinates.
+    """
+    results = []
+    for prediction, (gain, pad_x, pad_y), shape in zip(output, transforms, shapes):
+        prediction = prediction.T  # (anchors, 4 + nc)
+        scores = prediction[:, 4:]
+        cls = scores.argmax(axis=1)
+        best = scores[np.arange(len(scores)), cls]
+        keep = best > conf
+        boxes, best, cls = prediction[keep, :4], best[keep], cls[keep]
+
+        if len(best):
+            xywh = boxes.copy()
+            xywh[:, :2] -= xywh[:, 2:] / 2  # cx, cy, w, h -> x, y, w, h
+            kept = cv2.dnn.NMSBoxesBatched(xywh.tolist(), best.tolist(), cls.tolist(), conf, iou,
+                                           top_k=max_det)
+            kept = np.asarray(kept, dtype=int).reshape(-1)
+            xyxy = np.concatenate([xywh[kept, :2], xywh[kept, :2] + xywh[kept, 2:]], axis=1)
+            xyxy -= (pad_x, pad_y, pad_x, pad_y)
+            xyxy /= gain
+            xyxy[:, [0, 2]] = xyxy[:, [0, 2]].clip(0, shape[1])
+            xyxy[:, [1, 3]] = xyxy[:, [1, 3]].clip(0, shape[0])
+            best, cls = best[kept], cls[kept]
+        else:
+            xyxy = np.zeros((0, 4), dtype=np.float32)
+        results.append(Result(shape, Boxes(xyxy, best, cls.astype(np.float32))))
+    return results
+
+
+class OnnxYoloBackend:
+    def __init__(self, model_path, num_threads=None, imgsz=640):
+        """
+        CPU inference for an exported YOLO ONNX model through onnxruntime
+
+        Mirrors the parts of the ultralytics YOLO call interface that
+        InventoryDetector uses (``model(source, imgsz=, conf=, verbose=)``
+        returning results with ``orig_shape`` and ``boxes``), without
+        importing torch or ultralytics and without any network access.
+
+        Args:
+            model_path: .onnx file from export_onnx / quantize_int8
+            num_threads: onnxruntime intra-op threads, all cores if None
+            imgsz: Default input size; fixed-shape exports override it
+        """
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(model_path, options, providers=['CPUExecutionProvider'])
+        self.input = self.session.get_inputs()[0]
+        self.model_path = model_path
+
+        batch_dim, size_dim = self.input.shape[0], self.input.shape[2]
+        self.fixed_batch = batch_dim if isinstance(batch_dim, int) else None
+        self.imgsz = size_dim if isinstance(size_dim, int) else imgsz
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        self.names = ast.literal_eval(metadata['names']) if 'names' in metadata else None
+
+    def __call__(self, source, imgsz=None, conf=0.25, iou=0.7, verbose=False):
+        images = source if isinstance(source, (list, tuple)) else [source]
+        decoded = []
+        for image in images:
+            if isinstance(image, str):
+                path, image = image, cv2.imread(image)
+                if image is None:
+                    raise IOError(f"Could not read image {path}")
+            decoded.append(image)
+        images = decoded
+        size = self.imgsz if self.fixed_batch or imgsz is None else imgsz
+
+        results = []
+        step = self.fixed_batch or len(images)
+        for i in range(0, len(images), step):
+            chunk = images[i:i + step]
+            batch, transforms = preprocess(chunk, size)
+            if self.fixed_batch and len(chunk) < self.fixed_batch:
+                batch = np.concatenate([batch, np.zeros((self.fixed_batch - len(chunk),) + batch.shape[1:],
+                                                        dtype=batch.dtype)])
+            output = self.session.run(None, {self.input.name: batch})[0]
+            results.extend(postprocess(output[:len(chunk)], transforms,
+                                       [image.shape[:2] for image in chunk], conf, iou))
+        return results
+
+
+def export_onnx(pt_path, onnx_path, imgsz=640, opset=None):
+    """Export a trained .pt to ONNX with a dynamic batch axis (needs ultralytics once)"""
+    from ultralytics import YOLO
+
+    exported = YOLO(pt_path).export(format='onnx', imgsz=imgsz, dynamic=True, simplify=False,
+                                    opset=opset)
+    os.replace(exported, onnx_path)
+    return onnx_path
+
+
+class CalibrationReader:
+    """Feeds letterboxed images to onnxruntime static quantization"""
+
+    def __init__(self, input_name, image_paths, imgsz):
+        self.input_name = input_name
+        self.image_paths = iter(image_paths)
+        self.imgsz = imgsz
+
+    def get_next(self):
+        for path in self.image_paths:
+            image = cv2.imread(path)
+            if image is not None:
+                return {self.input_name: preprocess([image], self.imgsz)[0]}
+        return None
+
+
+def quantize_int8(onnx_path, int8_path, calibration_dir=None, imgsz=640, max_images=100):
+    """INT8-quantize an exported model
+
+    With a directory of representative images, activations are calibrated
+    statically (QDQ format, the fast path for convolutions on CPU);
+    otherwise only weights are quantized dynamically.
+    """
+    from onnxruntime.quantization import (QuantFormat, QuantType, quantize_dynamic,
+                                          quantize_static)
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    prepared_path = f"{int8_path}.prep.onnx"
+    quant_pre_process(onnx_path, prepared_path, skip_symbolic_shape=True)
+    try:
+        images = []
+        if calibration_dir:
+            images = sorted(path for path in glob.glob(os.path.join(calibration_dir, '**', '*'), recursive=True)
+                            if path.lower().endswith(('.jpg', '.jpeg', '.png', '.bmp', '.webp')))[:max_images]
+        if images:
+            import onnxruntime as ort
+            input_name = ort.InferenceSession(prepared_path, providers=['CPUExecutionProvider']).get_inputs()[0].name
+            quantize_static(prepared_path, int8_path, CalibrationReader(input_name, images, imgsz),
+                            quant_format=QuantFormat.QDQ, activation_type=QuantType.QUInt8,
+                            weight_type=QuantType.QInt8, per_channel=True)
+        else:
+            quantize_dynamic(prepared_path, int8_path, weight_type=QuantType.QUInt8)
+    finally:
+        if os.path.exists(prepared_path):
+            os.remove(prepared_path)
+
+    # Keep the class names the exporter stored in the float model
+    import onnx
+    source_meta = {p.key: p.value for p in onnx.load(onnx_path, load_external_data=False).metadata_props}
+    model = onnx.load(int8_path)
+    existing = {p.key for p in model.metadata_props}
+    for key, value in source_meta.items():
+        if key not in existing:
+            model.metadata_props.add(key=key, value=value)
+    onnx.save(model, int8_path)
+    return int8_path
@@ -0,0 +1,273 @@
+# backend/scripts/model-training/yolo/video_inventory.py
+
+import argparse
+import queue
+import threading
+import time
+import cv2
+import numpy as np
+try:
+    from .inventory_detection import InventoryDetector, iou_matrix
+    from .onnx_backend import to_numpy
+except ImportError:  # Run as a script from this directory
+    from inventory_detection import InventoryDetector, iou_matrix
+    from onnx_backend import to_numpy
+
+SCENE_SIZE = (64, 36)  # Thumbnail used for scene-change detection
+
+
+class IoUTracker:
+    def __init__(self, iou_threshold=0.3, max_missed=3, min_hits=2):
+        """
+        Greedy IoU tracker with constant-velocity box prediction
+
+        A track is matched to the same-class detection it overlaps most.
+        Between detection runs, boxes are extrapolated from their last
+        velocity. Objects are counted once, when their track has been
+        confirmed by ``min_hits`` detections, so an item that stays in view
+        for the whole video adds one to the count.
+
+        Args:
+            iou_threshold: Minimum IoU to continue a track
+            max_missed: Detection runs a track may go unmatched before it is dropped
+            min_hits: Detections needed before a track is counted
+        """
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.min_hits = min_hits
+        self.tracks = {}  # id -> dict(bbox, velocity, cls, conf, frame, hits, missed, counted)
+        self.next_id = 0
+        self.counted = []  # Class index of every confirmed track
+
+    def predict(self, frame_index):
+        """Track boxes extrapolated to a frame: (ids, (n, 4) boxes, classes)"""
+        ids = list(self.tracks)
+        if not ids:
+            return ids, np.zeros((0, 4)), np.zeros(0, dtype=int)
+        boxes = np.array([self.tracks[i]['bbox'] + self.tracks[i]['velocity'] * (frame_index - self.tracks[i]['frame'])
+                          for i in ids])
+        classes = np.array([self.tracks[i]['cls'] for i in ids])
+        return ids, boxes, classes
+
+    def update(self, frame_index, boxes, classes, confidences):
+        """Match one frame's detections to tracks, start and retire tracks"""
+        ids, predicted, track_classes = self.predict(frame_index)
+        matched_tracks, matched_dets = set(), set()
+
+        if len(ids) and len(boxes):
+            iou = iou_matrix(predicted, boxes)
+            iou[track_classes[:, None] != classes[None, :]] = 0  # Never switch class
+            for t, d in zip(*np.unravel_index(np.argsort(-iou, axis=None), iou.shape)):
+                if iou[t, d] < self.iou_threshold:
+                    break
+                if t in matched_tracks or d in matched_dets:
+                    continue
+                matched_tracks.add(t)
+                matched_dets.add(d)
+                track = self.tracks[ids[t]]
+                elapsed = max(frame_index - track['frame'], 1)
+                track['velocity'] = (boxes[d] - track['bbox']) / elapsed
+                track.update(bbox=boxes[d], conf=confidences[d], frame=frame_index, missed=0)
+                track['hits'] += 1
+                self._confirm(track)
+
+        for t, track_id in enumerate(ids):
+            if t not in matched_tracks:
+                self.tracks[track_id]['missed'] += 1
+                if self.tracks[track_id]['missed'] > self.max_missed:
+                    del self.tracks[track_id]
+
+        for d in range(len(boxes)):
+            if d not in matched_dets:
+                track = {'bbox': boxes[d], 'velocity': np.zeros(4), 'cls': int(classes[d]),
+                         'conf': float(confidences[d]), 'frame': frame_index, 'hits': 1,
+                         'missed': 0, 'counted': False}
+                self.tracks[self.next_id] = track
+                self.next_id += 1
+                self._confirm(track)
+
+    def _confirm(self, track):
+        if not track['counted'] and track['hits'] >= self.min_hits:
+            track['counted'] = True
+            self.counted.append(track['cls'])
+
+
+class FrameReader:
+    def __init__(self, source, queue_size=8, drop_when_full=None):
+        """
+        Decode frames on a background thread into a bounded queue
+
+        Files block the reader when the queue is full. Live sources (camera
+        index, rtsp/http URLs) drop the oldest frame instead, so a slow
+        consumer falls behind by at most ``queue_size`` frames.
+        """
+        self.capture = cv2.VideoCapture(source)
+        if not self.capture.isOpened():
+            raise IOError(f"Could not open video source {source}")
+        live = isinstance(source, int) or str(source).lower().startswith(('rtsp://', 'http://', 'https://'))
+        self.drop_when_full = live if drop_when_full is None else drop_when_full
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or None
+        self.frames = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._read, daemon=True)
+        self._thread.start()
+
+    def _read(self):
+        index = 0
+        while not self._stop.is_set():
+            ok, frame = self.capture.read()
+            if not ok:
+                break
+            item = (index, frame)
+            index += 1
+            if self.drop_when_full:
+                while True:
+                    try:
+                        self.frames.put_nowait(item)
+                        break
+                    except queue.Full:
+                        try:
+                            self.frames.get_nowait()
+                            self.dropped += 1
+                        except queue.Empty:
+                            pass
+            else:
+                while not self._stop.is_set():
+                    try:
+                        self.frames.put(item, timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+        self.capture.release()
+        self.frames.put(None)
+
+    def __iter__(self):
+        while True:
+            item = self.frames.get()
+            if item is None:
+                return
+            yield item
+
+    def close(self):
+        self._stop.set()
+        # Unblock the reader so it can see the stop flag
+        while self._thread.is_alive():
+            try:
+                self.frames.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+
+class VideoInventoryCounter:
+    def __init__(self, detector, detect_every=10, scene_threshold=12.0, imgsz=640, conf=0.25,
+                 tracker=None):
+        """
+        Running, de-duplicated inventory counts for video and camera feeds
+
+        Detection runs on every ``detect_every``-th frame, or earlier when
+        the mean absolute difference of a grey thumbnail against the last
+        detected frame exceeds ``scene_threshold`` (0-255 scale). Other
+        frames reuse the tracker's extrapolated boxes.
+
+        Args:
+            detector: Loaded InventoryDetector
+            tracker: IoUTracker, a default one is created if omitted
+        """
+        self.detector = detector
+        self.detect_every = detect_every
+        self.scene_threshold = scene_threshold
+        self.imgsz = imgsz
+        self.conf = conf
+        self.tracker = tracker or IoUTracker()
+
+    def _thumbnail(self, frame):
+        return cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), SCENE_SIZE,
+                          interpolation=cv2.INTER_AREA).astype(np.int16)
+
+    def counts(self):
+        """Unique objects counted so far, by class name"""
+        return self.detector.class_counts(np.array(self.tracker.counted, dtype=int))
+
+    def stream(self, source, queue_size=8, drop_when_full=None):
+        """Yield one result per processed frame
+
+        Each result has 'frame', 'detected' (whether the model ran), the
+        current 'tracks' (id, class, confidence, bbox) and the running
+        de-duplicated 'counts'.
+        """
+        reader = FrameReader(source, queue_size, drop_when_full)
+        self.reader = reader
+        last_detected, last_thumbnail = None, None
+        try:
+            for index, frame in reader:
+                thumbnail = self._thumbnail(frame)
+                due = last_detected is None or index - last_detected >= self.detect_every
+                changed = bool(last_thumbnail is not None
+                               and np.abs(thumbnail - last_thumbnail).mean() > self.scene_threshold)
+                detected = due or changed
+
+                if detected:
+                    result = self.detector.model(frame, imgsz=self.imgsz, conf=self.conf, verbose=False)[0]
+                    boxes = result.boxes
+                    self.tracker.update(index, to_numpy(boxes.xyxy),
+                                        to_numpy(boxes.cls).astype(int),
+                                        to_numpy(boxes.conf))
+                    last_detected, last_thumbnail = index, thumbnail
+
+                ids, predicted, classes = self.tracker.predict(index)
+                yield {
+                    'frame': index,
+                    'detected': detected,
+                    'tracks': [
+                        {'id': track_id, 'class': self.detector.class_names[c],
+                         'confidence': self.tracker.tracks[track_id]['conf'],
+                         'bbox': box.astype(int).tolist()}
+                        for track_id, c, box in zip(ids, classes.tolist(), predicted)
+                    ],
+                    'counts': self.counts()
+                }
+        finally:
+            reader.close()
+
+    def count(self, source, **kwargs):
+        """Consume a whole video and summarise counts and throughput"""
+        start = time.perf_counter()
+        frames = detections = 0
+        for result in self.stream(source, **kwargs):
+            frames += 1
+            detections += result['detected']
+        elapsed = time.perf_counter() - start
+        fps = frames / elapsed if elapsed > 0 else 0.0
+        return {
+            'counts': self.counts(),
+            'frames': frames,
+            'detection_runs': detections,
+            'dropped_frames': self.reader.dropped,
+            'seconds': elapsed,
+            'fps': fps,
+            'source_fps': self.reader.fps,
+            'realtime': bool(self.reader.fps) and fps >= self.reader.fps
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Count inventory in a video file or camera feed')
+    parser.add_argument('source', help='Video path, RTSP/HTTP URL or camera index')
+    parser.add_argument('--detect-every', type=int, default=10)
+    parser.add_argument('--scene-threshold', type=float, default=12.0)
+    parser.add_argument('--imgsz', type=int, default=640)
+    args = parser.parse_args()
+
+    source = int(args.source) if args.source.isdigit() else args.source
+    counter = VideoInventoryCounter(InventoryDetector(), args.detect_every,
+                                    args.scene_threshold, args.imgsz)
+    summary = counter.count(source)
+    print(f"Processed {summary['frames']} frames ({summary['detection_runs']} detection runs, "
+          f"{summary['dropped_frames']} dropped) at {summary['fps']:.1f} fps"
+          + (f" vs {summary['source_fps']:.1f} fps source" if summary['source_fps'] else ''))
+    print(f"Items counted: {summary['counts']}")
+
+
+if __name__ == "__main__":
+    main()
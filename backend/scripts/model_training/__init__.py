@@ -0,0 +1,10 @@
+"""Importable name for the scripts in ``model-training``.
+
+The hyphenated directory is not a valid module name, so this package points
+its ``__path__`` there and ``backend.scripts.model_training.ortools.route_service``
+resolves to ``model-training/ortools/route_service.py``. Being a real package,
+it also imports in spawned pool workers and subprocesses.
+"""
+import os
+
+__path__ = [os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'model-training')]
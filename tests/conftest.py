@@ -0,0 +1,8 @@
+import sys
+from pathlib import Path
+
+# Plain `pytest` does not put the repository root on sys.path, and the
+# backend.scripts.model_training imports (and spawned workers) need it
+ROOT = str(Path(__file__).resolve().parent.parent)
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
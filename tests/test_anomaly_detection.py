@@ -2,8 +2,12 @@ import pytest
 import pandas as pd
 import numpy as np
 import joblib
+import json
 from pathlib import Path
-from backend.scripts.model_training.anomaly_detection.isolation_forest import IsolationForestAnomalyDetector
+from backend.scripts.model_training.anomaly_detection.isolation_forest import (
+    IsolationForestAnomalyDetector, StreamingAnomalyDetector)
+from backend.scripts.model_training.anomaly_detection.compiled_forest import CompiledIsolationForest
+from backend.scripts.model_training.anomaly_detection.model_registry import AnomalyModelRegistry, model_nbytes
 
 @pytest.fixture
 def sample_data():
@@ -68,4 +72,127 @@ def test_train_and_detect(detector, sample_data, tmp_path):
     # Test model saving/loading
     model_path = detector.save(tmp_path)
     loaded = IsolationForestAnomalyDetector.load(model_path)
-    assert loaded.model is not None
\ No newline at end of file
+    assert loaded.model is not None
+
+def test_detect_batch_matches_pipeline(detector, sample_data, tmp_path):
+    data_path = tmp_path / "test_data.csv"
+    sample_data.to_csv(data_path, index=False)
+    detector.train(data_path)
+    
+    expected = detector.model.decision_function(detector._preprocess_data(sample_data.copy()))
+    columns = {col: sample_data[col].to_numpy() for col in sample_data.columns}
+    result = detector.detect_batch(columns)
+    
+    np.testing.assert_allclose(result['anomaly_score'], expected)
+    assert result['features'].shape == (2, len(detector.features))
+    assert len(detector.detect(sample_data)['features']) == 2
+
+def test_streaming_detector_refits_with_bounded_reservoir(detector, sample_data):
+    records = sample_data.to_dict('records') * 50
+    stream = StreamingAnomalyDetector(detector, batch_size=16, reservoir_size=32,
+                                      refit_every=40, random_state=0)
+    
+    scored = 0
+    for batch, result in stream.score_stream(records):
+        assert len(result['anomaly_score']) == len(batch)
+        scored += len(batch)
+    stream._refit_thread.join()
+    
+    assert scored == len(records)
+    assert stream.reservoir_count == 32
+    assert stream.refits >= 2
+
+def test_streaming_batch_columns_follow_model_features(detector, sample_data):
+    stream = StreamingAnomalyDetector(detector, random_state=0)
+    empty = stream._score_batch([])
+    assert empty['anomaly_score'].shape == (0,)
+    assert empty['is_anomaly'].shape == (0,)
+    assert stream.rows_seen == 0
+
+    records = sample_data.to_dict('records')
+    records[0]['note'] = 'keys only the first record has are ignored'
+    result = stream._score_batch(records)
+    assert len(result['anomaly_score']) == 2
+
+    del records[1]['request_frequency']
+    with pytest.raises(ValueError, match='request_frequency'):
+        stream._score_batch(records)
+
+def test_detect_batch_empty_input(detector, sample_data, tmp_path):
+    data_path = tmp_path / "test_data.csv"
+    sample_data.to_csv(data_path, index=False)
+    detector.train(data_path)
+
+    result = detector.detect_batch(sample_data.iloc[:0])
+    assert result['anomaly_score'].shape == (0,)
+    assert result['is_anomaly'].shape == (0,)
+
+def test_chunked_training_samples_all_chunks(detector, sample_data, tmp_path):
+    data_path = tmp_path / "test_data.csv"
+    pd.concat([sample_data] * 20).to_csv(data_path, index=False)
+    
+    sample = detector._sample_csv(data_path, chunksize=7, sample_size=16)
+    assert sample.shape == (16, len(detector.features))
+    
+    detector.train(data_path, chunksize=7, sample_size=16)
+    assert detector.detect_batch(sample)['anomaly_score'].shape == (16,)
+
+@pytest.mark.parametrize('max_features', [1.0, 0.5])
+def test_compiled_export_matches_sklearn(detector, tmp_path, max_features):
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(500, len(detector.features)))
+    detector.model = detector._build_pipeline()
+    detector.model.set_params(isolation_forest__max_features=max_features)
+    detector.model.fit(X)
+    
+    compiled = CompiledIsolationForest.load(detector.export_compiled(tmp_path / "compiled"))
+    test_X = rng.normal(scale=2.0, size=(200, len(detector.features)))
+    
+    np.testing.assert_allclose(compiled.decision_function(test_X),
+                               detector.model.decision_function(test_X), atol=1e-9)
+    np.testing.assert_array_equal(compiled.predict(test_X), detector.model.predict(test_X))
+
+@pytest.mark.parametrize('timestamps', [
+    ['01/02/2023 14:00', '01/03/2023 09:30', '01/04/2023 23:59'],
+    ['2023-01-02T14:00:00+05:30', '2023-01-03T09:30:00+05:30', '2023-01-04T23:59:00+05:30']
+])
+def test_feature_matrix_parses_timestamps_like_pandas(detector, sample_data, timestamps):
+    raw = pd.concat([sample_data.iloc[:1]] * 3, ignore_index=True).assign(timestamp=timestamps)
+    features = detector._feature_matrix({col: raw[col].to_numpy() for col in raw.columns})
+    
+    assert features[:, detector.features.index('hour_of_day')].tolist() == [14, 9, 23]
+    assert features[:, detector.features.index('day_of_week')].tolist() == [0, 1, 2]
+    np.testing.assert_allclose(features, detector._preprocess_data(raw.copy()).to_numpy(dtype=float))
+
+def test_registry_train_many_versions_and_lru(detector, sample_data, tmp_path):
+    config_path = tmp_path / "test_config.json"
+    datasets = {}
+    for region in ['north', 'south']:
+        datasets[region] = tmp_path / f"{region}.csv"
+        pd.concat([sample_data] * 10).to_csv(datasets[region], index=False)
+    
+    registry = AnomalyModelRegistry(tmp_path / "registry")
+    versions = registry.train_many(dict(datasets, east=tmp_path / "missing.csv"), config_path, max_workers=2)
+    assert versions == {'north': 1, 'south': 1}
+    assert registry.train_many({'north': datasets['north']}, config_path, max_workers=1) == {'north': 2}
+    assert registry.versions('north') == [1, 2]
+    assert registry.latest_version('north') == 2
+    with pytest.raises(KeyError):
+        registry.latest_version('east')
+    
+    north = registry.get('north')
+    assert registry.get('north') is north
+    size = model_nbytes(north.model)
+    assert size > 0
+    assert registry.stats() == {'cached_models': 1, 'cached_bytes': size,
+                                'max_bytes': registry.max_bytes, 'hits': 1, 'misses': 1}
+    
+    # Room for one model only: loading another evicts the least recently used
+    registry.max_bytes = size
+    registry.get('south')
+    registry.get('north', version=1)
+    stats = registry.stats()
+    assert stats['cached_models'] == 1
+    assert stats['cached_bytes'] == model_nbytes(registry.get('north', version=1).model)
+    assert registry.stats()['hits'] == 2
+    assert registry.detect('south', sample_data)['anomaly_score'].shape == (2,)
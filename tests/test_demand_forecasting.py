@@ -0,0 +1,126 @@
+import pytest
+import json
+import logging
+import os
+import time
+import numpy as np
+import pandas as pd
+from concurrent.futures.process import BrokenProcessPool
+from backend.scripts.model_training.prophet import demand_forecasting
+from backend.scripts.model_training.prophet.demand_forecasting import (
+    EmergencyDemandForecaster, fallback_forecast)
+
+logging.getLogger('cmdstanpy').disabled = True
+
+@pytest.fixture
+def history_path(tmp_path):
+    rng = np.random.default_rng(0)
+    days = pd.date_range('2023-01-01', periods=90, freq='D')
+    rows = [{'date': str(d.date()), 'demand': float(100 + 10 * np.sin(2 * np.pi * i / 7) + rng.normal())}
+            for i, d in enumerate(days)]
+    path = tmp_path / 'demand_history.json'
+    path.write_text(json.dumps({'demand_history': rows}))
+    return path
+
+@pytest.fixture
+def demand_table():
+    rng = np.random.default_rng(1)
+    days = pd.date_range('2023-01-01', periods=90, freq='D')
+    rows = [{'resource_type': 'water', 'warehouse_id': 1, 'date': str(d.date()), 'demand': 50 + rng.normal()}
+            for d in days]
+    rows += [{'resource_type': 'blankets', 'warehouse_id': 2, 'date': str(d.date()), 'demand': 7.0}
+             for d in days[:10]]
+    return pd.DataFrame(rows)
+
+def test_forecast_many_after_training_in_same_process(history_path, demand_table, tmp_path):
+    # A Prophet fit in the parent used to deadlock forked pool workers
+    forecaster = EmergencyDemandForecaster()
+    forecaster.train_model(str(history_path), str(tmp_path / 'model.pkl'))
+
+    forecast = forecaster.forecast_many(demand_table, periods=7, max_workers=2, timeout=60)
+
+    assert dict(forecast.groupby('resource_type')['model'].first()) == {'water': 'prophet',
+                                                                        'blankets': 'fallback'}
+    for resource, group in forecast.groupby('resource_type'):
+        last = pd.to_datetime(demand_table.loc[demand_table['resource_type'] == resource, 'date']).max()
+        assert len(group) == 7
+        assert (group['ds'] > last).all()
+
+def test_forecast_many_falls_back_when_worker_gives_no_result(demand_table, monkeypatch):
+    monkeypatch.setattr(demand_forecasting, 'RESULT_GRACE_SECONDS', 0)
+    forecast = EmergencyDemandForecaster().forecast_many(demand_table, periods=3, max_workers=1,
+                                                         timeout=1e-6)
+
+    assert set(forecast['model']) == {'timeout'}
+    assert forecast.groupby('resource_type').size().tolist() == [3, 3]
+    assert forecast['yhat'].notna().all()
+
+def test_stop_pool_kills_a_stuck_worker():
+    pool = demand_forecasting.process_pool(1)
+    pool.submit(os.getpid).result(timeout=60)  # Worker is up
+    stuck = pool.submit(time.sleep, 600)
+    while not stuck.running():
+        time.sleep(0.05)
+
+    demand_forecasting.stop_pool(pool)
+    assert isinstance(stuck.exception(timeout=30), BrokenProcessPool)
+
+def test_fallback_forecast_matches_make_forecast_convention():
+    history = pd.DataFrame({'ds': pd.date_range('2023-01-01', periods=5, freq='D'),
+                            'y': [1.0, 2.0, 3.0, 4.0, 5.0]})
+
+    future = fallback_forecast(history, periods=2)
+    full = fallback_forecast(history, periods=2, include_history=True)
+
+    assert future['ds'].tolist() == list(pd.date_range('2023-01-06', periods=2, freq='D'))
+    assert len(full) == 7
+    assert np.allclose(future['yhat'], 3.0)
+
+def test_cached_forecast_after_retrain_drops_stale_model(history_path, tmp_path):
+    model_path = str(tmp_path / 'model.pkl')
+    forecaster = EmergencyDemandForecaster(cache_dir=str(tmp_path / 'cache'))
+    forecaster.train_model(str(history_path), model_path)
+    forecaster.make_forecast(model_path, periods=3)
+
+    # Another worker retrains the same path on a longer history and caches its forecast
+    data = json.loads(history_path.read_text())
+    data['demand_history'] += [{'date': str(d.date()), 'demand': 100.0}
+                               for d in pd.date_range('2023-04-01', periods=10, freq='D')]
+    history_path.write_text(json.dumps(data))
+    other = EmergencyDemandForecaster(cache_dir=str(tmp_path / 'cache'))
+    other.train_model(str(history_path), model_path)
+    expected = other.make_forecast(model_path, periods=3)
+
+    forecast = forecaster.make_forecast(model_path, periods=3)
+
+    assert forecast['ds'].tolist() == expected['ds'].tolist()
+    forecaster.plot_forecast(str(tmp_path / 'plots' / 'forecast.png'))
+    assert len(forecaster.model.history) == 100
+
+def test_update_many_statuses(demand_table, tmp_path):
+    forecaster = EmergencyDemandForecaster()
+    water = demand_table[demand_table['resource_type'] == 'water']
+    first, later = water.iloc[:80], water.iloc[80:]
+
+    cold = forecaster.update_many(first, str(tmp_path), max_workers=1)
+    unchanged = forecaster.update_many(first, str(tmp_path), max_workers=1)
+    warm = forecaster.update_many(later, str(tmp_path), max_workers=1)
+    refit = forecaster.update_many(later.assign(demand=later['demand'] + 1), str(tmp_path),
+                                   warm_start=False, max_workers=1)
+
+    assert [report['status'].tolist() for report in (cold, unchanged, warm, refit)] == [
+        ['cold'], ['unchanged'], ['warm'], ['cold']]
+    assert [report['rows'].tolist() for report in (cold, unchanged, warm, refit)] == [
+        [80], [80], [90], [90]]
+
+def test_update_refits_only_new_rows(history_path, tmp_path):
+    model_path = str(tmp_path / 'model.pkl')
+    forecaster = EmergencyDemandForecaster()
+    forecaster.train_model(str(history_path), model_path)
+    rows = json.loads(history_path.read_text())['demand_history']
+
+    assert forecaster.update(rows[-5:], model_path)['status'] == 'unchanged'
+    result = forecaster.update([{'date': '2023-04-01', 'demand': 101.0}], model_path)
+
+    assert result['status'] == 'warm' and result['rows'] == 91
+    assert len(forecaster.model.history) == 91
@@ -0,0 +1,53 @@
+import pytest
+import json
+import numpy as np
+from backend.scripts.model_training.prophet.holt_winters import (
+    SEASON_LENGTH, HoltWintersForecaster, fit_batch, smooth)
+
+def weekly_series(days, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(days)
+    return 100 + 0.2 * t + 10 * np.sin(2 * np.pi * t / 7) + rng.normal(0, 2, days)
+
+@pytest.fixture
+def history_path(tmp_path):
+    y = weekly_series(60)
+    dates = np.datetime64('2023-01-01') + np.arange(len(y))
+    path = tmp_path / 'demand_history.json'
+    path.write_text(json.dumps({'demand_history': [{'date': str(d), 'demand': float(v)}
+                                                   for d, v in zip(dates, y)]}))
+    return path
+
+def test_sigma_is_rms_of_scored_residuals():
+    y = weekly_series(30)[None, :]
+    params = fit_batch(y)
+    fitted = np.empty((y.shape[1], 1, 1))
+    smooth(y, *(params[name].reshape(1, 1) for name in ('alpha', 'beta', 'gamma')), fitted=fitted)
+    residuals = y[0, SEASON_LENGTH:] - fitted[SEASON_LENGTH:, 0, 0]
+
+    assert params['sigma'][0] == pytest.approx(np.sqrt(np.mean(residuals ** 2)))
+
+@pytest.mark.parametrize('days', [2, 5, SEASON_LENGTH, 2 * SEASON_LENGTH - 1])
+def test_short_series_get_non_seasonal_fit(days):
+    params = fit_batch(weekly_series(days))
+
+    assert params['gamma'][0] == 0
+    assert np.all(params['season'] == 0)
+    assert params['sigma'][0] > 0
+
+def test_single_observation_is_rejected():
+    with pytest.raises(ValueError, match='at least 2'):
+        fit_batch([5.0])
+
+def test_make_forecast_include_history(history_path, tmp_path):
+    model_path = str(tmp_path / 'model.npz')
+    forecaster = HoltWintersForecaster()
+    forecaster.train_model(str(history_path), model_path)
+
+    future = forecaster.make_forecast(model_path, periods=7)
+    full = forecaster.make_forecast(model_path, periods=7, include_history=True)
+
+    assert len(future['ds']) == 7 and len(full['ds']) == 67
+    assert full['ds'][0] == np.datetime64('2023-01-01')
+    assert np.array_equal(full['yhat'][-7:], future['yhat'])
+    assert np.all(full['yhat_lower'] <= full['yhat']) and np.all(full['yhat'] <= full['yhat_upper'])
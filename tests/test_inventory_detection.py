@@ -0,0 +1,156 @@
+import pytest
+import os
+import subprocess
+import sys
+import threading
+import time
+import cv2
+import numpy as np
+from backend.scripts.model_training.yolo.inventory_detection import InventoryDetector
+from backend.scripts.model_training.yolo.onnx_backend import Boxes, OnnxYoloBackend, Result
+
+CLASS_NAMES = ['medical_kit', 'food_packet', 'water_bottle', 'blanket', 'first_aid', 'flashlight']
+
+class StubModel:
+    """One full-frame box per image, of the class stored in its first pixel"""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, images, imgsz=640, conf=0.25, verbose=False):
+        self.batches.append(len(images))
+        results = []
+        for image in images:
+            height, width = image.shape[:2]
+            results.append(Result((height, width), Boxes(np.array([[0, 0, width, height]], dtype=np.float32),
+                                                         np.array([0.9], dtype=np.float32),
+                                                         np.array([image[0, 0, 0]], dtype=np.float32))))
+        return results
+
+@pytest.fixture
+def detector(monkeypatch):
+    monkeypatch.setattr(InventoryDetector, 'load_class_names', lambda self: CLASS_NAMES)
+    monkeypatch.setattr(InventoryDetector, 'load_model', lambda self: None)
+    detector = InventoryDetector()
+    detector.model = StubModel()
+    return detector
+
+@pytest.fixture
+def image_dir(tmp_path):
+    for i, cls in enumerate([0, 2, 2, 5, 0, 2, 1]):
+        cv2.imwrite(str(tmp_path / f'{i:02d}.png'), np.full((32, 48, 3), cls, dtype=np.uint8))
+    (tmp_path / '03_broken.jpg').write_bytes(b'not an image')
+    (tmp_path / 'notes.txt').write_text('skipped by extension')
+    return tmp_path
+
+def test_detect_batch_counts_and_failed(detector, image_dir):
+    results = detector.detect_batch(str(image_dir), batch_size=3, num_workers=2)
+
+    assert results['counts'] == {'medical_kit': 2, 'food_packet': 1, 'water_bottle': 3,
+                                 'blanket': 0, 'first_aid': 0, 'flashlight': 1}
+    assert results['failed'] == [str(image_dir / '03_broken.jpg')]
+    assert detector.model.batches == [3, 3, 1]
+    assert [image['source'] for image in results['images']] == [str(image_dir / f'{i:02d}.png')
+                                                                for i in range(7)]
+    assert results['images'][3]['counts']['flashlight'] == 1
+    assert results['images'][0]['image_size'] == (32, 48)
+    assert results['images'][0]['detections'][0]['bbox'] == [0, 0, 48, 32]
+
+def test_detect_batch_accepts_arrays_and_empty_input(detector):
+    frames = [np.full((16, 16, 3), 4, dtype=np.uint8)] * 2
+
+    assert detector.detect_batch(frames)['counts']['first_aid'] == 2
+    empty = detector.detect_batch([])
+    assert empty['images'] == [] and empty['failed'] == []
+    assert sum(empty['counts'].values()) == 0
+
+def test_module_imports_without_torch():
+    code = ("import sys; sys.modules['torch'] = sys.modules['ultralytics'] = None; "
+            "import backend.scripts.model_training.yolo.inventory_detection")
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path))
+    result = subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+def test_torch_backend_never_downloads_missing_weights(detector, tmp_path, monkeypatch):
+    monkeypatch.undo()  # Real load_model
+    detector.backend, detector.model_path = 'torch', str(tmp_path / 'inventory_yolov5.pt')
+
+    with pytest.raises(FileNotFoundError, match='--train'):
+        detector.load_model()
+    assert os.listdir(tmp_path) == []
+
+def test_onnx_backend_rejects_unreadable_paths(tmp_path):
+    backend = OnnxYoloBackend.__new__(OnnxYoloBackend)  # No session needed to fail on decoding
+    path = tmp_path / 'broken.jpg'
+    path.write_bytes(b'not an image')
+
+    with pytest.raises(IOError, match='broken.jpg'):
+        backend([np.zeros((8, 8, 3), dtype=np.uint8), str(path)])
+
+class BlobModel:
+    """Boxes around the painted rectangles of each tile, class = pixel value - 1
+
+    Objects cut by a tile edge come back clipped and less confident, as a
+    real detector's would.
+    """
+
+    def __init__(self):
+        self.active = self.max_active = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, tiles, imgsz=640, conf=0.25, verbose=False):
+        with self.lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(0.01)
+        results = []
+        for tile in tiles:
+            gray = tile[:, :, 0]
+            count, labels, stats, _ = cv2.connectedComponentsWithStats((gray > 0).astype(np.uint8))
+            x, y, w, h, area = stats[1:].T
+            xyxy = np.stack([x, y, x + w, y + h], axis=1).astype(np.float32)
+            cls = np.array([gray[labels == i].max() - 1 for i in range(1, count)], dtype=np.float32)
+            results.append(Result(tile.shape[:2], Boxes(xyxy, (0.5 + area / 10000).astype(np.float32), cls)))
+        with self.lock:
+            self.active -= 1
+        return results
+
+class OnnxBlobModel(BlobModel, OnnxYoloBackend):
+    pass
+
+@pytest.fixture
+def seam_image():
+    image = np.zeros((400, 1000, 3), dtype=np.uint8)  # Tiles start at x = 0, 300 and 600
+    for x1, y1, x2, y2, value in [(350, 20, 390, 60, 1),     # Inside the overlap of two tiles
+                                  (380, 100, 440, 160, 3),   # Cut by the edge of the first tile
+                                  (800, 200, 850, 250, 1),
+                                  (100, 300, 140, 340, 1),   # Neighbours that must not merge
+                                  (145, 300, 185, 340, 1)]:
+        image[y1:y2, x1:x2] = value
+    return image
+
+def test_detect_tiled_merges_objects_across_tile_seams(detector, seam_image):
+    detector.model = BlobModel()
+    results = detector.detect_tiled(seam_image, tile_size=400, overlap=0.25, include_full=False)
+
+    assert results['tiles'] == 3
+    assert results['counts'] == {'medical_kit': 4, 'food_packet': 0, 'water_bottle': 1,
+                                 'blanket': 0, 'first_aid': 0, 'flashlight': 0}
+    assert sorted(d['bbox'] for d in results['detections']) == [
+        [100, 300, 140, 340], [145, 300, 185, 340], [350, 20, 390, 60],
+        [380, 100, 440, 160], [800, 200, 850, 250]]
+
+    # Plain IoU keeps the clipped half of the cut object as a second item
+    iou = detector.detect_tiled(seam_image, tile_size=400, overlap=0.25, include_full=False,
+                                merge_metric='iou')
+    assert iou['counts']['water_bottle'] == 2
+
+@pytest.mark.parametrize('model_class, concurrent', [(BlobModel, False), (OnnxBlobModel, True)])
+def test_detect_tiled_threads_only_share_onnx_sessions(detector, seam_image, model_class, concurrent):
+    detector.model = model_class()
+    results = detector.detect_tiled(seam_image, tile_size=400, overlap=0.25, batch_size=1,
+                                    num_workers=3, include_full=False)
+
+    assert sum(results['counts'].values()) == 5
+    if not concurrent:
+        assert detector.model.max_active == 1
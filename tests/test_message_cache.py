@@ -0,0 +1,80 @@
+import time
+from backend.scripts.model_training.nlp.message_cache import CachedMessageClassifier
+
+LONG_MESSAGE = "urgent need drinking water and medicine for two hundred families at the river camp"
+
+class StubProcessor:
+    """clean_text/predict_cleaned stand-in that records model calls"""
+    def __init__(self, clean_seconds=0.0, model_seconds=0.0):
+        self.clean_seconds = clean_seconds
+        self.model_seconds = model_seconds
+        self.calls = []
+
+    def clean_text(self, text):
+        time.sleep(self.clean_seconds)
+        return text.lower().strip('!. ')
+
+    def predict_cleaned(self, texts):
+        time.sleep(self.model_seconds)
+        self.calls.append(list(texts))
+        return ['water' if 'water' in text else 'other' for text in texts]
+
+def check_index(cache):
+    """Every bucket member is cached and every cached entry is in its buckets"""
+    members = set()
+    for bucket in cache._buckets:
+        for texts in bucket.values():
+            assert texts
+            members.update(texts)
+    assert members == {text for text, entry in cache._entries.items() if entry[1] is not None}
+    for text, (_, _, band_keys) in cache._entries.items():
+        for bucket, key in zip(cache._buckets, band_keys):
+            assert text in bucket[key]
+
+def test_exact_near_and_miss_paths():
+    processor = StubProcessor()
+    cache = CachedMessageClassifier(processor)
+
+    assert cache.predict_batch([LONG_MESSAGE, "Road blocked"]) == ['water', 'other']
+    assert cache.predict_batch([LONG_MESSAGE.upper() + "!"]) == ['water']  # Same cleaned text
+    variant = LONG_MESSAGE.replace("two hundred", "two hundreds")
+    assert cache.predict_batch([variant]) == ['water']
+    assert cache.predict_batch([variant, "bridge collapsed"]) == ['water', 'other']
+
+    assert processor.calls == [[LONG_MESSAGE, "road blocked"], ["bridge collapsed"]]
+    stats = cache.stats()
+    assert (stats['exact_hits'], stats['near_hits'], stats['misses']) == (2, 1, 3)
+    assert stats['cached_entries'] == 4
+    check_index(cache)
+
+def test_repeats_in_a_batch_share_one_model_call():
+    processor = StubProcessor()
+    cache = CachedMessageClassifier(processor)
+
+    assert cache.predict_batch(["Need water", "need water!", "Need food"]) == ['water', 'water', 'other']
+    assert processor.calls == [["need water", "need food"]]
+    stats = cache.stats()
+    assert (stats['exact_hits'], stats['misses']) == (1, 2)
+
+def test_lru_eviction_keeps_buckets_consistent():
+    processor = StubProcessor()
+    cache = CachedMessageClassifier(processor, max_entries=3)
+    messages = [f"{LONG_MESSAGE} number {i}" for i in range(6)] + ["a", "b"]
+    for message in messages:
+        cache.predict_batch([message])
+        assert len(cache._entries) <= 3
+        check_index(cache)
+
+    assert list(cache._entries) == [messages[5], "a", "b"]
+    cache.clear()
+    assert not cache._entries and not any(cache._buckets)
+
+def test_latency_is_per_message():
+    cache = CachedMessageClassifier(StubProcessor(clean_seconds=0.002, model_seconds=0.04))
+    cache.predict_batch([f"message {i}" for i in range(4)])
+    cache.predict_batch([f"message {i}" for i in range(4)] * 5)
+
+    latency = cache.stats()['mean_latency_ms']
+    # Hits pay for their own cleaning only, not for the rest of the batch
+    assert latency['exact'] < 10
+    assert latency['miss'] >= 10  # 40 ms model call shared by four misses
@@ -0,0 +1,96 @@
+import pytest
+import json
+import pandas as pd
+from backend.scripts.model_training.nlp.message_processing import EmergencyMessageProcessor, RESOURCE_BUNDLE
+
+MESSAGES = pd.DataFrame({
+    'message': ["We need medical supplies", "Medicine needed for the injured",
+                "Food shortage reported", "No food left in the camp",
+                "People trapped in building", "Family trapped under rubble"],
+    'category': ['medical', 'medical', 'food', 'food', 'rescue', 'rescue']
+})
+
+@pytest.fixture
+def bundle_path(tmp_path):
+    path = tmp_path / "nlp_resources.json"
+    with open(path, 'w') as f:
+        json.dump({'stopwords': ['we', 'for', 'the', 'in', 'no', 'under'],
+                   'lemmas': {'supplies': 'supply', 'people': 'person'}}, f)
+    return path
+
+@pytest.fixture
+def processor(tmp_path, bundle_path):
+    data_path = tmp_path / "messages.csv"
+    MESSAGES.to_csv(data_path, index=False)
+    processor = EmergencyMessageProcessor(tmp_path / "classifier.joblib", bundle_path)
+    processor.train_model(data_path)
+    yield processor
+    processor.close()
+
+def test_predict_batch_matches_single_predictions(processor):
+    messages = ["Need medicine", "Food running out", "People trapped"]
+    result = processor.predict_batch(messages)
+
+    assert result['categories'] == [processor.predict_category(m) for m in messages]
+    assert result['scores'].shape == (3, 3)
+    assert result['classes'] == ['food', 'medical', 'rescue']
+
+def test_predict_batch_reuses_worker_pool(processor):
+    messages = ["Need medicine", "Food running out", "People trapped"]
+    expected = processor.predict_batch(messages)['categories']
+
+    assert processor.predict_batch(messages, n_jobs=2, chunk_size=1)['categories'] == expected
+    pool = processor._pool
+    assert processor.predict_batch(messages, n_jobs=2, chunk_size=1)['categories'] == expected
+    assert processor._pool is pool
+
+    processor.close()
+    assert processor._pool is None
+
+def test_predict_batch_empty(processor):
+    result = processor.predict_batch([])
+    assert result['categories'] == []
+    assert result['scores'].shape == (0, 3)
+
+class CountingLemmatizer:
+    def __init__(self):
+        self.calls = 0
+
+    def lemmatize(self, word):
+        self.calls += 1
+        return word.rstrip('s')
+
+def test_lemma_cache_is_bounded(bundle_path):
+    processor = EmergencyMessageProcessor(None, bundle_path, lemma_cache_size=2)
+    assert processor.clean_text("People need supplies") == "person need supply"
+    assert len(processor.lemma_cache) == 0  # Bundle misses are not memoized
+
+    processor.lemmatizer = CountingLemmatizer()
+    assert [processor.lemmatize(w) for w in ['tents', 'blankets', 'tents', 'boats']] == \
+        ['tent', 'blanket', 'tent', 'boat']
+    assert processor.lemmatizer.calls == 3
+    assert list(processor.lemma_cache) == ['tents', 'boats']
+
+def test_committed_bundle_lemmatizes_unseen_words():
+    processor = EmergencyMessageProcessor(None, RESOURCE_BUNDLE)
+    assert 'the' in processor.stop_words
+    # Nouns outside the training vocabulary, including WordNet exceptions
+    assert processor.clean_text("The geese, boxes and churches need blankets") == \
+        "goose box church need blanket"
+    assert processor.lemmatize('trapped') == 'trapped'
+
+def test_missing_bundle_fails_without_network(tmp_path):
+    with pytest.raises(FileNotFoundError, match='build_resource_bundle'):
+        EmergencyMessageProcessor(None, tmp_path / "missing.json")
+
+@pytest.mark.parametrize('n_jobs', [1, 2])
+def test_streaming_training_and_update(tmp_path, bundle_path, n_jobs):
+    data_path = tmp_path / "messages.csv"
+    pd.concat([MESSAGES] * 5).to_csv(data_path, index=False)
+    processor = EmergencyMessageProcessor(tmp_path / "streaming.joblib", bundle_path)
+    processor.train_model_streaming(data_path, chunksize=8, n_jobs=n_jobs, epochs=5)
+    
+    assert processor.predict_batch(["People trapped in building"])['categories'] == ['rescue']
+    processor.update_model(["Boat needed to rescue family"], ['rescue'])
+    with pytest.raises(ValueError, match='Unknown categories'):
+        processor.update_model(["Need blankets"], ['shelter'])
@@ -0,0 +1,197 @@
+import pytest
+import argparse
+import asyncio
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import numpy as np
+from backend.scripts.model_training.model_server import (
+    BadRequest, Endpoint, ModelServer, parse_content_length)
+from backend.scripts.model_training.prophet.holt_winters import HoltWintersForecaster
+
+JOB = {
+    "locations": [
+        {"name": "Depot", "lat": 28.6139, "lng": 77.2090},
+        {"name": "Medical Camp 1", "lat": 28.6200, "lng": 77.2150},
+        {"name": "Rescue Site A", "lat": 28.6050, "lng": 77.2200}
+    ],
+    "demands": [0, 15, 10],
+    "vehicle_capacities": [25, 25],
+    "num_vehicles": 2,
+    "time_limit": 1
+}
+
+def make_args(tmp_path, **overrides):
+    args = dict(host='127.0.0.1', port=0, socket=None, max_wait_ms=5,
+                anomaly_model=str(tmp_path / 'missing.joblib'), nlp_model=str(tmp_path / 'missing_nlp.joblib'),
+                nlp_resources=str(tmp_path / 'missing.json'), prophet_model=str(tmp_path / 'missing.pkl'),
+                forecast_cache=None, baseline_model=None, yolo_model=str(tmp_path / 'missing.pt'),
+                yolo_backend='onnx', yolo_threads=None,
+                route_workers=1, route_time_limit=1, route_cache=None)
+    args.update(overrides)
+    return argparse.Namespace(**args)
+
+@pytest.fixture
+def server(tmp_path):
+    server = ModelServer(make_args(tmp_path))
+    yield server
+    server.shutdown()
+
+def call(server, requests):
+    """Start the endpoints and dispatch (method, path, body) requests concurrently"""
+    async def main():
+        for endpoint in server.endpoints.values():
+            endpoint.start()
+        return await asyncio.gather(*(server.dispatch(method, path, body) for method, path, body in requests))
+    return asyncio.run(main())
+
+def test_dispatch_routes_requests(server):
+    server.endpoints['classify'].run_batch = lambda payloads: [{'echo': p['messages']} for p in payloads]
+    health, stats, missing, wrong_method, bad_json, ok = call(server, [
+        ('GET', '/health', b''), ('GET', '/stats?verbose=1', b''), ('POST', '/nowhere', b'{}'),
+        ('GET', '/classify', b''), ('POST', '/classify', b'{"messages": '),
+        ('POST', '/classify', b'{"messages": ["Need water"]}')])
+
+    assert health == (200, {'status': 'ok'})
+    assert set(stats[1]['endpoints']) == {'anomaly', 'classify', 'forecast', 'detect', 'routes'}
+    assert missing[0] == 404 and wrong_method[0] == 405
+    assert bad_json[0] == 400 and 'Invalid JSON' in bad_json[1]['error']
+    assert ok == (200, {'echo': ['Need water']})
+
+@pytest.mark.parametrize('error, status', [
+    (BadRequest("'rows' must be a list"), 400), (KeyError('rows'), 400), (TypeError('bad type'), 400),
+    (ValueError('bad value'), 400), (FileNotFoundError('no model'), 503), (RuntimeError('boom'), 500)])
+def test_errors_map_to_status(server, error, status):
+    def fail(payloads):
+        raise error
+    server.endpoints['anomaly'].run_batch = fail
+
+    [(code, body)] = call(server, [('POST', '/anomaly', b'{"rows": []}')])
+
+    assert code == status
+    assert 'error' in body
+
+def test_missing_model_is_503(server):
+    [(code, body)] = call(server, [('POST', '/anomaly', b'{"rows": []}')])
+    assert code == 503 and 'Model not available' in body['error']
+
+def test_endpoint_micro_batches_and_isolates_bad_requests():
+    calls = []
+    lock = threading.Lock()
+
+    def run_batch(payloads):
+        with lock:
+            calls.append(len(payloads))
+        if any(payload < 0 for payload in payloads):
+            raise ValueError('negative')
+        return [payload * 2 for payload in payloads]
+
+    async def main():
+        endpoint = Endpoint('double', run_batch, ThreadPoolExecutor(1), max_batch=4, max_wait_ms=50)
+        endpoint.start()
+        results = await asyncio.gather(*(endpoint.submit(i) for i in range(10)))
+        mixed = await asyncio.gather(endpoint.submit(1), endpoint.submit(-1), endpoint.submit(3),
+                                     return_exceptions=True)
+        return endpoint, results, mixed
+
+    endpoint, results, mixed = asyncio.run(main())
+
+    assert results == [2 * i for i in range(10)]
+    assert calls[:3] == [4, 4, 2]
+    assert mixed[0] == 2 and isinstance(mixed[1], ValueError) and mixed[2] == 6
+    assert calls[3:] == [3, 1, 1, 1]  # Failed batch retried one payload at a time
+    stats = endpoint.stats()
+    assert stats['requests'] == 13 and stats['errors'] == 1 and stats['batches'] == 4
+
+@pytest.mark.parametrize('value, expected', [(None, 0), ('', 0), ('12', 12), (' 7 ', 7),
+                                             ('-5', None), ('abc', None), ('1_000', None), ('1.5', None)])
+def test_parse_content_length(value, expected):
+    assert parse_content_length(value) == expected
+
+@pytest.mark.parametrize('length', ['abc', '-5'])
+def test_invalid_content_length_is_400(server, length):
+    async def main():
+        listener = await asyncio.start_server(server.handle_connection, '127.0.0.1', 0)
+        port = listener.sockets[0].getsockname()[1]
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(f"POST /classify HTTP/1.1\r\nContent-Length: {length}\r\n\r\n{{}}".encode())
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        listener.close()
+        return response
+
+    response = asyncio.run(main())
+
+    assert response.startswith(b'HTTP/1.1 400 ')
+    assert b'Connection: close' in response
+    assert json.loads(response.split(b'\r\n\r\n', 1)[1]) == {'error': 'Invalid Content-Length'}
+
+def test_baseline_forecast_with_history(tmp_path):
+    dates = np.datetime64('2023-01-01') + np.arange(30)
+    history = tmp_path / 'history.json'
+    history.write_text(json.dumps({'demand_history': [{'date': str(d), 'demand': 50.0 + i % 7}
+                                                      for i, d in enumerate(dates)]}))
+    model_path = str(tmp_path / 'baseline.npz')
+    HoltWintersForecaster().train_model(str(history), model_path)
+    server = ModelServer(make_args(tmp_path, baseline_model=model_path))
+    try:
+        (full_code, full), (future_code, future) = call(server, [
+            ('POST', '/forecast/baseline', b'{"periods": 5, "include_history": true}'),
+            ('POST', '/forecast/baseline', b'{"periods": 5}')])
+    finally:
+        server.shutdown()
+
+    assert full_code == future_code == 200
+    assert len(full['forecast']) == 35 and len(future['forecast']) == 5
+    assert full['forecast'][0]['ds'] == '2023-01-01'
+    assert future['forecast'][0]['ds'] == '2023-01-31'
+
+def test_routes_run_in_warmed_spawned_workers(server):
+    async def main():
+        for endpoint in server.endpoints.values():
+            endpoint.start()
+        ready = await server.warm_route_workers()
+        return ready, await server.dispatch('POST', '/routes', json.dumps(JOB).encode())
+
+    ready, (code, result) = asyncio.run(main())
+
+    assert ready == 1
+    assert code == 200 and result['status'] == 'ok'
+
+def write_onnx_detector(path):
+    """YOLO-shaped ONNX model that reports one medical_kit box on every image"""
+    from onnx import TensorProto, helper, save
+
+    box = np.array([[[320], [320], [160], [160], [0.9], [0.0], [0.0]]], dtype=np.float32)  # cx, cy, w, h, scores
+    graph = helper.make_graph(
+        [helper.make_node('ReduceMean', ['images'], ['mean'], axes=[1, 2, 3], keepdims=0),
+         helper.make_node('Unsqueeze', ['mean', 'axes'], ['column']),
+         helper.make_node('Mul', ['column', 'zero'], ['zeros']),
+         helper.make_node('Add', ['zeros', 'box'], ['output0'])],
+        'stub_yolo',
+        [helper.make_tensor_value_info('images', TensorProto.FLOAT, ['batch', 3, 'height', 'width'])],
+        [helper.make_tensor_value_info('output0', TensorProto.FLOAT, ['batch', 7, 1])],
+        [helper.make_tensor('axes', TensorProto.INT64, [2], [1, 2]),
+         helper.make_tensor('zero', TensorProto.FLOAT, [], [0.0]),
+         helper.make_tensor('box', TensorProto.FLOAT, box.shape, box.ravel())])
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid('', 13)])
+    model.ir_version = 8
+    helper.set_model_props(model, {'names': str({0: 'medical_kit', 1: 'food_packet', 2: 'water_bottle'})})
+    save(model, path)
+
+def test_detect_loads_the_configured_yolo_model(tmp_path):
+    write_onnx_detector(str(tmp_path / 'inventory.onnx'))
+    image = tmp_path / 'shelf.png'
+    cv2.imwrite(str(image), np.zeros((64, 64, 3), dtype=np.uint8))
+    server = ModelServer(make_args(tmp_path, yolo_model=str(tmp_path / 'inventory.pt')))
+    try:
+        [(code, body)] = call(server, [('POST', '/detect', json.dumps({'images': [str(image)]}).encode())])
+    finally:
+        server.shutdown()
+
+    assert code == 200
+    assert body['counts']['medical_kit'] == 1
+    assert body['images'][0]['source'] == str(image)
+    assert body['images'][0]['detections'][0]['bbox'] == [24, 24, 40, 40]
@@ -0,0 +1,145 @@
+import pytest
+import numpy as np
+import time
+from backend.scripts.model_training.ortools.route_optimization import (
+    EmergencyRouteOptimizer, allocate_vehicles, balance_clusters, coordinates_array, knn_graph)
+
+@pytest.fixture
+def optimizer():
+    optimizer = EmergencyRouteOptimizer()
+    optimizer.locations = [
+        {"name": "Depot", "lat": 28.6139, "lng": 77.2090},
+        {"name": "Medical Camp 1", "lat": 28.6200, "lng": 77.2150},
+        {"name": "Food Distribution 1", "lat": 28.6250, "lng": 77.2000},
+        {"name": "Rescue Site A", "lat": 28.6050, "lng": 77.2200},
+        {"name": "Shelter Camp 1", "lat": 28.6300, "lng": 77.2050}
+    ]
+    optimizer.demands = [0, 15, 20, 10, 5]
+    optimizer.vehicle_capacities = [25, 25]
+    optimizer.num_vehicles = 2
+    return optimizer
+
+def test_distance_matrix_matches_scalar(optimizer):
+    matrix = optimizer.create_distance_matrix()
+
+    assert matrix.dtype == np.int64
+    for i, from_loc in enumerate(optimizer.locations):
+        for j, to_loc in enumerate(optimizer.locations):
+            expected = optimizer.haversine_distance(from_loc, to_loc) * optimizer.distance_scale
+            assert abs(matrix[i, j] - expected) <= 1
+
+def test_distance_matrix_cache(optimizer, tmp_path):
+    optimizer.cache_dir = tmp_path
+    first = optimizer.create_distance_matrix()
+    assert len(list(tmp_path.glob('*.npy'))) == 1
+
+    second = optimizer.create_distance_matrix()
+    assert isinstance(second, np.memmap)
+    np.testing.assert_array_equal(first, second)
+
+@pytest.mark.parametrize('use_matrix_callbacks', [True, False])
+def test_optimize_routes_visits_every_stop(optimizer, use_matrix_callbacks):
+    optimizer.time_limit = 1
+    optimizer.use_matrix_callbacks = use_matrix_callbacks
+    routes = optimizer.optimize_routes()
+
+    visited = [stop['location']['name'] for route in routes for stop in route['stops'][1:]]
+    assert sorted(visited) == sorted(loc['name'] for loc in optimizer.locations[1:])
+    assert all(route['load'] <= 25 for route in routes)
+
+def test_allocate_and_balance_clusters():
+    allocation = allocate_vehicles([30, 10], [20, 20, 10])
+    assert sorted(v for vehicles in allocation for v in vehicles) == [0, 1, 2]
+    assert all(allocation)
+
+    points = np.array([[28.60, 77.20], [28.61, 77.20], [28.62, 77.20], [28.70, 77.20]])
+    labels = balance_clusters(points, np.array([0, 0, 0, 1]), [10, 10, 10, 10], [20, 30])
+    loads = np.bincount(labels, weights=[10, 10, 10, 10])
+    assert list(loads) == [20, 20]
+
+def test_clustered_routes_share_the_time_limit(optimizer):
+    # Two clusters on one worker run back to back, each on half the budget
+    optimizer.time_limit = 2
+    start = time.monotonic()
+    routes = optimizer.optimize_routes_clustered(num_clusters=2, max_workers=1)
+    assert time.monotonic() - start < 3.5
+
+    visited = [stop['location']['name'] for route in routes for stop in route['stops'][1:]]
+    assert sorted(visited) == sorted(loc['name'] for loc in optimizer.locations[1:])
+
+def test_reoptimize_routes_applies_delta(optimizer):
+    optimizer.time_limit = 1
+    routes = optimizer.optimize_routes()
+
+    new_stop = {"name": "Shelter Camp 2", "lat": 28.6100, "lng": 77.2120}
+    routes = optimizer.reoptimize_routes(
+        routes,
+        added=[{'location': new_stop, 'demand': 5}],
+        removed=['Rescue Site A'],
+        demand_changes={'Shelter Camp 1': 10})
+
+    visited = sorted(stop['location']['name'] for route in routes for stop in route['stops'][1:])
+    assert visited == ['Food Distribution 1', 'Medical Camp 1', 'Shelter Camp 1', 'Shelter Camp 2']
+    assert sum(route['load'] for route in routes) == 50
+    np.testing.assert_array_equal(optimizer.distance_matrix, optimizer.create_distance_matrix())
+
+def test_reoptimize_cold_start_keeps_time_limit(optimizer, monkeypatch):
+    optimizer.time_limit = 1
+    routes = optimizer.optimize_routes()
+
+    # No warm start: the search runs from scratch, still within time_limit
+    optimizer.time_limit = 30
+    monkeypatch.setattr(optimizer, '_insert_stops', lambda *args: False)
+    start = time.monotonic()
+    routes = optimizer.reoptimize_routes(routes, removed=['Rescue Site A'], time_limit=1)
+    assert time.monotonic() - start < 10
+    assert sum(route['load'] for route in routes) == 40
+
+def test_knn_graph_and_sparse_routes(optimizer):
+    coords = coordinates_array(optimizer.locations)
+    indptr, indices, costs = knn_graph(coords, k=1)
+    full = optimizer.create_distance_matrix()
+    rows = np.repeat(np.arange(len(coords)), np.diff(indptr))
+
+    np.testing.assert_array_equal(full[rows, indices], costs)
+    assert set(indices[indptr[0]:indptr[1]]) == {1, 2, 3, 4}
+
+    optimizer.time_limit = 1
+    optimizer.sparse_neighbors = 2
+    routes = optimizer.optimize_routes()
+    assert sum(len(route['stops']) - 1 for route in routes) == 4
+
+@pytest.mark.parametrize('use_matrix_callbacks', [True, False])
+def test_sparse_model_costs_graph_and_extra_arcs(optimizer, use_matrix_callbacks):
+    optimizer.use_matrix_callbacks = use_matrix_callbacks
+    graph = knn_graph(coordinates_array(optimizer.locations), k=1)
+    indptr, indices, _ = graph
+    extra = (3, 4)
+    assert extra[1] not in indices[indptr[extra[0]]:indptr[extra[0] + 1]]
+    full = optimizer.create_distance_matrix()
+
+    manager, routing = optimizer.build_sparse_routing_model(graph, [extra])
+    routing.CloseModel()
+    arcs = [(i, int(j)) for i in range(len(full)) for j in indices[indptr[i]:indptr[i + 1]] if j != 0]
+
+    for i, j in arcs + [extra]:
+        assert routing.GetArcCostForVehicle(manager.NodeToIndex(i), manager.NodeToIndex(j), 0) == full[i, j]
+    assert routing.NextVar(manager.NodeToIndex(extra[0])).Contains(manager.NodeToIndex(extra[1]))
+    assert not routing.NextVar(manager.NodeToIndex(1)).Contains(manager.NodeToIndex(2))
+
+def test_time_windows_multi_depot_and_range(optimizer):
+    optimizer.time_limit = 1
+    optimizer.demands[1] = 0
+    optimizer.starts = optimizer.ends = [0, 1]
+    optimizer.time_windows = [[0, 120], [0, 120], [0, 30], [30, 60], [0, 120]]
+    optimizer.service_times = [0, 0, 5, 5, 5]
+    optimizer.vehicle_ranges_km = [20, 20]
+    routes = optimizer.optimize_routes()
+
+    assert [route['stops'][0]['location']['name'] for route in routes] == ['Depot', 'Medical Camp 1']
+    for route in routes:
+        assert route['distance_km'] <= 20
+        for stop in route['stops']:
+            node = optimizer.locations.index(stop['location'])
+            earliest, latest = optimizer.time_windows[node]
+            assert earliest <= stop['arrival_min'] <= latest
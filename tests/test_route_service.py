@@ -0,0 +1,80 @@
+import pytest
+import json
+import os
+from backend.scripts.model_training.ortools.route_service import RouteService, parse_time_limit, solve_job
+
+JOB = {
+    "locations": [
+        {"name": "Depot", "lat": 28.6139, "lng": 77.2090},
+        {"name": "Medical Camp 1", "lat": 28.6200, "lng": 77.2150},
+        {"name": "Food Distribution 1", "lat": 28.6250, "lng": 77.2000},
+        {"name": "Rescue Site A", "lat": 28.6050, "lng": 77.2200}
+    ],
+    "demands": [0, 15, 20, 10],
+    "vehicle_capacities": [25, 25],
+    "num_vehicles": 2
+}
+
+@pytest.fixture
+def service():
+    service = RouteService(max_workers=1, time_limit=1)
+    yield service
+    service.shutdown()
+
+def run(service, jobs):
+    results = []
+    lines = [job if isinstance(job, str) else json.dumps(job) for job in jobs]
+    service.run_stream(lines, results.append)
+    return {result['id']: result for result in results}, results
+
+def test_parse_time_limit():
+    assert parse_time_limit(3) == 3
+    assert parse_time_limit(0.5) == 1
+    assert parse_time_limit(2.1) == 3
+    for value in (0, -1, 'fast', None, True, float('nan')):
+        with pytest.raises(ValueError):
+            parse_time_limit(value)
+
+def test_invalid_jobs_get_error_records(service):
+    by_id, results = run(service, [
+        '[1, 2]',
+        '{not json',
+        dict(JOB, id='bad-limit', time_limit=0),
+        dict(JOB, id='bad-mode', mode='fastest'),
+        dict(JOB, id='ok', time_limit=0.5)
+    ])
+
+    assert len(results) == 5
+    assert sum(result['id'] is None and result['status'] == 'error' for result in results) == 2
+    assert 'time_limit' in by_id['bad-limit']['error']
+    assert by_id['bad-mode']['status'] == 'error'
+    assert by_id['ok']['status'] == 'ok'
+    assert solve_job([1, 2])['status'] == 'error'
+
+def test_broken_pool_is_replaced(service):
+    # Jobs in flight when a worker dies still get a result line each
+    service.pool.submit(os._exit, 1)
+    by_id, results = run(service, [dict(JOB, id=1), dict(JOB, id=2)])
+    assert sorted(by_id) == [1, 2]
+    assert service.pool_restarts == 1
+
+    by_id, results = run(service, [dict(JOB, id=3)])
+    assert by_id[3]['status'] == 'ok'
+    assert service.pool_restarts == 1
+
+def test_overrunning_job_is_killed():
+    # Guided local search always runs for its whole limit, so no grace means
+    # the job overruns its wall-clock deadline
+    service = RouteService(max_workers=1, time_limit=1, grace=0)
+    try:
+        by_id, results = run(service, [dict(JOB, id='slow')])
+        assert by_id['slow']['status'] == 'error'
+        assert 'wall-clock' in by_id['slow']['error']
+        assert service.timeouts == 1
+        assert service.pool_restarts == 1
+
+        service.grace = 60
+        by_id, results = run(service, [dict(JOB, id='next')])
+        assert by_id['next']['status'] == 'ok'
+    finally:
+        service.shutdown()
@@ -0,0 +1,65 @@
+import pytest
+import time
+import cv2
+import numpy as np
+from backend.scripts.model_training.yolo.video_inventory import FrameReader, IoUTracker
+
+def box(x, y, size=40):
+    return [x, y, x + size, y + size]
+
+def test_tracker_counts_each_object_once_across_gaps():
+    tracker = IoUTracker(iou_threshold=0.3, max_missed=3, min_hits=2)
+    for frame in range(0, 55, 5):
+        boxes, classes = [], []
+        if frame not in (15, 20):  # Moving item missed on two detection runs
+            boxes.append(box(10 + 2 * frame, 100))
+            classes.append(0)
+        if frame != 25:  # Static item missed once
+            boxes.append(box(300, 50))
+            classes.append(2)
+        if frame == 30:  # One-off false positive is never confirmed
+            boxes.append(box(500, 300))
+            classes.append(1)
+        tracker.update(frame, np.array(boxes, dtype=float).reshape(-1, 4), np.array(classes, dtype=int),
+                       np.full(len(boxes), 0.9))
+
+    assert sorted(tracker.counted) == [0, 2]
+    ids, predicted, classes = tracker.predict(50)
+    assert sorted(classes.tolist()) == [0, 2]
+
+def test_tracker_counts_again_after_track_is_dropped():
+    tracker = IoUTracker(max_missed=1, min_hits=2)
+    for frame in range(7):
+        seen = frame in (0, 1, 5, 6)  # Unseen for longer than max_missed in between
+        boxes = np.array([box(0, 0)] if seen else [], dtype=float).reshape(-1, 4)
+        tracker.update(frame, boxes, np.zeros(len(boxes), dtype=int), np.full(len(boxes), 0.9))
+
+    assert tracker.counted == [0, 0]
+
+@pytest.fixture
+def video_path(tmp_path):
+    path = str(tmp_path / 'feed.avi')
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), 30, (64, 48))
+    for i in range(30):
+        writer.write(np.full((48, 64, 3), 8 * i, dtype=np.uint8))
+    writer.release()
+    return path
+
+def test_frame_reader_drops_oldest_frames_for_live_sources(video_path):
+    reader = FrameReader(video_path, queue_size=2, drop_when_full=True)
+    deadline = time.monotonic() + 10
+    while reader.dropped < 28 and time.monotonic() < deadline:  # Slow consumer
+        time.sleep(0.01)
+
+    frames = list(reader)
+
+    assert reader.dropped == 28
+    assert [index for index, _ in frames] == [28, 29]
+    assert [round(frame.mean() / 8) for _, frame in frames] == [28, 29]
+
+def test_frame_reader_keeps_every_frame_of_a_file(video_path):
+    reader = FrameReader(video_path, queue_size=2)
+    time.sleep(0.2)
+
+    assert [index for index, _ in reader] == list(range(30))
+    assert reader.dropped == 0